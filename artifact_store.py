@@ -0,0 +1,144 @@
+import gzip
+import json
+import os
+import sqlite3
+
+# Types d'artefacts enregistrés
+ARTIFACT_TEXT = "text"
+ARTIFACT_INFO = "info"
+ARTIFACT_SUMMARY = "summary"
+
+_open_stores = {}  # Magasins déjà ouverts, par (dossier, processus)
+
+class ArtifactStore:
+    """
+    Magasin d'artefacts en ajout seul : texte brut des PDF, informations extraites
+    et synthèses des messages, à la place de trois petits fichiers par élément.
+
+    Chaque processus écrit dans son propre fragment (artifacts-<pid>.jsonl.gz),
+    où chaque enregistrement est un membre gzip indépendant contenant une ligne
+    JSON ; le fichier reste lisible en entier avec gzip / zcat. Un index SQLite
+    associe (message, pièce jointe, type) au fragment, à la position et à la
+    longueur de l'enregistrement, ce qui permet de relire un seul artefact.
+    """
+
+    def __init__(self, root, commit_every=200):
+        """
+        Args:
+            root (str): Dossier du magasin (fragments et index).
+            commit_every (int): Nombre d'artefacts entre deux validations de l'index.
+        """
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.commit_every = commit_every
+        self.shard_name = f"artifacts-{os.getpid()}.jsonl.gz"
+        self._shard = None
+        self._pending = []
+
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "msg_path TEXT, attachment TEXT, kind TEXT, shard TEXT, offset INTEGER, length INTEGER, "
+            "PRIMARY KEY (msg_path, attachment, kind))"
+        )
+        self.conn.commit()
+
+    def put(self, msg_path, attachment, kind, data):
+        """
+        Ajoute un artefact. Un artefact déjà présent pour la même clé est remplacé
+        dans l'index (l'ancien enregistrement reste dans son fragment).
+
+        Args:
+            msg_path (str): Chemin du message (ex. "dossier/mail.msg>imbrique.msg").
+            attachment (str): Nom de la pièce jointe ("" pour la synthèse d'un message).
+            kind (str): ARTIFACT_TEXT, ARTIFACT_INFO ou ARTIFACT_SUMMARY.
+            data: Contenu sérialisable en JSON (les valeurs non standard sont converties en texte).
+        """
+        if self._shard is None:
+            self._shard = open(os.path.join(self.root, self.shard_name), "ab")
+        record = json.dumps({"msg_path": msg_path, "attachment": attachment, "kind": kind, "data": data},
+                            ensure_ascii=False, default=str)
+        payload = gzip.compress((record + "\n").encode("utf-8"), compresslevel=6)
+        offset = self._shard.tell()
+        self._shard.write(payload)
+        self._pending.append((msg_path, attachment, kind, self.shard_name, offset, len(payload)))
+        if len(self._pending) >= self.commit_every:
+            self.flush()
+
+    def put_document(self, msg_path, attachment, text, info):
+        """Enregistre le texte brut et les informations extraites d'un PDF."""
+        self.put(msg_path, attachment, ARTIFACT_TEXT, text)
+        self.put(msg_path, attachment, ARTIFACT_INFO, info)
+
+    def flush(self):
+        """Écrit les fragments sur le disque puis valide l'index des artefacts ajoutés."""
+        if self._shard is not None:
+            self._shard.flush()
+        if self._pending:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO artifacts (msg_path, attachment, kind, shard, offset, length) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    self._pending,
+                )
+            self._pending = []
+
+    def get(self, msg_path, attachment, kind):
+        """
+        Relit un artefact.
+
+        Returns:
+            Le contenu enregistré, ou None si l'artefact est absent.
+        """
+        self.flush()
+        row = self.conn.execute(
+            "SELECT shard, offset, length FROM artifacts WHERE msg_path = ? AND attachment = ? AND kind = ?",
+            (msg_path, attachment, kind),
+        ).fetchone()
+        if row is None:
+            return None
+        shard, offset, length = row
+        with open(os.path.join(self.root, shard), "rb") as f:
+            f.seek(offset)
+            payload = f.read(length)
+        return json.loads(gzip.decompress(payload))["data"]
+
+    def get_document(self, msg_path, attachment):
+        """Retourne {"text": ..., "info": ...} pour un PDF d'un message."""
+        return {
+            "text": self.get(msg_path, attachment, ARTIFACT_TEXT),
+            "info": self.get(msg_path, attachment, ARTIFACT_INFO),
+        }
+
+    def get_summary(self, msg_path):
+        """Retourne la synthèse d'un message."""
+        return self.get(msg_path, "", ARTIFACT_SUMMARY)
+
+    def list_attachments(self, msg_path):
+        """Liste les pièces jointes d'un message pour lesquelles des artefacts existent."""
+        self.flush()
+        rows = self.conn.execute(
+            "SELECT DISTINCT attachment FROM artifacts WHERE msg_path = ? AND kind != ? ORDER BY attachment",
+            (msg_path, ARTIFACT_SUMMARY),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        self.flush()
+        if self._shard is not None:
+            self._shard.close()
+            self._shard = None
+        self.conn.close()
+
+def open_artifact_store(root):
+    """
+    Ouvre le magasin une seule fois par processus (utile dans les processus du pool).
+    La clé inclut le pid : un processus créé par fork n'hérite pas du fragment ni
+    de la connexion SQLite de son parent.
+    """
+    key = (root, os.getpid())
+    if key not in _open_stores:
+        _open_stores[key] = ArtifactStore(root)
+    return _open_stores[key]
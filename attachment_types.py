@@ -0,0 +1,112 @@
+import os
+import olefile  # Installé avec extract_msg
+
+# Types de pièces jointes reconnus
+ATTACHMENT_PDF = "pdf"
+ATTACHMENT_MSG = "msg"
+ATTACHMENT_IMAGE = "image"
+ATTACHMENT_OFFICE = "office"
+ATTACHMENT_UNKNOWN = "unknown"
+
+# Signature des fichiers OLE / CFBF (Compound File Binary Format), utilisée par .msg, .doc, .xls...
+OLE_SIGNATURE = b'\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1'
+
+# Flux propres aux .msg, à la racine du fichier OLE (préfixe des propriétés, flux des propriétés)
+_MSG_STREAM_PREFIX = "__substg1.0_"
+_MSG_PROPERTIES_STREAM = "__properties_version1.0"
+
+# Flux caractéristiques des documents Office binaires (Word, Excel, PowerPoint)
+_OFFICE_STREAMS = frozenset(("WordDocument", "Workbook", "Book", "PowerPoint Document"))
+
+_IMAGE_SIGNATURES = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",  # JPEG
+    b"GIF87a",
+    b"GIF89a",
+    b"II*\x00",  # TIFF little-endian
+    b"MM\x00*",  # TIFF big-endian
+    b"BM",  # BMP
+)
+
+_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".emf", ".wmf"}
+_OFFICE_EXTENSIONS = {".doc", ".docx", ".xls", ".xlsx", ".xlsm", ".ppt", ".pptx", ".rtf", ".odt", ".ods"}
+
+def _ole_root_names(data):
+    """
+    Noms des flux et stockages à la racine d'un fichier OLE, lus dans son répertoire
+    (sans lire le contenu des flux). None si le répertoire est illisible.
+    """
+    try:
+        with olefile.OleFileIO(data) as ole:
+            return [entry.name for entry in ole.root.kids]
+    except Exception:
+        # Fichier OLE tronqué ou corrompu : le type sera déduit de l'extension
+        return None
+
+def _ole_type(filename, data):
+    """
+    Distingue un .msg d'un document Office dans un fichier OLE d'après les flux à
+    la racine de son répertoire. Les flux d'un .msg joint à un document Word, par
+    exemple, sont dans un sous-stockage et ne font pas de ce document un .msg.
+    """
+    names = _ole_root_names(data) or ()
+    if any(name == _MSG_PROPERTIES_STREAM or name.startswith(_MSG_STREAM_PREFIX) for name in names):
+        return ATTACHMENT_MSG
+    if any(name in _OFFICE_STREAMS for name in names):
+        return ATTACHMENT_OFFICE
+    extension = os.path.splitext(filename.lower())[1]
+    if extension == ".msg":
+        return ATTACHMENT_MSG
+    if extension in _OFFICE_EXTENSIONS:
+        return ATTACHMENT_OFFICE
+    return ATTACHMENT_UNKNOWN
+
+def classify_attachment(filename, data):
+    """
+    Détermine le type d'une pièce jointe à partir de sa signature binaire,
+    sans ouvrir ni analyser complètement le fichier.
+
+    Args:
+        filename (str): Nom de la pièce jointe.
+        data (bytes | Message): Contenu binaire, ou message imbriqué déjà ouvert
+                                par extract_msg.
+
+    Returns:
+        str: Un des types ATTACHMENT_PDF, ATTACHMENT_MSG, ATTACHMENT_IMAGE,
+             ATTACHMENT_OFFICE ou ATTACHMENT_UNKNOWN.
+    """
+    if data is None:
+        return ATTACHMENT_UNKNOWN
+
+    # Message imbriqué déjà ouvert par extract_msg (pièce jointe de type message)
+    if not isinstance(data, (bytes, bytearray)):
+        return ATTACHMENT_MSG if hasattr(data, 'attachments') else ATTACHMENT_UNKNOWN
+
+    # Un PDF peut être précédé de quelques octets parasites (tolérance de 1024 octets)
+    if data[:1024].find(b"%PDF-") != -1:
+        return ATTACHMENT_PDF
+
+    if data[:8] == OLE_SIGNATURE:
+        return _ole_type(filename, data)
+
+    if data.startswith(_IMAGE_SIGNATURES):
+        return ATTACHMENT_IMAGE
+
+    extension = os.path.splitext(filename.lower())[1]
+
+    # Documents Office Open XML (archives ZIP)
+    if data[:4] == b"PK\x03\x04":
+        if extension in _OFFICE_EXTENSIONS or b"[Content_Types].xml" in data:
+            return ATTACHMENT_OFFICE
+        return ATTACHMENT_UNKNOWN
+
+    # Aucune signature reconnue : se fier à l'extension
+    if extension == ".pdf":
+        return ATTACHMENT_PDF
+    if extension == ".msg":
+        return ATTACHMENT_MSG
+    if extension in _IMAGE_EXTENSIONS:
+        return ATTACHMENT_IMAGE
+    if extension in _OFFICE_EXTENSIONS:
+        return ATTACHMENT_OFFICE
+    return ATTACHMENT_UNKNOWN
@@ -0,0 +1,261 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+import extract_msg
+
+import ooo
+import tet
+import test
+import tgtt
+from synthetic_corpus import generate_msg_corpus, generate_pipe_file
+from text_normalizer import remove_accents
+
+DEFAULT_RESULTS_FOLDER = "benchmarks"
+REGRESSION_THRESHOLD = 0.10  # Ralentissement relatif signalé comme régression
+
+def _summarize(durations):
+    """Statistiques (en millisecondes) d'une liste de durées en secondes."""
+    ordered = sorted(durations)
+    return {
+        "n": len(ordered),
+        "total_s": sum(ordered),
+        "moyenne_ms": 1000 * statistics.fmean(ordered) if ordered else 0.0,
+        "p50_ms": 1000 * ordered[len(ordered) // 2] if ordered else 0.0,
+        "p95_ms": 1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else 0.0,
+        "max_ms": 1000 * ordered[-1] if ordered else 0.0,
+    }
+
+def _timed(function, *args):
+    """Exécute function(*args) sans ses messages et retourne (durée en secondes, résultat)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = function(*args)
+        return time.perf_counter() - start, result
+
+def _read_msg_attachments(msg_data, label, pdfs):
+    """Ouvre un message (bytes ou message imbriqué) et collecte ses PDF, récursivement."""
+    msg = extract_msg.Message(msg_data) if isinstance(msg_data, bytes) else msg_data
+    try:
+        for attachment in msg.attachments:
+            name = (attachment.longFilename or "").rstrip('\x00').lower()
+            if name.endswith(".pdf"):
+                pdfs.append((f"{label}>{name}", attachment.data))
+            elif name.endswith(".msg"):
+                _read_msg_attachments(attachment.data, f"{label}>{name}", pdfs)
+    finally:
+        if isinstance(msg_data, bytes):
+            msg.close()
+
+def run_benchmark(work_folder, messages=50, rows=100000, repeat=3, seed=0, workers=None):
+    """
+    Génère un corpus synthétique puis mesure chaque étape séparément.
+    Pour chaque étape, la meilleure des `repeat` répétitions est retenue
+    (la moins perturbée par le reste de la machine).
+
+    Args:
+        work_folder (str): Dossier de travail (corpus, sorties intermédiaires).
+        messages (int): Nombre de fichiers .msg du corpus.
+        rows (int): Nombre de lignes des fichiers délimités par |.
+        repeat (int): Nombre de répétitions de chaque mesure.
+        seed (int): Graine du corpus (mêmes entrées d'une exécution à l'autre).
+        workers (int): Nombre de processus pour l'étape "pipeline" (None : séquentiel).
+
+    Returns:
+        dict: Paramètres, environnement et statistiques par étape.
+    """
+    corpus_folder = os.path.join(work_folder, "corpus")
+    shutil.rmtree(corpus_folder, ignore_errors=True)
+    print(f"⏳ Génération du corpus ({messages} messages, {rows} lignes)...")
+    corpus = generate_msg_corpus(corpus_folder, messages, seed=seed)
+    consolidated_file = os.path.join(work_folder, "consolide.txt")
+    generate_pipe_file(consolidated_file, rows, ooo.COLUMN_ORDER, "DATE HEURE ENVOI", seed=seed)
+    strict_file = os.path.join(work_folder, "envois.txt")
+    generate_pipe_file(strict_file, rows, ["Date_envoi"] + ooo.COLUMN_ORDER[:10], "Date_envoi", seed=seed,
+                       clean_dates=True)
+
+    msg_files = []
+    for dirpath, _, filenames in os.walk(corpus_folder):
+        msg_files += [os.path.join(dirpath, name) for name in sorted(filenames) if name.endswith(".msg")]
+    msg_data = []
+    for path in msg_files:
+        with open(path, "rb") as f:
+            msg_data.append((path, f.read()))
+
+    def measure(stage):
+        """Meilleure série de durées parmi les répétitions (somme la plus faible)."""
+        runs = [stage() for _ in range(repeat)]
+        return _summarize(min(runs, key=sum))
+
+    stages = {}
+
+    print("⏳ Lecture des messages...")
+    pdfs = []
+    def parse_messages():
+        pdfs.clear()
+        return [_timed(_read_msg_attachments, data, path, pdfs)[0] for path, data in msg_data]
+    stages["lecture_msg"] = measure(parse_messages)
+
+    print("⏳ Extraction du texte des PDF...")
+    texts = []
+    def extract_texts():
+        texts.clear()
+        durations = []
+        for _, pdf_data in pdfs:
+            duration, text = _timed(ooo.extract_text_from_pdf, pdf_data)
+            durations.append(duration)
+            texts.append(text)
+        return durations
+    stages["extract_text_from_pdf"] = measure(extract_texts)
+
+    print("⏳ Application des regex...")
+    infos = {}
+    def extract_infos():
+        durations = []
+        for (label, _), text in zip(pdfs, texts):
+            duration, infos[label] = _timed(ooo.extract_information, text)
+            durations.append(duration)
+        return durations
+    stages["extract_information"] = measure(extract_infos)
+
+    print("⏳ Extraction par modèle (positions des mots)...")
+    with contextlib.redirect_stdout(io.StringIO()):
+        words = [ooo.process_pdf_document(pdf_data, words=True)["words"] for _, pdf_data in pdfs]
+    def extract_layout_infos():
+        return [_timed(ooo.extract_information, text, page_words)[0] for text, page_words in zip(texts, words)]
+    stages["extract_information_layout"] = measure(extract_layout_infos)
+
+    # Les informations extraites sont répétées pour obtenir `rows` lignes
+    labels = list(infos)
+    row_labels = [f"{labels[i % len(labels)]}#{i}" for i in range(rows)] if labels else []
+
+    print("⏳ Écriture du fichier consolidé...")
+    output_file = os.path.join(work_folder, "sortie_consolidee.txt")
+    def save_rows():
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        rows_to_save = {label: dict(infos[label.rsplit("#", 1)[0]]) for label in row_labels}
+        return [_timed(ooo.save_extracted_data_to_txt, rows_to_save, output_file)[0]]
+    stages["save_extracted_data_to_txt"] = measure(save_rows)
+    stages["save_extracted_data_to_txt"]["lignes"] = len(row_labels)
+
+    print("⏳ Suppression des accents...")
+    values = [str(value) for label in row_labels for value in infos[label.rsplit("#", 1)[0]].values()]
+    def strip_accents():
+        return [_timed(lambda: [remove_accents(value) for value in values])[0]]
+    stages["remove_accents"] = measure(strip_accents)
+    stages["remove_accents"]["valeurs"] = len(values)
+
+    print("⏳ Filtres de dates et conversion...")
+    filtered_file = os.path.join(work_folder, "filtre.txt")
+    stages["filter_dates_tgtt"] = measure(lambda: [_timed(tgtt.filter_dates, consolidated_file, filtered_file)[0]])
+    stages["filter_dates_test"] = measure(lambda: [_timed(test.filter_dates, strict_file, filtered_file)[0]])
+    csv_file = os.path.join(work_folder, "consolide.csv")
+    stages["convert_txt_to_csv"] = measure(lambda: [_timed(tet.convert_txt_to_csv, consolidated_file, csv_file)[0]])
+    for name in ("filter_dates_tgtt", "filter_dates_test", "convert_txt_to_csv"):
+        stages[name]["lignes"] = rows
+
+    print("⏳ Traitement complet des messages...")
+    def full_pipeline():
+        output_folder = os.path.join(work_folder, "extraits")
+        results_folder = os.path.join(work_folder, "resultats")
+        for folder in (output_folder, results_folder):
+            shutil.rmtree(folder, ignore_errors=True)
+        ooo.processed_msg_files.clear()
+        return [_timed(ooo.process_msg_files_recursively, corpus_folder, output_folder, results_folder,
+                       workers)[0]]
+    stages["pipeline"] = measure(full_pipeline)
+    stages["pipeline"]["msg_par_s"] = len(msg_files) / stages["pipeline"]["total_s"]
+
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plateforme": platform.platform(),
+        "processeurs": os.cpu_count(),
+        "parametres": {"messages": messages, "lignes": rows, "repetitions": repeat, "graine": seed,
+                       "workers": workers},
+        "corpus": corpus,
+        "etapes": stages,
+    }
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare le temps total de chaque étape avec une exécution de référence.
+
+    Args:
+        baseline (dict): Résultats de référence (run_benchmark).
+        current (dict): Résultats à comparer.
+        threshold (float): Ralentissement relatif à partir duquel une étape est en régression.
+
+    Returns:
+        list: Noms des étapes en régression.
+    """
+    if baseline.get("parametres") != current.get("parametres"):
+        print("⚠️ Les paramètres des deux exécutions diffèrent : la comparaison est indicative.")
+    regressions = []
+    print(f"{'Étape':<30}{'Référence (s)':>15}{'Actuel (s)':>15}{'Écart':>12}")
+    for name, stats in current["etapes"].items():
+        reference = baseline["etapes"].get(name)
+        if reference is None or not reference["total_s"]:
+            print(f"{name:<30}{'-':>15}{stats['total_s']:>15.4f}{'nouveau':>12}")
+            continue
+        change = stats["total_s"] / reference["total_s"] - 1
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = " ⚠️"
+        print(f"{name:<30}{reference['total_s']:>15.4f}{stats['total_s']:>15.4f}{change:>+12.1%}{marker}")
+    return regressions
+
+def save_results(results, results_folder=DEFAULT_RESULTS_FOLDER):
+    """Enregistre les résultats en JSON (un fichier horodaté par exécution) et retourne son chemin."""
+    os.makedirs(results_folder, exist_ok=True)
+    path = os.path.join(results_folder, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return path
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Mesure des performances sur un corpus synthétique")
+    parser.add_argument("--messages", type=int, default=50, help="Nombre de fichiers .msg générés (défaut : 50)")
+    parser.add_argument("--rows", type=int, default=100000,
+                        help="Nombre de lignes des fichiers délimités par | (défaut : 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions de chaque mesure (défaut : 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Graine du corpus synthétique")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Nombre de processus pour le traitement complet (défaut : séquentiel)")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FOLDER,
+                        help=f"Dossier des résultats JSON (défaut : {DEFAULT_RESULTS_FOLDER})")
+    parser.add_argument("--compare", metavar="REFERENCE_JSON",
+                        help="Comparer avec une exécution précédente ; code de sortie 1 en cas de régression")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"Ralentissement signalé comme régression (défaut : {REGRESSION_THRESHOLD:.0%})")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as work_folder:
+        results = run_benchmark(work_folder, args.messages, args.rows, args.repeat, args.seed, args.workers)
+
+    print(f"\n{'Étape':<30}{'n':>8}{'Total (s)':>12}{'p50 (ms)':>12}{'p95 (ms)':>12}{'max (ms)':>12}")
+    for name, stats in results["etapes"].items():
+        print(f"{name:<30}{stats['n']:>8}{stats['total_s']:>12.4f}{stats['p50_ms']:>12.3f}"
+              f"{stats['p95_ms']:>12.3f}{stats['max_ms']:>12.3f}")
+    print(f"\n✅ Résultats enregistrés dans {save_results(results, args.results)}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, results, args.threshold)
+        if regressions:
+            print(f"❌ Régression sur : {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ Aucune régression")
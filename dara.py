@@ -1,21 +1,8 @@
 import os
-import unicodedata
+from text_normalizer import normalize_upper
+from sinks import SqliteSink, TRANSFER_COLUMN_TYPES, TRANSFER_INDEXES
 
-def remove_accents(input_str):
-    """
-    Supprime les accents d'une chaîne de caractères en utilisant unicodedata.
-
-    Args:
-        input_str (str): Chaîne d'entrée.
-
-    Returns:
-        str: Chaîne sans accents.
-    """
-    return ''.join(
-        c for c in unicodedata.normalize('NFD', input_str) if unicodedata.category(c) != 'Mn'
-    )
-
-def write_data_to_txt(data_list, success_data, output_filename="data.pdf.tresorerie1.txt"):
+def write_data_to_txt(data_list, success_data, output_filename="data.pdf.tresorerie1.txt", sqlite_path=None):
     """
     Écrit les données extraites dans un fichier .txt avec | comme délimiteur.
     Les colonnes sont ordonnées selon les exigences fournies, le texte est en majuscules et sans accents.
@@ -24,6 +11,7 @@ def write_data_to_txt(data_list, success_data, output_filename="data.pdf.tresore
         data_list (list): Liste des données extraites, avec chaque élément représentant une page.
         success_data (list): Données des blocs "success" à fusionner avec les données extraites.
         output_filename (str): Nom du fichier de sortie.
+        sqlite_path (str): Base SQLite typée et indexée à alimenter en plus du fichier (optionnel).
     """
     # Ordre des colonnes requis
     column_order = [
@@ -43,20 +31,36 @@ def write_data_to_txt(data_list, success_data, output_filename="data.pdf.tresore
     file_exists = os.path.exists(output_filename)
     is_empty = os.stat(output_filename).st_size == 0 if file_exists else True
 
-    with open(output_filename, 'a', encoding='utf-8') as f:
-        # Écrire l'en-tête si le fichier est vide
-        if is_empty:
-            f.write("|".join(remove_accents(col).upper() for col in column_order) + "\n")
-
-        # Parcourir les données extraites
-        for i, page_data in enumerate(data_list):
-            for page_name, row in page_data.items():
-                # Fusionner avec les données de succès correspondantes (si disponibles)
-                success_info = success_data[i] if i < len(success_data) and isinstance(success_data[i], dict) else {}
-                row.update(success_info)
-
-                # Générer une ligne de données en respectant l'ordre des colonnes
-                line = [remove_accents(str(row.get(col, ""))).upper() for col in column_order]
-                f.write("|".join(line) + "\n")
+    # Base SQLite optionnelle (montants numériques, dates ISO, index de recherche)
+    sqlite_sink = None
+    if sqlite_path is not None:
+        sqlite_sink = SqliteSink(sqlite_path, column_order, column_types=TRANSFER_COLUMN_TYPES,
+                                 indexes=TRANSFER_INDEXES, missing="")
+
+    try:
+        with open(output_filename, 'a', encoding='utf-8') as f:
+            # Écrire l'en-tête si le fichier est vide
+            if is_empty:
+                f.write("|".join(normalize_upper(col) for col in column_order) + "\n")
+
+            # Parcourir les données extraites
+            for i, page_data in enumerate(data_list):
+                for page_name, row in page_data.items():
+                    # Fusionner avec les données de succès correspondantes (si disponibles)
+                    success_info = success_data[i] if i < len(success_data) and isinstance(success_data[i], dict) else {}
+                    row.update(success_info)
+
+                    # Générer une ligne de données en respectant l'ordre des colonnes
+                    line = [normalize_upper(row.get(col, "")) for col in column_order]
+                    f.write("|".join(line) + "\n")
+                    if sqlite_sink is not None:
+                        sqlite_sink.write_row(row)
+    finally:
+        # Fermer la base même si l'écriture échoue
+        if sqlite_sink is not None:
+            sqlite_sink.close()
+
+    if sqlite_sink is not None:
+        print(f"Données enregistrées dans la base {sqlite_path}")
 
     print(f"Données écrites avec succès dans {output_filename}")
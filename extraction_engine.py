@@ -0,0 +1,367 @@
+import hashlib
+import re
+import time
+
+# Dictionnaire de regex : chaque clé correspond à une liste de regex
+PATTERNS = {
+    "Entité": [r"4\s*44\s*=\s*([A-Z\s]+)\n[A-Z\s]+\n",r"AXA\s+[A-Za-zÉÈÊÛÔÎÏ ]+"],
+    "Direction": [r"DIRECTION FINANCIERE\s+SERVICE TRESORERIE",r"Direction\s+[^\n]*"],
+    "contact1AXA": [r"Direction Financière Service Trésorerie\s*([\w\s]+Denis\s+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})",r"Direction Financière – Service Trésorerie\s*\n\s*([^\n]+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})"],
+    "contact2AXA":[r"Direction Financière Service Trésorerie\s*.*?\s*(HAMON Pascal\s+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})",r"Direction Financière – Service Trésorerie\s*\n\s*[^\n]+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2}\s*\n\s*([^\n]+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})"],
+    "contact3AXA":[r"Direction Financière Service Trésorerie[\s\S]*?(VUONG THI Thien\s+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})",r"Direction Financière – Service Trésorerie\s*(?:\n\s*[^\n]+){2}\n\s*([^\n]+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})"],
+    "Destinataire": [r"Mail\s*:\s*[^\n]*\n\s*([^\n]+)"],
+    "Tel Destinataire": [r"Tel\s*:\s*(\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})"],
+    "Fax Destinataire": [r"Fax\s*:\s*(\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})"],
+    "Date Document": [r"(?:\ble\b|\bon\b)\s*(\d{2}/\d{2}/\d{4})"],
+    "Référence": [r"Notre référence\s*/\s*Our reference:\s*(\d+)"],
+    "Compte à débiter": [r"Par le débit de notre\s+compte n°\s*/\s*From\s+our bank\s+account number\s+([A-Z]{2}\d{2}(?:\s?[A-Z0-9]{4}){5}\s?[A-Z0-9]{3})\s+Swift:",r"Par le débit de notre compte n°\s*/\s*From\s+our bank account number\s+([A-Z]{2}\d{2}(?:\s?[A-Z0-9]{4}){5}\s?[A-Z0-9]{3})\s+Swift:",r"Par le débit de notre compte n°\s*/\s*From\s+our bank account number\s*([A-Z]{2}\d{2}(?:\s\d{4}){5}\s\d{3})",r"Par le débit de notre\s*compte n°\s*/\s*From our\s*bank account number\s*([A-Z]{2}\d{2}(?:\s\d{4}){4})",r"Par le débit de notre\s*compte n°\s*/\s*From our bank\s*account number\s*([A-Z]{2}\d{2}(?:\s\d{4}){4})",r"Par le débit de notre compte\s*n°\s*/\s*From our bank account\s*number\s*([A-Z]{2}\d{2}(?:\s\d{4}){4})",r"Par le débit de notre compte n°\s*/\s*From\s*our bank account number\s*([A-Z]{2}\d{2}(?:\s\d{4}){4})",r"Par le débit de notre compte n°\s*/\s*From our bank account\s*number\s*([A-Z]{2}\d{2}(?:\s\d{4}){4})",r"Par le débit de notre\s*compte n°\s*/\s*From our bank\s*account number\s*([A-Z]{2}\d{2}(?:\s\d{4}){5})",r"bank account number\s*(\w{2}\d{2}\s\d{4}\s\d{4}\s\d{4}\s\d{4}\s\d{4}\s\d{3})",r"Par le débit de notre compte n°\s*/\s*From our bank account\s*number\s*([A-Z]{2}\d{2}(?:\s\d{4}){5})",r"Par le débit de notre compte\s*n°\s*/\s*From our bank account\s*number\s*([A-Z]{2}\d{2}(?:\s\d{4}){5})"],
+    "SWIFT": [r"Swift:\s*([A-Z0-9]+)"],
+    "Titulaire de compte": [r"Swift:\s*[A-Z0-9]+\s*(.*)"],
+    "Montant décaissement": [r"Veuillez virer la somme\s*de\s*/\s*Please transfer the\s*amount of\s*([\d,]+\.\d{2})",r"Veuillez virer la somme de\s*/\s*Please\s*transfer the amount of\s*\n\s*([\d,]+\.\d{2})",r"Veuillez virer la somme de\s*/\s*Please transfer the\s*amount of\s*([\d.,]+)",r"transfer the amount of\s*\n\s*(\d{1,3}(?:\s\d{3})*,\d{2})",r"Veuillez virer la somme de\s*/\s*Please transfer the amount\s*of\s*\n\s*([\d,]+\.\d{2})"],
+    "Devise": [r"Veuillez virer la somme de\s*/\s*Please\s*transfer the amount of\s*[\d\s,.]+\s([A-Z]{3})",r"Veuillez virer la somme\s*de\s*/\s*Please transfer the\s*amount of\s*[\d,]+\.\d{2}\s([A-Z]{3})",r"Veuillez virer la somme de\s*/\s*Please\s*transfer the amount of\s*\n\s*[\d,]+\.\d{2}\s([A-Z]+)",r"Veuillez virer la somme de\s*/\s*Please transfer the amount\s*of\s*\n\s*[^\d\n]*[\d,]+\.[\d]{2}\s([^\s]+)"], 
+    "Date valeur compensée": [r"Date de valeur\s*compensée\s*/\s*Compensated value\s*date\s*(\d{2}/\d{2}/\d{4})",r"Date de valeur\s*compensée\s*/\s*Compensated value date\s*([\d/]+)"],
+    "Bénéficiaire": [r"Nom bénéficiaire\s*/\s*Beneficiary name\s*IBAN\s*/\s*IBAN\s*(.*)",r"IBAN / IBAN\s*\n\s*([^\n]+)"],
+    "IBAN Bénéficiaire": [r"IBAN\s*/\s*IBAN[\s\S]*?AXA FRANCE VIE[\s\S]*?HO[\s\S]*?(FR\d{2}(?:\s?\d{4}){5}\s?[A-Z0-9]{3})[\s\S]*?Banque bénéficiaire\s*/\s*Beneficiary[\s\S]*?bank[\s\S]*?Code Swift\s*/\s*Swift code",r"IBAN\s*/\s*IBAN\s+AXA FRANCE VIE\s+HO\s+([A-Z]{2}\d{2}(?:\s\d{4}){5}\s[A-Z0-9]{3})\s+Banque bénéficiaire\s*/\s*Beneficiary bank\s+Code Swift\s*/\s*Swift code",r"IBAN\s*/\s*IBAN[\s\S]*?([A-Z]{2}\d{2}[A-Z0-9]+)",r"Nom bénéficiaire\s*/\s*Beneficiary name\s*IBAN\s*/\s*IBAN[\s\S]*?(FR\d{2}\s\d{4}\s\d{4}\s\d{4}\s\d{4}\s\d{3})",r"IBAN / IBAN\s+[^\n]*\n[^\n]*\n([A-Z]{2}\d{2}(?:\s\d{4}){5})"],
+    "Banque Bénéficiaire": [r"Banque bénéficiaire\s*/\s*Beneficiary bank\s*Code Swift\s*/\s*Swift code\s*(\w+)",r"Banque bénéficiaire\s*/\s*Beneficiary\s*bank\s*Code Swift\s*/\s*Swift code\s*([A-Z]{4})"],
+    "Swift Bénéficiaire": [r"Banque bénéficiaire\s*/\s*Beneficiary bank\s*Code Swift\s*/\s*Swift code[\s\S]*?([A-Z]{4}[A-Z0-9]{3,})",r"Code Swift\s*/\s*Swift code\s*(?:\n\s*[^\n]*){1,2}\s*([A-Z]{8}[A-Z0-9]{3})"],
+    "Motif du paiement": [r"Référence à indiquer sur le\s+virement -Détail Réf de\s+l['’]opération\s*/\s*Transfer\s+reference\s*([A-Z0-9]+)",r"Motif du paiement\s*/\s*Payment purpose\s*/\s*Transfer reference\s*([^\s]+)",r"Détail Réf de l['’]opération\s*/\s*Transfer reference\s*(.*)",r"Détail Réf de l['’]opération\s*/\s*Transfer\s*reference\s*([^\s]+)"],
+    "Référence de l'opération": [r"Détail Réf de l['’]opération\s*/\s*Transfer reference[\s\S]*?(Transfer id\s*\d+\s.*)",r"Transfer id[^\n]*"],
+    "Signataire1": [r"Signatures autorisées\s*/\s*Authorized signatures[\s\S]*?(\b[A-Z]+\s[A-Z]+\s[A-Za-z]+)",r"Signatures autorisées\s*/\s*Authorized signatures\s*\n\s*([^\n]+)"],
+    "Signataire2": [r"Signatures autorisées\s*/\s*Authorized signatures[\s\S]*\s([A-Z]+\s[A-Za-z]+(?:\s[A-Za-z]+)*)\s*$",r"Signatures autorisées\s*/\s*Authorized signatures[\s\S]*?\n\s*([A-Z]+\s[A-Z]+\s[A-Za-z]+)\s*\n\s*([A-Z]+\s[A-Z]+\s[A-Za-z]+)",r"Signatures autorisées / Authorized signatures\s*(?:.*\n){1}\s*(.*)"]
+}
+
+# Préfiltres littéraux par champ : si aucun de ces littéraux n'apparaît dans le texte
+# (en minuscules), aucune regex du champ ne peut correspondre et le champ est ignoré.
+FIELD_PREFILTERS = {
+    "Entité": ("44", "axa"),
+    "Direction": ("direction",),
+    "contact1AXA": ("trésorerie",),
+    "contact2AXA": ("trésorerie",),
+    "contact3AXA": ("trésorerie",),
+    "Destinataire": ("mail",),
+    "Tel Destinataire": ("tel",),
+    "Fax Destinataire": ("fax",),
+    "Date Document": ("/",),
+    "Référence": ("notre référence",),
+    "Compte à débiter": ("account",),
+    "SWIFT": ("swift:",),
+    "Titulaire de compte": ("swift:",),
+    "Montant décaissement": ("amount",),
+    "Devise": ("amount",),
+    "Date valeur compensée": ("compensated value",),
+    "Bénéficiaire": ("iban",),
+    "IBAN Bénéficiaire": ("iban",),
+    "Banque Bénéficiaire": ("swift code",),
+    "Swift Bénéficiaire": ("swift code",),
+    "Motif du paiement": ("reference",),
+    "Référence de l'opération": ("transfer id",),
+    "Signataire1": ("authorized signatures",),
+    "Signataire2": ("authorized signatures",),
+}
+
+# En-têtes des sections du formulaire de virement, repérés en une seule passe
+SECTION_HEADERS = {
+    "direction": r"Direction\s+Financière",
+    "montant": r"Veuillez\s+virer\s+la\s+somme",
+    "beneficiaire": r"Nom\s+bénéficiaire",
+    "banque": r"Banque\s+bénéficiaire",
+    "signatures": r"Signatures\s+autorisées",
+}
+
+# Début d'un formulaire : ligne d'en-tête de la direction émettrice ("Direction Financière
+# – Service Trésorerie", "DIRECTION FINANCIERE SERVICE TRESORERIE", "Direction de la
+# trésorerie"...). Dans un PDF de plusieurs formulaires, aucune fenêtre ne la dépasse.
+FORM_START = r"^[ \t]*direction\b"
+
+# Champ -> (section de début, section de fin incluse). La fenêtre de recherche du champ
+# va de l'en-tête de début jusqu'à l'en-tête qui suit la section de fin, sans dépasser
+# le début du formulaire suivant. Les champs absents de ce dictionnaire, ou dont la
+# section de début est absente du texte, sont recherchés dans tout le texte.
+FIELD_SECTIONS = {
+    "contact1AXA": ("direction", "direction"),
+    "contact2AXA": ("direction", "direction"),
+    "contact3AXA": ("direction", "direction"),
+    "Montant décaissement": ("montant", "montant"),
+    "Devise": ("montant", "montant"),
+    "Bénéficiaire": ("beneficiaire", "beneficiaire"),
+    "IBAN Bénéficiaire": ("beneficiaire", "banque"),
+    "Banque Bénéficiaire": ("banque", "banque"),
+    "Swift Bénéficiaire": ("banque", "banque"),
+    "Signataire1": ("signatures", "signatures"),
+    "Signataire2": ("signatures", "signatures"),
+}
+
+# Variantes connues du formulaire, reconnues à des marqueurs littéraux (en minuscules,
+# tous présents dans le texte). Pour chaque variante, "patterns" donne, pour les champs
+# dont la chaîne de repli dépend de la mise en page, les indices des regex de PATTERNS
+# propres à cette mise en page (dans l'ordre de PATTERNS) : ce sont les seules appliquées.
+# Les regex écartées visent les libellés de l'autre mise en page ; elles ne sont essayées
+# qu'en repli, si aucune regex de la variante ne correspond, ce qui donne le résultat de
+# la chaîne complète. Un document d'une variante inconnue, ou dont les pages relèvent de
+# plusieurs variantes, reçoit la chaîne complète de chaque champ.
+#
+# Le format du montant (1,234.56 ou 1 234,56) ne définit pas de variante : aucun libellé
+# ne le distingue (les deux suivent "Veuillez virer la somme de"), et pour un montant
+# 1 234,56 la chaîne complète retient la regex n° 2, qui précède celle du format
+# français ; n'appliquer que cette dernière changerait les montants extraits. Les
+# documents CAIPB partenariat / rachat n'ont pas de marqueurs connus à ce jour : ils
+# sont comptés comme variante inconnue.
+FORM_VARIANTS = {
+    # Contacts sous "Direction Financière – Service Trésorerie", libellé "Détail Réf de l'opération"
+    "tresorerie_tiret": {
+        "markers": ("direction financière – service trésorerie",),
+        "patterns": {"contact1AXA": (1,), "contact2AXA": (1,), "contact3AXA": (1,),
+                     "Motif du paiement": (0, 2, 3)},
+    },
+    # Contacts sur la ligne de "Direction Financière Service Trésorerie" (sans tiret),
+    # libellés "Motif du paiement" et "IBAN / IBAN" sans ligne "Nom bénéficiaire" ni "HO"
+    "tresorerie_sans_tiret": {
+        "markers": ("direction financière service trésorerie",),
+        "patterns": {"contact1AXA": (0,), "contact2AXA": (0,), "contact3AXA": (0,),
+                     "Motif du paiement": (1,), "Bénéficiaire": (1,), "IBAN Bénéficiaire": (2, 3, 4)},
+    },
+}
+
+# Colonne des résultats indiquant la variante du formulaire
+VARIANT_FIELD = "VARIANTE"
+VARIANT_UNKNOWN = "inconnue"
+
+# Taille maximale d'une fenêtre de section, pour borner le coût des regex [\s\S]*?
+SECTION_MAX_CHARS = 3000
+
+# Nom réservé, dans la liste des en-têtes repérés, aux débuts de formulaire
+FORM_START_NAME = "debut_formulaire"
+
+class SectionLocator:
+    """
+    Repère les en-têtes connus du formulaire (une seule passe) et les débuts de
+    formulaire, puis calcule, pour un champ, les fenêtres de texte (début, fin)
+    dans lesquelles le chercher.
+    """
+
+    def __init__(self, headers, field_sections, form_start=FORM_START, max_chars=SECTION_MAX_CHARS):
+        self.regex = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in headers.items()))
+        self.form_regex = re.compile(form_start, re.IGNORECASE | re.MULTILINE)
+        self.field_sections = field_sections
+        self.max_chars = max_chars
+
+    def locate(self, text):
+        """
+        Retourne la liste triée des en-têtes et débuts de formulaire trouvés :
+        [(position, nom_de_section ou FORM_START_NAME), ...].
+        """
+        headers = [(match.start(), match.lastgroup) for match in self.regex.finditer(text)]
+        headers += [(match.start(), FORM_START_NAME) for match in self.form_regex.finditer(text)]
+        return sorted(headers)
+
+    def windows(self, key, headers, text_length):
+        """
+        Calcule les fenêtres (début, fin) d'un champ à partir des en-têtes repérés :
+        une par occurrence de l'en-tête de début, dans l'ordre du texte (une page de
+        garde peut citer le libellé avant le formulaire, un PDF peut contenir plusieurs
+        formulaires). Une fenêtre s'arrête à l'en-tête qui suit la section de fin, au
+        début du formulaire suivant, et au plus à max_chars caractères. Si la section
+        de début est absente, la seule fenêtre est tout le texte.
+        """
+        sections = self.field_sections.get(key)
+        if sections is None:
+            return [(0, text_length)]
+        start_section, end_section = sections
+
+        windows = []
+        for start, name in headers:
+            if name != start_section:
+                continue
+            # Fin du formulaire : début du formulaire suivant
+            form_end = next((pos for pos, name in headers if pos > start and name == FORM_START_NAME),
+                            text_length)
+            # Dernier en-tête couvert par la fenêtre : la section de fin si elle suit le début
+            # dans le même formulaire
+            last = next((pos for pos, name in headers if start <= pos < form_end and name == end_section),
+                        start)
+            end = next((pos for pos, _ in headers if pos > last), text_length)
+            windows.append((start, min(end, form_end, start + self.max_chars)))
+        return windows or [(0, text_length)]
+
+class ExtractionEngine:
+    """
+    Moteur d'extraction des champs d'un ordre de virement.
+
+    Toutes les regex sont compilées une seule fois à la construction. Pour chaque
+    champ, un préfiltre littéral permet d'ignorer toute la chaîne de regex de repli
+    lorsque le texte ne contient pas le libellé correspondant. La variante du
+    formulaire est reconnue une fois par document, et seules les regex de cette
+    variante sont appliquées (le reste de la chaîne ne sert qu'en repli).
+    """
+
+    def __init__(self, patterns, prefilters=None, flags=re.MULTILINE, section_locator=None, variants=None):
+        """
+        Args:
+            patterns (dict): Champ -> liste de regex, essayées dans l'ordre.
+            prefilters (dict): Champ -> littéraux (en minuscules) dont au moins un
+                               doit apparaître dans le texte.
+            flags (int): Options de compilation des regex.
+            section_locator (SectionLocator): Restreint la recherche de certains champs
+                                              à la fenêtre de leur section.
+            variants (dict): Variante -> {"markers": littéraux, "patterns": champ -> indices
+                             des regex de la variante}, voir FORM_VARIANTS.
+        """
+        prefilters = prefilters or {}
+        self.section_locator = section_locator
+        # Instrumentation optionnelle : (champ, index de regex) -> [appels, succès, temps cumulé, pire temps]
+        self.profile = False
+        self.stats = {}
+        self.patterns = patterns
+        # Chaque regex est conservée avec son indice dans PATTERNS (profil des regex).
+        # Champ : (clé, préfiltres, regex appliquées, regex de repli)
+        self.fields = [
+            (key, tuple(literal.lower() for literal in prefilters.get(key, ())),
+             [(index, re.compile(pattern, flags)) for index, pattern in enumerate(regex_list)], [])
+            for key, regex_list in patterns.items()
+        ]
+        # Jeux de regex par variante : (nom, marqueurs, champs au format de self.fields)
+        variants = variants or {}
+        self.variants = []
+        for name, spec in variants.items():
+            selected = spec["patterns"]
+            # Regex de la variante dans l'ordre de la chaîne ; les autres ne sont essayées que si
+            # aucune ne correspond, le résultat est alors celui de la chaîne complète
+            variant_fields = []
+            for key, literals, regex_list, fallback in self.fields:
+                if key in selected:
+                    fallback = [item for item in regex_list if item[0] not in selected[key]]
+                    regex_list = [item for item in regex_list if item[0] in selected[key]]
+                variant_fields.append((key, literals, regex_list, fallback))
+            self.variants.append((name, tuple(marker.lower() for marker in spec["markers"]), variant_fields))
+        # Version du jeu de regex, utilisée pour invalider les résultats en cache
+        sections = (section_locator.regex.pattern, section_locator.form_regex.pattern,
+                    section_locator.field_sections, section_locator.max_chars) if section_locator else None
+        self.version = hashlib.sha256(
+            repr((patterns, prefilters, flags, sections, variants)).encode()
+        ).hexdigest()[:16]
+
+    def fingerprint(self, lowered):
+        """
+        Reconnaît la variante du formulaire à ses marqueurs littéraux.
+
+        Args:
+            lowered (str): Texte du document en minuscules.
+
+        Returns:
+            tuple: (nom de la variante, champs à appliquer), ou (None, tous les champs)
+                   si aucune variante connue ne correspond, ou si plusieurs correspondent
+                   (pages de mises en page différentes).
+        """
+        matches = [(name, variant_fields) for name, markers, variant_fields in self.variants
+                   if all(marker in lowered for marker in markers)]
+        if len(matches) == 1:
+            return matches[0]
+        return None, self.fields
+
+    def extract(self, text, strip=True, fields=None):
+        """
+        Applique les regex pour extraire les informations importantes du texte PDF.
+
+        Args:
+            text (str): Texte du document.
+            strip (bool): Supprimer les espaces autour des valeurs extraites.
+            fields (collection): Champs à extraire (par défaut, tous les champs).
+
+        Returns:
+            dict: Champ -> valeur extraite, "Non trouvé" si aucune regex ne correspond,
+                  et la variante du formulaire (VARIANT_FIELD, VARIANT_UNKNOWN si inconnue).
+        """
+        extracted_data = {}
+        lowered = text.lower()
+        text_length = len(text)
+        headers = self.section_locator.locate(text) if self.section_locator else None
+        variant, variant_fields = self.fingerprint(lowered)
+
+        for key, literals, regex_list, fallback in variant_fields:
+            if fields is not None and key not in fields:
+                continue
+            extracted_data[key] = "Non trouvé"  # Valeur par défaut si aucune regex ne fonctionne
+            if literals and not any(literal in lowered for literal in literals):
+                continue
+            if headers is not None:
+                windows = self.section_locator.windows(key, headers, text_length)
+            else:
+                windows = [(0, text_length)]
+            # Pas de repli sur tout le texte pour un champ dont la section a été repérée :
+            # les regex [\s\S]*? y retrouveraient un coût non borné
+            for start, end in windows:
+                value = self._search(key, regex_list, text, start, end)
+                if value is None and fallback:
+                    value = self._search(key, fallback, text, start, end)
+                if value is not None:
+                    extracted_data[key] = value.strip() if strip else value
+                    break
+
+        extracted_data[VARIANT_FIELD] = variant or VARIANT_UNKNOWN
+        return extracted_data
+
+    def _search(self, key, regex_list, text, start, end):
+        """Valeur de la première regex de la chaîne qui correspond dans text[start:end], ou None."""
+        for index, regex in regex_list:
+            if self.profile:
+                started = time.perf_counter()
+                match = regex.search(text, start, end)
+                self._record(key, index, match is not None, time.perf_counter() - started)
+            else:
+                match = regex.search(text, start, end)
+            if match:
+                try:
+                    return match.group(1)
+                except IndexError:
+                    return match.group(0)
+        return None
+
+    def _record(self, key, index, hit, elapsed):
+        entry = self.stats.get((key, index))
+        if entry is None:
+            entry = self.stats[(key, index)] = [0, 0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += hit
+        entry[2] += elapsed
+        entry[3] = max(entry[3], elapsed)
+
+    def pop_stats(self):
+        """Retourne les statistiques accumulées depuis le dernier appel et les réinitialise."""
+        stats, self.stats = self.stats, {}
+        return stats
+
+def merge_pattern_stats(total, stats):
+    """
+    Ajoute des statistiques de regex (par exemple celles d'un processus du pool)
+    au dictionnaire total.
+    """
+    for key, (calls, hits, elapsed, worst) in stats.items():
+        entry = total.setdefault(key, [0, 0, 0.0, 0.0])
+        entry[0] += calls
+        entry[1] += hits
+        entry[2] += elapsed
+        entry[3] = max(entry[3], worst)
+    return total
+
+def write_pattern_report(stats, output_path, patterns=None):
+    """
+    Écrit le rapport des regex classées par temps cumulé décroissant : nombre d'appels,
+    taux de succès, temps cumulé et pire temps pour chaque champ et chaque regex de repli.
+    """
+    patterns = patterns or PATTERNS
+    ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+    with open(output_path, "w", encoding="utf-8") as report:
+        report.write("Profil des regex d'extraction\n")
+        report.write("=============================\n\n")
+        report.write("Rang|Champ|Regex n°|Appels|Succès|Taux de succès|Temps cumulé (ms)|Pire temps (ms)|Regex\n")
+        for rank, ((key, index), (calls, hits, elapsed, worst)) in enumerate(ranked, start=1):
+            rate = hits / calls * 100 if calls else 0.0
+            pattern = patterns.get(key, [])[index] if index < len(patterns.get(key, [])) else ""
+            report.write(
+                f"{rank}|{key}|{index}|{calls}|{hits}|{rate:.1f}%|{elapsed * 1000:.2f}|{worst * 1000:.3f}|{pattern}\n"
+            )
+
+# Instance partagée par ooo.py et pdf_regex.py
+ENGINE = ExtractionEngine(PATTERNS, FIELD_PREFILTERS,
+                          section_locator=SectionLocator(SECTION_HEADERS, FIELD_SECTIONS),
+                          variants=FORM_VARIANTS)
@@ -0,0 +1,60 @@
+import os
+from collections import namedtuple
+
+# Fichier d'entrée recensé : chemin, taille en octets, date de modification
+ManifestEntry = namedtuple("ManifestEntry", ["path", "size", "mtime"])
+
+def scan_msg_files(root_folder, extension=".msg"):
+    """
+    Parcourt une seule fois l'arborescence avec os.scandir et recense les fichiers
+    .msg avec leur taille et leur date de modification (sans rouvrir les fichiers).
+
+    L'ordre est celui de os.walk : les fichiers d'un dossier, puis ses sous-dossiers
+    dans l'ordre du système de fichiers. Les liens symboliques vers des dossiers ne
+    sont pas suivis et les dossiers illisibles sont ignorés, comme avec os.walk.
+
+    Args:
+        root_folder (str): Dossier racine.
+        extension (str): Extension recherchée (insensible à la casse).
+
+    Returns:
+        list[ManifestEntry]: Manifeste des fichiers trouvés.
+    """
+    manifest = []
+    pending = [root_folder]
+    while pending:
+        folder = pending.pop()
+        try:
+            with os.scandir(folder) as entries:
+                entries = list(entries)
+        except OSError:
+            continue
+
+        subfolders = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if not entry.is_symlink():
+                    subfolders.append(entry.path)
+            elif entry.name.lower().endswith(extension):
+                try:
+                    stat = entry.stat()
+                    manifest.append(ManifestEntry(entry.path, stat.st_size, stat.st_mtime))
+                except OSError:
+                    manifest.append(ManifestEntry(entry.path, 0, 0.0))
+
+        # Pile : les sous-dossiers sont empilés à l'envers pour être visités dans l'ordre
+        pending.extend(reversed(subfolders))
+    return manifest
+
+def largest_first(manifest):
+    """
+    Retourne les indices du manifeste du plus gros au plus petit fichier, pour que
+    les messages les plus longs à traiter partent en premier dans le pool et que
+    la fin du traitement ne soit pas retardée par un gros fichier resté en queue.
+    À taille égale, l'ordre du parcours est conservé.
+    """
+    return sorted(range(len(manifest)), key=lambda index: -manifest[index].size)
@@ -0,0 +1,214 @@
+import hashlib
+import re
+from bisect import bisect_right
+from itertools import accumulate, groupby
+from operator import itemgetter
+
+from text_normalizer import fold_latin_accents
+
+# Modèle déclaratif du formulaire d'ordre de virement : pour chaque champ, le ou les
+# libellés possibles (essayés dans l'ordre) et la zone où lire la valeur par rapport
+# au libellé :
+#   "right"          : suite de la ligne du libellé ;
+#   "below"          : `lines` lignes suivantes (par défaut 1), en ne gardant que les
+#                      mots situés à droite du début du libellé si "column" est vrai ;
+#   "right_or_below" : suite de la ligne si la valeur y est, sinon les lignes suivantes.
+# La valeur est la première correspondance de la regex "value" dans la zone (groupe 1
+# s'il existe). Les libellés sont comparés sans accents, casse ni espaces, ce qui
+# couvre les coupures de ligne et les espacements variables du texte extrait.
+LAYOUT_TEMPLATE = {
+    "Tel Destinataire": {"labels": ("Tel :",), "region": "right", "value": r"\d{2}(?: \d{2}){4}"},
+    "Fax Destinataire": {"labels": ("Fax :",), "region": "right", "value": r"\d{2}(?: \d{2}){4}"},
+    "Référence": {"labels": ("Our reference:",), "region": "right", "value": r"\d+"},
+    "Compte à débiter": {"labels": ("From our bank account number",), "region": "right",
+                         "value": r"[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){4,5}(?: ?[A-Z0-9]{3}\b)?"},
+    "SWIFT": {"labels": ("Swift:",), "region": "right", "value": r"[A-Z0-9]+"},
+    "Montant décaissement": {"labels": ("Please transfer the amount of",), "region": "right_or_below",
+                             "value": r"\d{1,3}(?:,\d{3})*\.\d{2}|\d{1,3}(?: \d{3})*,\d{2}|\d[\d.,]*"},
+    "Devise": {"labels": ("Please transfer the amount of",), "region": "right_or_below",
+               "value": r"\d[\d .,]*\s([A-Z]{3})\b"},
+    "Date valeur compensée": {"labels": ("Compensated value date",), "region": "right_or_below",
+                              "value": r"\d{2}/\d{2}/\d{4}"},
+    "Bénéficiaire": {"labels": ("Beneficiary name IBAN / IBAN", "IBAN / IBAN"), "region": "right_or_below",
+                     "value": r"\S.*"},
+    "IBAN Bénéficiaire": {"labels": ("IBAN / IBAN",), "region": "below", "lines": 3,
+                          "value": r"[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){4,5}(?: ?[A-Z0-9]{1,3}\b)?"},
+    "Banque Bénéficiaire": {"labels": ("Beneficiary bank Code Swift / Swift code",), "region": "right_or_below",
+                            "value": r"\w+"},
+    "Swift Bénéficiaire": {"labels": ("Code Swift / Swift code",), "region": "below", "lines": 2,
+                           "column": True, "value": r"\b([A-Z]{4}[A-Z0-9]{3,})\b"},
+    "Motif du paiement": {"labels": ("Payment purpose / Transfer reference", "Transfer reference"),
+                          "region": "right_or_below", "value": r"\S+"},
+    "Signataire1": {"labels": ("Authorized signatures",), "region": "below", "value": r"\S.*"},
+    "Signataire2": {"labels": ("Authorized signatures",), "region": "below", "lines": 2,
+                    "value": r"^.*\n(\S.*)"},
+}
+
+_word_text = itemgetter(4)
+
+def _normalize_token(text):
+    return fold_latin_accents(text.lower())
+
+def _compact_label(label):
+    """Libellé comparé sans accents, casse ni espaces."""
+    return "".join(_normalize_token(label).split())
+
+class _Line:
+    """Ligne visuelle : mots d'une même page alignés verticalement, de gauche à droite."""
+
+    __slots__ = ("page", "top", "bottom", "words")
+
+    def __init__(self, page, top, bottom, words):
+        self.page = page
+        self.top = top
+        self.bottom = bottom
+        self.words = words
+
+def build_lines(pages_words):
+    """
+    Regroupe les mots en lignes visuelles d'après leurs coordonnées. Les lignes
+    détectées par PyMuPDF (même bloc, même ligne) sont fusionnées lorsque leurs
+    milieux verticaux sont à moins d'une demi-hauteur de ligne l'un de l'autre,
+    par exemple deux cellules d'un tableau sur la même rangée.
+
+    Args:
+        pages_words (list): Pour chaque page, les mots (x0, y0, x1, y1, texte, bloc, ligne, n°)
+                            renvoyés par PyMuPDF (TextPage.extractWORDS).
+
+    Returns:
+        list[_Line]: Lignes dans l'ordre de lecture (pages, puis haut en bas).
+    """
+    lines = []
+    for page_number, words in enumerate(pages_words):
+        # Lignes de PyMuPDF : mots consécutifs de même (bloc, ligne)
+        fragments = []
+        for _, group in groupby(words, key=itemgetter(5, 6)):
+            group = list(group)
+            fragments.append((group[0][1] + group[0][3], group[0][1], group[0][3], group))
+        fragments.sort(key=itemgetter(0))
+
+        page_lines = []
+        for middle, top, bottom, group in fragments:
+            if page_lines:
+                line = page_lines[-1]
+                if abs(middle - (line.top + line.bottom)) <= line.bottom - line.top:
+                    line.words.extend(group)
+                    line.words.sort(key=itemgetter(0))
+                    continue
+            page_lines.append(_Line(page_number, top, bottom, group))
+        lines.extend(page_lines)
+    return lines
+
+class LayoutExtractor:
+    """
+    Extraction des champs à partir des positions des mots (PyMuPDF) et d'un modèle
+    déclaratif : chaque libellé est repéré par une seule recherche dans les mots,
+    puis la valeur est lue dans la zone voisine par une petite regex appliquée
+    à quelques mots, au lieu de parcourir tout le texte avec les regex de repli.
+    """
+
+    def __init__(self, template=LAYOUT_TEMPLATE):
+        self.template = template
+        self.fields = []
+        labels = set()
+        for key, spec in template.items():
+            compact_labels = tuple(_compact_label(label) for label in spec["labels"])
+            labels.update(compact_labels)
+            self.fields.append((key, compact_labels, spec["region"], spec.get("lines", 1),
+                                spec.get("column", False), re.compile(spec["value"], re.MULTILINE)))
+        # Un libellé est cherché dans les mots normalisés séparés par \x00, en tolérant
+        # une séparation entre deux caractères quelconques, du début d'un mot à la fin
+        # d'un autre : une seule recherche (en C) par libellé dans tout le document
+        self.label_regexes = {
+            label: re.compile(re.escape(label[0]) + r"(?<![^\x00]" + re.escape(label[0]) + ")"
+                              + "".join("\x00?" + re.escape(char) for char in label[1:]) + r"(?![^\x00])")
+            for label in sorted(labels)
+        }
+        # Version du modèle, utilisée pour invalider les résultats en cache
+        self.version = hashlib.sha256(repr(sorted(template.items())).encode()).hexdigest()[:16]
+
+    def _locate_labels(self, lines):
+        """
+        Repère la première occurrence de chaque libellé dans les mots du document.
+
+        Returns:
+            dict: Libellé -> (ligne, indice du premier mot, ligne, indice du dernier mot).
+        """
+        # Normalisation ligne par ligne (la plupart des lignes sont en ASCII)
+        line_texts = []
+        for line in lines:
+            joined = "\x00".join(map(_word_text, line.words))
+            normalized = _normalize_token(joined)
+            if len(normalized) != len(joined):
+                # Normalisation qui change la longueur d'un caractère : mot par mot
+                normalized = "\x00".join(_normalize_token(word[4]) for word in line.words)
+            line_texts.append(normalized)
+        normalized = "\x00".join(line_texts)
+        line_starts = [0, *accumulate(len(line.words) for line in lines)]
+
+        def position(offset):
+            # Indice du mot : nombre de séparateurs avant la position
+            token = normalized.count("\x00", 0, offset)
+            line_index = bisect_right(line_starts, token) - 1
+            return line_index, token - line_starts[line_index]
+
+        found = {}
+        for label, regex in self.label_regexes.items():
+            match = regex.search(normalized)
+            if match is not None:
+                found[label] = position(match.start()) + position(match.end() - 1)
+        return found
+
+    def extract(self, pages_words):
+        """
+        Args:
+            pages_words (list): Mots de chaque page (voir build_lines).
+
+        Returns:
+            dict: Champ -> valeur pour les champs trouvés ; les champs absents ne
+                  figurent pas dans le dictionnaire.
+        """
+        lines = build_lines(pages_words)
+        found = self._locate_labels(lines)
+
+        extracted_data = {}
+        for key, labels, region, line_count, column, value_regex in self.fields:
+            for label in labels:
+                location = found.get(label)
+                if location is None:
+                    continue
+                value = self._read_value(lines, location, region, line_count, column, value_regex)
+                if value is not None:
+                    extracted_data[key] = value
+                    break
+        return extracted_data
+
+    @staticmethod
+    def _read_value(lines, location, region, line_count, column, value_regex):
+        first_line, first_word, last_line, last_word = location
+        if region in ("right", "right_or_below"):
+            match = value_regex.search(" ".join(word[4] for word in lines[last_line].words[last_word + 1:]))
+            if match is not None or region == "right":
+                return _match_value(match, value_regex)
+
+        # Lignes suivantes de la même page
+        page = lines[last_line].page
+        below = [line.words for line in lines[last_line + 1:last_line + 1 + line_count] if line.page == page]
+        if column:
+            # Mots sous le libellé et à sa droite (colonne du formulaire), puis lignes entières
+            left = lines[first_line].words[first_word][0]
+            match = value_regex.search("\n".join(" ".join(word[4] for word in words if word[2] > left)
+                                                 for words in below))
+            if match is not None:
+                return _match_value(match, value_regex)
+        return _match_value(value_regex.search("\n".join(" ".join(word[4] for word in words) for words in below)),
+                            value_regex)
+
+def _match_value(match, value_regex):
+    """Valeur d'une correspondance (groupe 1 s'il existe), None si aucune."""
+    if match is None:
+        return None
+    return (match.group(1) if value_regex.groups else match.group(0)).strip()
+
+# Instance partagée par ooo.py
+LAYOUT_EXTRACTOR = LayoutExtractor()
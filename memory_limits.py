@@ -0,0 +1,59 @@
+import os
+import sys
+
+DEFAULT_MEMORY_LIMIT_MB = 1024  # Plafond de mémoire résidente d'un processus de traitement
+DEFAULT_WORKER_MAX_MESSAGES = 500  # Messages traités par processus du pool avant son remplacement
+
+def _windows_rss_bytes():
+    """Mémoire résidente (working set) du processus courant sous Windows, via psapi."""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    get_process_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+    get_process_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    handle = ctypes.windll.kernel32.GetCurrentProcess()
+    if not get_process_memory_info(handle, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+def current_rss_mb():
+    """
+    Mémoire résidente du processus courant, en Mo.
+
+    Returns:
+        float: Mémoire résidente, ou None si elle ne peut pas être mesurée sur ce système.
+    """
+    if sys.platform == "win32":
+        try:
+            rss_bytes = _windows_rss_bytes()
+        except (OSError, AttributeError):
+            return None
+        return rss_bytes / (1024 * 1024) if rss_bytes is not None else None
+
+    # Linux : deuxième champ de /proc/self/statm, en pages
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+
+    # Autres systèmes : pic de mémoire résidente (ko sous Linux, octets sous macOS)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def over_limit(rss_mb, memory_limit_mb):
+    """Vrai si la mémoire mesurée dépasse le plafond (None : pas de plafond ou pas de mesure)."""
+    return memory_limit_mb is not None and rss_mb is not None and rss_mb > memory_limit_mb
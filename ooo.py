@@ -2,26 +2,93 @@ import os
 import io
 import fitz  # PyMuPDF
 import extract_msg
-import re
 import hashlib
 from pathlib import Path
 import shutil
 import os
-import unicodedata
+import gc
+import time
+from multiprocessing import util as multiprocessing_util
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pdf_cache import DedupTable, attachment_hash, open_pdf_cache
+from attachment_types import ATTACHMENT_MSG, ATTACHMENT_PDF, classify_attachment
+from extraction_engine import (ENGINE, VARIANT_FIELD, VARIANT_UNKNOWN, merge_pattern_stats,
+                               write_pattern_report)
+from layout_extraction import LAYOUT_EXTRACTOR
+from artifact_store import ARTIFACT_SUMMARY, open_artifact_store
+from input_manifest import largest_first, scan_msg_files
+from run_stats import (STAGE_CLASSIFY, STAGE_OPEN, STAGE_PDF, STAGE_REGEX, STAGE_SCAN, STAGE_WRITE,
+                       ProgressLine, RunStats, add_time)
+from pipeline import DEFAULT_QUEUE_DEPTH, DEFAULT_READ_WORKERS, WriterStage, prefetch_files
+from run_journal import JOURNAL_FILENAME, RunJournal
+from memory_limits import DEFAULT_MEMORY_LIMIT_MB, DEFAULT_WORKER_MAX_MESSAGES, current_rss_mb, over_limit
+from sinks import PipeRowSink, SqliteSink, TeeSink, TRANSFER_COLUMN_TYPES, TRANSFER_INDEXES
+from text_normalizer import normalize_upper
 
-def remove_accents(input_str):
+processed_msg_files = set()  # Ensemble pour suivre les fichiers .msg déjà traités
+worker_dedup = None  # PDF déjà traités par ce processus du pool, créée par _init_pool_worker
+verbose = False  # Journal détaillé de chaque message et pièce jointe (sinon : ligne de progression)
+
+def log(message):
+    """Affiche un message du journal détaillé, seulement si verbose est activé."""
+    if verbose:
+        print(message)
+
+# Nombre maximal d'empreintes mémorisées pour renseigner la colonne "Doublon de"
+DUPLICATE_INDEX_MAX_ENTRIES = 200000
+
+# Nom du fichier consolidé dans le dossier des résultats (lu par tgtt, trtr et tet)
+CONSOLIDATED_FILENAME = "donnees_extraites_consolidees.txt"
+
+# Ordre des colonnes du fichier consolidé, à partir des clés possibles dans extract_information
+COLUMN_ORDER = [
+    "OBJET", "Expediteur", "DATE HEURE ENVOI", "N PAGE", "Mail destinataire",
+    "Entité", "Direction", "contact1AXA", "contact2AXA", "contact3AXA",
+    "Destinataire", "Tel Destinataire", "Fax Destinataire", "Date Document",
+    "Référence", "Compte à débiter", "SWIFT", "Titulaire de compte",
+    "Montant décaissement", "Devise", "Date valeur compensée", "Bénéficiaire",
+    "IBAN Bénéficiaire", "Banque Bénéficiaire", "Swift Bénéficiaire",
+    "Motif du paiement", "Référence de l'opération", "Signataire1", "Signataire2", "NOM DU PDF",
+    "Doublon de", VARIANT_FIELD
+]
+
+def clean_value(value):
+    """Nettoie une valeur pour le fichier consolidé (supprimer accents et mettre en majuscules)."""
+    return normalize_upper(value)
+
+def open_consolidated_sink(output_filename, flush_every=100, sqlite_path=None):
     """
-    Supprime les accents d'une chaîne de caractères en utilisant unicodedata.
+    Ouvre l'écriture incrémentale du fichier consolidé (en-tête écrit si le fichier est vide).
+    Si sqlite_path est fourni, les lignes sont aussi enregistrées dans une base SQLite
+    typée et indexée (IBAN, compte, dates) pour les recherches de rapprochement.
+    """
+    sink = PipeRowSink(output_filename, COLUMN_ORDER, normalize=clean_value, flush_every=flush_every)
+    if sqlite_path is None:
+        return sink
+    return TeeSink(sink, SqliteSink(sqlite_path, COLUMN_ORDER, column_types=TRANSFER_COLUMN_TYPES,
+                                    indexes=TRANSFER_INDEXES))
+
+def mark_duplicate(info, document_path, first_documents):
+    """
+    Renseigne la colonne "Doublon de" d'une ligne : chemin du premier document au
+    contenu identique, ou vide pour une première occurrence. L'empreinte transmise
+    dans info["_sha256"] est retirée de la ligne.
+
     Args:
-        input_str (str): Chaîne d'entrée.
-    Returns:
-        str: Chaîne sans accents.
+        info (dict): Informations extraites d'un PDF.
+        document_path (str): Chemin complet du document (message>pièce jointe).
+        first_documents (DedupTable): Premier document rencontré pour chaque empreinte.
     """
-    return ''.join(
-        c for c in unicodedata.normalize('NFD', str(input_str)) if unicodedata.category(c) != 'Mn'
-    )
+    pdf_hash = info.pop("_sha256", None)
+    first_path = first_documents.get(pdf_hash) if pdf_hash is not None else None
+    if first_path is None:
+        info["Doublon de"] = ""
+        if pdf_hash is not None:
+            first_documents.put(pdf_hash, document_path)
+    else:
+        info["Doublon de"] = first_path
 
-def save_extracted_data_to_txt(all_extracted_info, output_filename="extracted_data.txt"):
+def save_extracted_data_to_txt(all_extracted_info, output_filename="extracted_data.txt", sqlite_path=None):
     """
     Sauvegarde les données extraites par les regex dans un fichier texte avec | comme délimiteur.
     Ajoute également le chemin du fichier PDF source.
@@ -30,42 +97,16 @@ def save_extracted_data_to_txt(all_extracted_info, output_filename="extracted_da
         all_extracted_info (dict): Dictionnaire où les clés sont les noms des fichiers PDF 
                                   et les valeurs sont les dictionnaires de données extraites.
         output_filename (str): Chemin du fichier de sortie.
+        sqlite_path (str): Base SQLite à alimenter en plus du fichier texte (optionnel).
     """
-    # Définir l'ordre des colonnes à partir des clés possibles dans extract_information
-    column_order = [
-        "OBJET", "Expediteur", "DATE HEURE ENVOI", "N PAGE", "Mail destinataire",
-        "Entité", "Direction", "contact1AXA", "contact2AXA", "contact3AXA",
-        "Destinataire", "Tel Destinataire", "Fax Destinataire", "Date Document",
-        "Référence", "Compte à débiter", "SWIFT", "Titulaire de compte",
-        "Montant décaissement", "Devise", "Date valeur compensée", "Bénéficiaire",
-        "IBAN Bénéficiaire", "Banque Bénéficiaire", "Swift Bénéficiaire",
-        "Motif du paiement", "Référence de l'opération", "Signataire1", "Signataire2", "NOM DU PDF"
-    ]
-    
-    # Vérifier si le fichier existe pour déterminer si l'en-tête doit être écrit
-    file_exists = os.path.exists(output_filename)
-    is_empty = not file_exists or os.stat(output_filename).st_size == 0
-    
-    with open(output_filename, 'a', encoding='utf-8') as f:
-        # Écrire l'en-tête si le fichier est vide
-        if is_empty:
-            f.write("|".join(remove_accents(col).upper() for col in column_order) + "\n")
-        
+    first_documents = DedupTable(max_entries=DUPLICATE_INDEX_MAX_ENTRIES)
+    with open_consolidated_sink(output_filename, sqlite_path=sqlite_path) as sink:
         # Parcourir les données extraites
         for pdf_path, data in all_extracted_info.items():
             # Ajouter le chemin du PDF aux données
             data["NOM DU PDF"] = pdf_path
-            
-            # Générer une ligne de données en respectant l'ordre des colonnes
-            line = []
-            for col in column_order:
-                value = data.get(col, "Non trouvé")
-                # Nettoyer la valeur (supprimer accents et mettre en majuscules)
-                cleaned_value = remove_accents(value).upper()
-                line.append(cleaned_value)
-            
-            # Écrire la ligne dans le fichier
-            f.write("|".join(line) + "\n")
+            mark_duplicate(data, pdf_path, first_documents)
+            sink.write_row(data)
     
     print(f"✅ Données sauvegardées avec succès dans {output_filename}")
 
@@ -99,93 +140,217 @@ def create_safe_path(base_dir, relative_path, filename):
     # Return full path with safe filename
     return path / sanitize_filename(filename)
 
-def extract_information(text):
+# Version du jeu de regex, utilisée pour invalider les résultats en cache
+PATTERNS_VERSION = ENGINE.version
+# Version de l'extraction par positions (modèle du formulaire, puis regex pour les champs restants)
+LAYOUT_VERSION = f"{ENGINE.version}+{LAYOUT_EXTRACTOR.version}"
+
+# Nombre de pages à partir duquel un PDF est découpé en tranches extraites en parallèle
+PAGE_PARALLEL_THRESHOLD = 100
+
+_page_executors = {}  # Pools d'extraction par pages déjà créés dans ce processus, par nombre de processus
+
+def extract_information(text, words=None):
     """
     Applique les regex pour extraire les informations importantes du texte PDF.
-    """
-    extracted_data = {}
-
-    # Dictionnaire de regex : chaque clé correspond à une liste de regex
-    patterns = {
-        "Entité": [r"4\s*44\s*=\s*([A-Z\s]+)\n[A-Z\s]+\n",r"AXA\s+[A-Za-zÉÈÊÛÔÎÏ ]+"],
-        "Direction": [r"DIRECTION FINANCIERE\s+SERVICE TRESORERIE",r"Direction\s+[^\n]*"],
-        "contact1AXA": [r"Direction Financière Service Trésorerie\s*([\w\s]+Denis\s+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})",r"Direction Financière – Service Trésorerie\s*\n\s*([^\n]+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})"],
-        "contact2AXA":[r"Direction Financière Service Trésorerie\s*.*?\s*(HAMON Pascal\s+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})",r"Direction Financière – Service Trésorerie\s*\n\s*[^\n]+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2}\s*\n\s*([^\n]+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})"],
-        "contact3AXA":[r"Direction Financière Service Trésorerie[\s\S]*?(VUONG THI Thien\s+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})",r"Direction Financière – Service Trésorerie\s*(?:\n\s*[^\n]+){2}\n\s*([^\n]+\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})"],
-        "Destinataire": [r"Mail\s*:\s*[^\n]*\n\s*([^\n]+)"],
-        "Tel Destinataire": [r"Tel\s*:\s*(\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})"],
-        "Fax Destinataire": [r"Fax\s*:\s*(\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2})"],
-        "Date Document": [r"(?:\ble\b|\bon\b)\s*(\d{2}/\d{2}/\d{4})"],
-        "Référence": [r"Notre référence\s*/\s*Our reference:\s*(\d+)"],
-        "Compte à débiter": [r"Par le débit de notre\s+compte n°\s*/\s*From\s+our bank\s+account number\s+([A-Z]{2}\d{2}(?:\s?[A-Z0-9]{4}){5}\s?[A-Z0-9]{3})\s+Swift:",r"Par le débit de notre compte n°\s*/\s*From\s+our bank account number\s+([A-Z]{2}\d{2}(?:\s?[A-Z0-9]{4}){5}\s?[A-Z0-9]{3})\s+Swift:",r"Par le débit de notre compte n°\s*/\s*From\s+our bank account number\s*([A-Z]{2}\d{2}(?:\s\d{4}){5}\s\d{3})",r"Par le débit de notre\s*compte n°\s*/\s*From our\s*bank account number\s*([A-Z]{2}\d{2}(?:\s\d{4}){4})",r"Par le débit de notre\s*compte n°\s*/\s*From our bank\s*account number\s*([A-Z]{2}\d{2}(?:\s\d{4}){4})",r"Par le débit de notre compte\s*n°\s*/\s*From our bank account\s*number\s*([A-Z]{2}\d{2}(?:\s\d{4}){4})",r"Par le débit de notre compte n°\s*/\s*From\s*our bank account number\s*([A-Z]{2}\d{2}(?:\s\d{4}){4})",r"Par le débit de notre compte n°\s*/\s*From our bank account\s*number\s*([A-Z]{2}\d{2}(?:\s\d{4}){4})",r"Par le débit de notre\s*compte n°\s*/\s*From our bank\s*account number\s*([A-Z]{2}\d{2}(?:\s\d{4}){5})",r"bank account number\s*(\w{2}\d{2}\s\d{4}\s\d{4}\s\d{4}\s\d{4}\s\d{4}\s\d{3})",r"Par le débit de notre compte n°\s*/\s*From our bank account\s*number\s*([A-Z]{2}\d{2}(?:\s\d{4}){5})",r"Par le débit de notre compte\s*n°\s*/\s*From our bank account\s*number\s*([A-Z]{2}\d{2}(?:\s\d{4}){5})"],
-        "SWIFT": [r"Swift:\s*([A-Z0-9]+)"],
-        "Titulaire de compte": [r"Swift:\s*[A-Z0-9]+\s*(.*)"],
-        "Montant décaissement": [r"Veuillez virer la somme\s*de\s*/\s*Please transfer the\s*amount of\s*([\d,]+\.\d{2})",r"Veuillez virer la somme de\s*/\s*Please\s*transfer the amount of\s*\n\s*([\d,]+\.\d{2})",r"Veuillez virer la somme de\s*/\s*Please transfer the\s*amount of\s*([\d.,]+)",r"transfer the amount of\s*\n\s*(\d{1,3}(?:\s\d{3})*,\d{2})",r"Veuillez virer la somme de\s*/\s*Please transfer the amount\s*of\s*\n\s*([\d,]+\.\d{2})"],
-        "Devise": [r"Veuillez virer la somme de\s*/\s*Please\s*transfer the amount of\s*[\d\s,.]+\s([A-Z]{3})",r"Veuillez virer la somme\s*de\s*/\s*Please transfer the\s*amount of\s*[\d,]+\.\d{2}\s([A-Z]{3})",r"Veuillez virer la somme de\s*/\s*Please\s*transfer the amount of\s*\n\s*[\d,]+\.\d{2}\s([A-Z]+)",r"Veuillez virer la somme de\s*/\s*Please transfer the amount\s*of\s*\n\s*[^\d\n]*[\d,]+\.[\d]{2}\s([^\s]+)"], 
-        "Date valeur compensée": [r"Date de valeur\s*compensée\s*/\s*Compensated value\s*date\s*(\d{2}/\d{2}/\d{4})",r"Date de valeur\s*compensée\s*/\s*Compensated value date\s*([\d/]+)"],
-        "Bénéficiaire": [r"Nom bénéficiaire\s*/\s*Beneficiary name\s*IBAN\s*/\s*IBAN\s*(.*)",r"IBAN / IBAN\s*\n\s*([^\n]+)"],
-        "IBAN Bénéficiaire": [r"IBAN\s*/\s*IBAN[\s\S]*?AXA FRANCE VIE[\s\S]*?HO[\s\S]*?(FR\d{2}(?:\s?\d{4}){5}\s?[A-Z0-9]{3})[\s\S]*?Banque bénéficiaire\s*/\s*Beneficiary[\s\S]*?bank[\s\S]*?Code Swift\s*/\s*Swift code",r"IBAN\s*/\s*IBAN\s+AXA FRANCE VIE\s+HO\s+([A-Z]{2}\d{2}(?:\s\d{4}){5}\s[A-Z0-9]{3})\s+Banque bénéficiaire\s*/\s*Beneficiary bank\s+Code Swift\s*/\s*Swift code",r"IBAN\s*/\s*IBAN[\s\S]*?([A-Z]{2}\d{2}[A-Z0-9]+)",r"Nom bénéficiaire\s*/\s*Beneficiary name\s*IBAN\s*/\s*IBAN[\s\S]*?(FR\d{2}\s\d{4}\s\d{4}\s\d{4}\s\d{4}\s\d{3})",r"IBAN / IBAN\s+[^\n]*\n[^\n]*\n([A-Z]{2}\d{2}(?:\s\d{4}){5})"],
-        "Banque Bénéficiaire": [r"Banque bénéficiaire\s*/\s*Beneficiary bank\s*Code Swift\s*/\s*Swift code\s*(\w+)",r"Banque bénéficiaire\s*/\s*Beneficiary\s*bank\s*Code Swift\s*/\s*Swift code\s*([A-Z]{4})"],
-        "Swift Bénéficiaire": [r"Banque bénéficiaire\s*/\s*Beneficiary bank\s*Code Swift\s*/\s*Swift code[\s\S]*?([A-Z]{4}[A-Z0-9]{3,})",r"Code Swift\s*/\s*Swift code\s*(?:\n\s*[^\n]*){1,2}\s*([A-Z]{8}[A-Z0-9]{3})"],
-        "Motif du paiement": [r"Référence à indiquer sur le\s+virement -Détail Réf de\s+l'opération\s*/\s*Transfer\s+reference\s*([A-Z0-9]+)",r"Motif du paiement\s*/\s*Payment purpose\s*/\s*Transfer reference\s*([^\s]+)",r"Détail Réf de l'opération\s*/\s*Transfer reference\s*(.*)",r"Détail Réf de l'opération\s*/\s*Transfer\s*reference\s*([^\s]+)"],
-        "Référence de l'opération": [r"Détail Réf de l'opération\s*/\s*Transfer reference[\s\S]*?(Transfer id\s*\d+\s.*)",r"Transfer id[^\n]*"],
-        "Signataire1": [r"Signatures autorisées\s*/\s*Authorized signatures[\s\S]*?(\b[A-Z]+\s[A-Z]+\s[A-Za-z]+)",r"Signatures autorisées\s*/\s*Authorized signatures\s*\n\s*([^\n]+)"],
-        "Signataire2": [r"Signatures autorisées\s*/\s*Authorized signatures[\s\S]*\s([A-Z]+\s[A-Za-z]+(?:\s[A-Za-z]+)*)\s*$",r"Signatures autorisées\s*/\s*Authorized signatures[\s\S]*?\n\s*([A-Z]+\s[A-Z]+\s[A-Za-z]+)\s*\n\s*([A-Z]+\s[A-Z]+\s[A-Za-z]+)",r"Signatures autorisées / Authorized signatures\s*(?:.*\n){1}\s*(.*)"]
-    }
-
-    # Appliquer les regex pour chaque clé
-    for key, regex_list in patterns.items():
-        extracted_data[key] = "Non trouvé"  # Valeur par défaut si aucune regex ne fonctionne
-        for pattern in regex_list:
-            match = re.search(pattern, text, re.MULTILINE)
-            if match:
-                try:
-                    extracted_data[key] = match.group(1).strip()
-                except IndexError:
-                    extracted_data[key] = match.group(0).strip()
-                break  # Arrête de tester une fois qu'une regex a fonctionné
+    Les regex sont compilées une seule fois dans le moteur partagé ENGINE.
 
+    Si les mots positionnés de chaque page sont fournis (words), les champs du
+    modèle du formulaire sont d'abord lus à côté de leur libellé (LAYOUT_EXTRACTOR) ;
+    les regex ne sont appliquées qu'aux champs que le modèle n'a pas trouvés.
+    """
+    if words is None:
+        return ENGINE.extract(text)
+    layout_info = LAYOUT_EXTRACTOR.extract(words)
+    missing = [key for key in ENGINE.patterns if key not in layout_info]
+    # Même sans champ manquant, le moteur reconnaît la variante du formulaire
+    regex_info = ENGINE.extract(text, fields=missing)
+    extracted_data = {key: layout_info[key] if key in layout_info else regex_info[key] for key in ENGINE.patterns}
+    extracted_data[VARIANT_FIELD] = regex_info[VARIANT_FIELD]
     return extracted_data
 
-def extract_text_from_pdf(pdf_data):
+def _extract_page_range(pdf_bytes, start, end):
     """
-    Extrait le texte d'un fichier PDF à partir de ses données binaires.
+    Extrait le texte des pages [start, end) d'un PDF (exécuté dans un processus du pool).
+    Retourne les textes lus et l'éventuelle erreur, pour conserver les pages déjà lues.
     """
-    text = ""
+    pages = []
+    try:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+            for page_number in range(start, end):
+                pages.append(pdf_document[page_number].get_text())
+    except Exception as e:
+        return pages, str(e)
+    return pages, None
+
+def shutdown_page_executors():
+    """Arrête les pools d'extraction par pages créés dans ce processus."""
+    while _page_executors:
+        _, executor = _page_executors.popitem()
+        executor.shutdown()
+
+def _get_page_executor(page_workers):
+    """
+    Crée une seule fois par processus le pool d'extraction par pages, arrêté à la
+    fin du processus. Un processus du pool de messages se termine sans exécuter
+    les fonctions atexit, et attend ses processus fils : l'arrêt est enregistré
+    comme finaliseur de multiprocessing, avant la fermeture des files du pool
+    (priorité 10), sans quoi un processus renouvelé resterait bloqué.
+    """
+    if page_workers not in _page_executors:
+        if not _page_executors:
+            multiprocessing_util.Finalize(None, shutdown_page_executors, exitpriority=100)
+        _page_executors[page_workers] = ProcessPoolExecutor(max_workers=page_workers)
+    return _page_executors[page_workers]
+
+def _extract_pages_in_parallel(pdf_bytes, page_count, page_workers, pages):
+    """
+    Découpe le document en tranches de pages contiguës, extraites chacune dans un
+    processus qui rouvre le PDF à partir des mêmes données. Les textes sont
+    ajoutés à pages dans l'ordre ; en cas d'erreur, les pages qui précèdent
+    l'erreur y restent.
+    """
+    range_size = -(-page_count // page_workers)
+    starts = list(range(0, page_count, range_size))
+    ends = [min(start + range_size, page_count) for start in starts]
+    
+    executor = _get_page_executor(page_workers)
+    for range_pages, error in executor.map(_extract_page_range, [pdf_bytes] * len(starts), starts, ends):
+        pages.extend(range_pages)
+        if error is not None:
+            raise RuntimeError(error)
+
+def process_pdf_document(pdf_data, page_workers=None, page_threshold=PAGE_PARALLEL_THRESHOLD, words=False):
+    """
+    Ouvre un PDF une seule fois et en extrait le nombre de pages, le texte de
+    chaque page et les métadonnées.
+
+    Args:
+        pdf_data (bytes | io.BytesIO): Données binaires du PDF.
+        page_workers (int): Nombre de processus pour extraire en parallèle les pages
+                            des gros documents. None ou 1 pour une lecture séquentielle.
+        page_threshold (int): Nombre de pages à partir duquel le document est découpé
+                              en tranches ; les petits PDF restent lus dans ce processus.
+        words (bool): Relever aussi les mots et leurs positions (extraction par modèle),
+                      avec la même analyse de page que le texte. Non disponible pour
+                      les documents extraits en parallèle.
+
+    Returns:
+        dict: {"page_count": int, "pages": list[str], "metadata": dict, "words": list | None}.
+              En cas d'erreur, les pages déjà lues sont conservées.
+    """
+    document = {"page_count": 0, "pages": [], "metadata": {}, "words": None}
     try:
         with fitz.open(stream=pdf_data, filetype="pdf") as pdf_document:
-            for page in pdf_document:
-                text += page.get_text()
+            document["page_count"] = len(pdf_document)
+            document["metadata"] = pdf_document.metadata or {}
+            if page_workers and page_workers > 1 and document["page_count"] >= page_threshold:
+                pdf_bytes = pdf_data.getvalue() if isinstance(pdf_data, io.BytesIO) else bytes(pdf_data)
+                _extract_pages_in_parallel(pdf_bytes, document["page_count"], page_workers, document["pages"])
+            elif words:
+                document["words"] = []
+                for page in pdf_document:
+                    text_page = page.get_textpage()
+                    document["pages"].append(text_page.extractText())
+                    document["words"].append(text_page.extractWORDS())
+            else:
+                for page in pdf_document:
+                    document["pages"].append(page.get_text())
     except Exception as e:
         print(f"❌ Erreur lors de la lecture du PDF : {e}")
     
-    return text
+    return document
+
+def extract_text_from_pdf(pdf_data):
+    """
+    Extrait le texte d'un fichier PDF à partir de ses données binaires.
+    """
+    return "".join(process_pdf_document(pdf_data)["pages"])
+
+def _extract_pdf_info(pdf_text, numero_pages, cached, cache, pdf_hash, seen=None, words=None):
+    """
+    Applique les regex au texte d'un PDF, sauf si les informations sont déjà connues :
+    document identique déjà vu pendant l'exécution (seen) ou résultat en cache pour
+    la version courante des regex. Met à jour le cache et l'entrée de déduplication.
+    words : mots positionnés des pages, pour l'extraction par modèle (voir extract_information).
+    """
+    if seen is not None and seen["info"] is not None:
+        return dict(seen["info"])
+    if cached is not None and cached["info"] is not None:
+        extracted_info = dict(cached["info"])
+    else:
+        extracted_info = extract_information(pdf_text, words)
+        if cache is not None:
+            cache.put(pdf_hash, pdf_text, numero_pages, extracted_info)
+    if seen is not None:
+        seen["info"] = dict(extracted_info)
+    return extracted_info
+
+def _add_message_fields(extracted_info, objet, expediteur, date, numero_pages, mail_destinataire):
+    """Ajoute les informations du message au dictionnaire des informations extraites d'un PDF."""
+    extracted_info["OBJET"] = objet
+    extracted_info["Expediteur"] = expediteur
+    extracted_info["DATE HEURE ENVOI"] = date
+    extracted_info["N PAGE"] = str(numero_pages)
+    extracted_info["Mail destinataire"] = mail_destinataire
 
-def extract_and_process_pdfs_from_msg(msg_path, output_dir, results_dir):
+def extract_and_process_pdfs_from_msg(msg_path, output_dir, results_dir, cache=None,
+                                      msg_name=None, depth=0, save_nested_msg_files=False,
+                                      page_workers=None, page_threshold=PAGE_PARALLEL_THRESHOLD,
+                                      artifact_store=None, dedup_table=None, timings=None, layout=False):
     """
     Extrait les fichiers PDF d'un fichier .msg, applique les regex et gère les fichiers imbriqués.
     Retourne un dictionnaire contenant les informations extraites de chaque PDF.
-    """
-    depth = 0
 
+    Args:
+        msg_path: Chemin du fichier .msg, ses données binaires (bytes ou BytesIO)
+                  ou un message imbriqué déjà ouvert par extract_msg.
+        cache (PdfCache): Cache optionnel des textes et informations extraites,
+                          indexé par l'empreinte SHA-256 de chaque PDF.
+        msg_name (str): Nom du message lorsqu'il ne provient pas d'un chemin
+                        (ex. "parent.msg>imbrique.msg").
+        depth (int): Profondeur d'imbrication courante.
+        save_nested_msg_files (bool): Option de débogage : écrire aussi les .msg
+                                      imbriqués dans output_dir. Ils sont de toute
+                                      façon analysés directement en mémoire.
+        page_workers (int): Nombre de processus pour extraire les pages des gros PDF.
+        page_threshold (int): Nombre de pages à partir duquel un PDF est extrait en parallèle.
+        artifact_store (ArtifactStore): Magasin où enregistrer le texte et les informations
+                                        de chaque PDF au lieu de fichiers séparés.
+        dedup_table (DedupTable): Documents déjà traités pendant l'exécution, par empreinte :
+                                  une copie identique réutilise leur texte et leurs informations.
+        timings (dict): Temps cumulé par étape (voir run_stats), complété par ce message
+                        et ses messages imbriqués.
+        layout (bool): Lire les champs du formulaire d'après la position des mots
+                       (LAYOUT_EXTRACTOR), les regex ne servant qu'aux champs restants.
+    """
     max_depth = 5
 
     if depth > max_depth:
         print(f"⚠️ Profondeur maximale de récursion atteinte ({max_depth}). Arrêt de la récursion.")
         return {}
 
+    # Nom du message pour les journaux et les dossiers de résultats
+    is_path = isinstance(msg_path, (str, os.PathLike))
+    msg_label = str(msg_path) if is_path else (msg_name or "message_imbrique.msg")
     
-    processed_msg_files.add(msg_path)  # Marquer le fichier comme traité
+    processed_msg_files.add(msg_label)  # Marquer le fichier comme traité
     
     # Dictionnaire pour stocker les informations extraites par PDF
     all_extracted_info = {}
+    start = time.perf_counter()
+    
+    # Un message ouvert ici (chemin ou données) est fermé dès la fin de son traitement ;
+    # un message imbriqué, déjà ouvert, est fermé avec son message parent
+    owns_msg = is_path or isinstance(msg_path, (io.BytesIO, bytes))
+    msg = None
 
     try:
-        # Vérifier si le msg_path est un BytesIO ou un chemin de fichier
-        if isinstance(msg_path, io.BytesIO) or isinstance(msg_path, bytes):
+        # Ouvrir depuis un chemin ou des données en mémoire ; un message imbriqué est déjà ouvert
+        if owns_msg:
             msg = extract_msg.Message(msg_path)
         else:
-            msg = extract_msg.Message(msg_path)
+            msg = msg_path
         
         # Extraction des informations du message
         objet = msg.subject
@@ -193,131 +358,187 @@ def extract_and_process_pdfs_from_msg(msg_path, output_dir, results_dir):
         expediteur = msg.sender 
         mail_destinataire = msg.to
         
-        print(f"📧 Informations du message :")
-        print(f"  📌 Objet: {objet}")
-        print(f"  📅 Date: {date}")
-        print(f"  👤 Expéditeur: {expediteur}")
-        print(f"  👥 Destinataire: {mail_destinataire}")
+        log(f"📧 Informations du message :")
+        log(f"  📌 Objet: {objet}")
+        log(f"  📅 Date: {date}")
+        log(f"  👤 Expéditeur: {expediteur}")
+        log(f"  👥 Destinataire: {mail_destinataire}")
         
     except Exception as e:
-        print(f"❌ Erreur lors de l'ouverture de {msg_path} : {e}")
-        return {}
-    
-    # Vérifier si des pièces jointes existent
-    if not hasattr(msg, 'attachments') or not msg.attachments:
-        print(f"Aucune pièce jointe trouvée dans {msg_path}.")
+        print(f"❌ Erreur lors de l'ouverture de {msg_label} : {e}")
+        if owns_msg and msg is not None:
+            msg.close()
+        add_time(timings, STAGE_OPEN, start)
         return {}
     
-    # Créer le sous-dossier pour les résultats basé sur le chemin du .msg
-    base_msg_name = os.path.basename(msg_path)
-    # Utiliser un hash pour les noms longs
-    if len(base_msg_name) > 50:
-        hash_obj = hashlib.md5(base_msg_name.encode())
-        base_msg_name = hash_obj.hexdigest()[:10] + "_msg"
-    
-    msg_results_dir = os.path.join(results_dir, sanitize_filename(base_msg_name + "_results"))
-    os.makedirs(msg_results_dir, exist_ok=True)
-    
-    for attachment in msg.attachments:
-        if not attachment.longFilename:
-            print("⚠️ Pièce jointe sans nom détectée. Ignorée.")
-            continue
-            
-        filename = attachment.longFilename.rstrip('\x00').lower()
-        safe_filename = sanitize_filename(filename)
+    try:
+        # Vérifier si des pièces jointes existent
+        if not hasattr(msg, 'attachments') or not msg.attachments:
+            log(f"Aucune pièce jointe trouvée dans {msg_label}.")
+            add_time(timings, STAGE_OPEN, start)
+            return {}
+        start = add_time(timings, STAGE_OPEN, start)
         
-        if filename.endswith('.pdf'):
-            print(f"📄 PDF trouvé : {filename}")
-            
-            # Extraction du texte du PDF
-            pdf_data = io.BytesIO(attachment.data)
-            
-            # Comptage du nombre de pages du PDF
-            numero_pages = 0
-            try:
-                with fitz.open(stream=pdf_data, filetype="pdf") as pdf_document:
-                    numero_pages = len(pdf_document)
-                    pdf_data.seek(0)  # Réinitialiser le curseur pour la lecture suivante
-            except Exception as e:
-                print(f"⚠️ Erreur lors du comptage des pages PDF : {e}")
+        # Créer le sous-dossier pour les résultats basé sur le chemin du .msg
+        base_msg_name = os.path.basename(msg_label)
+        # Utiliser un hash pour les noms longs
+        if len(base_msg_name) > 50:
+            hash_obj = hashlib.md5(base_msg_name.encode())
+            base_msg_name = hash_obj.hexdigest()[:10] + "_msg"
+        
+        msg_results_dir = os.path.join(results_dir, sanitize_filename(base_msg_name + "_results"))
+        if artifact_store is None:
+            os.makedirs(msg_results_dir, exist_ok=True)
+        
+        for attachment in msg.attachments:
+            start = time.perf_counter()
+            if not attachment.longFilename:
+                print("⚠️ Pièce jointe sans nom détectée. Ignorée.")
+                continue
+                
+            filename = attachment.longFilename.rstrip('\x00').lower()
+            safe_filename = sanitize_filename(filename)
             
-            pdf_text = extract_text_from_pdf(pdf_data)
+            # Type déterminé par la signature du contenu, sans analyse complète
+            attachment_type = classify_attachment(filename, attachment.data)
+            start = add_time(timings, STAGE_CLASSIFY, start)
             
-            if pdf_text.strip():
-                # Sauvegarder le texte extrait
-                txt_output_path = os.path.join(output_dir, f"{safe_filename}_extracted_text.txt")
-                try:
-                    with open(txt_output_path, "w", encoding="utf-8") as text_file:
-                        text_file.write(pdf_text)
-                except (OSError, IOError) as e:
-                    print(f"⚠️ Erreur lors de l'écriture du fichier texte: {e}")
-                    # Sauvegarder dans un chemin plus court en cas d'erreur
-                    alt_output_path = os.path.join(output_dir, f"{hashlib.md5(filename.encode()).hexdigest()[:10]}_text.txt")
-                    with open(alt_output_path, "w", encoding="utf-8") as text_file:
-                        text_file.write(pdf_text)
-                    txt_output_path = alt_output_path
+            if attachment_type == ATTACHMENT_PDF:
+                log(f"📄 PDF trouvé : {filename}")
                 
-                # Appliquer les regex pour extraire des informations
-                extracted_info = extract_information(pdf_text)
+                # Empreinte du contenu : doublons déjà vus pendant l'exécution, puis cache persistant
+                pdf_hash = attachment_hash(attachment.data)
+                # Mode et version de l'extraction dans la clé : pas de réutilisation d'un mode à l'autre
+                dedup_key = (pdf_hash, LAYOUT_VERSION if layout else PATTERNS_VERSION)
+                seen = dedup_table.get(dedup_key) if dedup_table is not None else None
+                cached = cache.get(pdf_hash) if cache is not None and seen is None else None
+                if layout and cached is not None and cached["info"] is None:
+                    # Texte en cache sans informations à jour : l'extraction par modèle a besoin des mots
+                    cached = None
+                words = None
                 
-                # Ajouter les informations du message au dictionnaire des informations extraites
-                extracted_info["OBJET"] = objet
-                extracted_info["Expediteur"] = expediteur
-                extracted_info["DATE HEURE ENVOI"] = date
-                extracted_info["N PAGE"] = str(numero_pages)
-                extracted_info["Mail destinataire"] = mail_destinataire
+                if seen is not None:
+                    log(f"♻️ Doublon de {seen['source']} : texte et informations réutilisés pour {filename}")
+                    numero_pages = seen["page_count"]
+                    pdf_text = seen["text"]
+                elif cached is not None:
+                    log(f"♻️ Résultat en cache pour {filename}")
+                    numero_pages = cached["page_count"]
+                    pdf_text = cached["text"]
+                else:
+                    # Comptage des pages et extraction du texte en une seule ouverture du PDF,
+                    # directement sur les octets de la pièce jointe (sans copie dans un BytesIO)
+                    pdf_document = process_pdf_document(attachment.data, page_workers, page_threshold, words=layout)
+                    numero_pages = pdf_document["page_count"]
+                    pdf_text = "".join(pdf_document["pages"])
+                    words = pdf_document["words"]
                 
-                all_extracted_info[filename] = extracted_info
+                # Première occurrence de ce contenu : la mémoriser pour les copies suivantes
+                if seen is None and dedup_table is not None:
+                    seen = {"source": f"{msg_label}>{filename}", "page_count": numero_pages,
+                            "text": pdf_text, "info": None}
+                    dedup_table.put(dedup_key, seen, len(pdf_text))
+                start = add_time(timings, STAGE_PDF, start)
                 
-                # Sauvegarder les informations extraites
-                info_output_path = os.path.join(msg_results_dir, f"{safe_filename}_extracted_info.txt")
-                try:
-                    with open(info_output_path, "w", encoding="utf-8") as info_file:
-                        for key, value in extracted_info.items():
-                            info_file.write(f"{key}: {value}\n")
-                except (OSError, IOError) as e:
-                    print(f"⚠️ Erreur lors de l'écriture du fichier d'informations: {e}")
-                    # Sauvegarder dans un chemin plus court en cas d'erreur
-                    alt_info_path = os.path.join(msg_results_dir, f"{hashlib.md5(filename.encode()).hexdigest()[:10]}_info.txt")
-                    with open(alt_info_path, "w", encoding="utf-8") as info_file:
-                        for key, value in extracted_info.items():
-                            info_file.write(f"{key}: {value}\n")
-                    info_output_path = alt_info_path
+                if pdf_text.strip() and artifact_store is not None:
+                    extracted_info = _extract_pdf_info(pdf_text, numero_pages, cached, cache, pdf_hash, seen, words)
+                    _add_message_fields(extracted_info, objet, expediteur, date, numero_pages, mail_destinataire)
+                    all_extracted_info[filename] = extracted_info
+                    start = add_time(timings, STAGE_REGEX, start)
+                    
+                    # Texte et informations enregistrés dans le magasin d'artefacts
+                    artifact_store.put_document(msg_label, filename, pdf_text, extracted_info)
+                    add_time(timings, STAGE_WRITE, start)
+                    log(f"✅ Traitement terminé pour {filename}. Informations extraites enregistrées dans {artifact_store.root}")
+                    
+                    # Empreinte transmise au processus principal pour repérer les doublons
+                    extracted_info["_sha256"] = pdf_hash
+                elif pdf_text.strip():
+                    # Sauvegarder le texte extrait
+                    txt_output_path = os.path.join(output_dir, f"{safe_filename}_extracted_text.txt")
+                    try:
+                        with open(txt_output_path, "w", encoding="utf-8") as text_file:
+                            text_file.write(pdf_text)
+                    except (OSError, IOError) as e:
+                        print(f"⚠️ Erreur lors de l'écriture du fichier texte: {e}")
+                        # Sauvegarder dans un chemin plus court en cas d'erreur
+                        alt_output_path = os.path.join(output_dir, f"{hashlib.md5(filename.encode()).hexdigest()[:10]}_text.txt")
+                        with open(alt_output_path, "w", encoding="utf-8") as text_file:
+                            text_file.write(pdf_text)
+                        txt_output_path = alt_output_path
+                    start = add_time(timings, STAGE_WRITE, start)
+                    
+                    # Appliquer les regex pour extraire des informations (sauf doublon ou cache)
+                    extracted_info = _extract_pdf_info(pdf_text, numero_pages, cached, cache, pdf_hash, seen, words)
+                    
+                    # Ajouter les informations du message au dictionnaire des informations extraites
+                    _add_message_fields(extracted_info, objet, expediteur, date, numero_pages, mail_destinataire)
+                    
+                    all_extracted_info[filename] = extracted_info
+                    start = add_time(timings, STAGE_REGEX, start)
+                    
+                    # Sauvegarder les informations extraites
+                    info_output_path = os.path.join(msg_results_dir, f"{safe_filename}_extracted_info.txt")
+                    try:
+                        with open(info_output_path, "w", encoding="utf-8") as info_file:
+                            for key, value in extracted_info.items():
+                                info_file.write(f"{key}: {value}\n")
+                    except (OSError, IOError) as e:
+                        print(f"⚠️ Erreur lors de l'écriture du fichier d'informations: {e}")
+                        # Sauvegarder dans un chemin plus court en cas d'erreur
+                        alt_info_path = os.path.join(msg_results_dir, f"{hashlib.md5(filename.encode()).hexdigest()[:10]}_info.txt")
+                        with open(alt_info_path, "w", encoding="utf-8") as info_file:
+                            for key, value in extracted_info.items():
+                                info_file.write(f"{key}: {value}\n")
+                        info_output_path = alt_info_path
+                    add_time(timings, STAGE_WRITE, start)
+                    
+                    log(f"✅ Traitement terminé pour {filename}. Informations extraites sauvegardées dans {info_output_path}")
+                    
+                    # Empreinte transmise au processus principal pour repérer les doublons
+                    extracted_info["_sha256"] = pdf_hash
+                else:
+                    print(f"⚠️ Aucun texte extrait de {filename}. Le fichier peut être scanné ou vide.")
+            
+            elif attachment_type == ATTACHMENT_MSG:
+                log(f"📧 Fichier .msg imbriqué trouvé : {filename}")
+                
+                # Les données de la pièce jointe sont soit les octets du .msg,
+                # soit le message imbriqué déjà ouvert par extract_msg
+                nested_msg = attachment.data
+                
+                # Sauvegarde du .msg imbriqué uniquement sur demande (débogage)
+                if save_nested_msg_files:
+                    saved_path = save_nested_msg(nested_msg, filename, output_dir)
+                    log(f"💾 .msg imbriqué sauvegardé dans {saved_path}")
+                
+                # Traiter récursivement le fichier .msg imbriqué, directement en mémoire
+                nested_results = extract_and_process_pdfs_from_msg(
+                    nested_msg, output_dir, results_dir, cache=cache,
+                    msg_name=f"{msg_label}>{filename}", depth=depth + 1,
+                    save_nested_msg_files=save_nested_msg_files,
+                    page_workers=page_workers, page_threshold=page_threshold,
+                    artifact_store=artifact_store, dedup_table=dedup_table, timings=timings, layout=layout,
+                )
                 
-                print(f"✅ Traitement terminé pour {filename}. Informations extraites sauvegardées dans {info_output_path}")
+                # Ajouter les résultats du .msg imbriqué aux résultats globaux
+                for pdf_name, info in nested_results.items():
+                    all_extracted_info[f"{filename}>{pdf_name}"] = info  # Utiliser une notation pour indiquer l'imbrication
+            
             else:
-                print(f"⚠️ Aucun texte extrait de {filename}. Le fichier peut être scanné ou vide.")
+                log(f"⏭️ Pièce jointe ignorée ({attachment_type}) : {filename}")
         
-        if is_msg_file(filename, attachment.data):
-            print(f"📧 Fichier .msg imbriqué trouvé : {filename}")
-            
-            # Sauvegarder le fichier .msg imbriqué
-            nested_msg_path = os.path.join(output_dir, safe_filename)
-            try:
-                with open(nested_msg_path, "wb") as nested_msg_file:
-                    nested_msg_file.write(attachment.data)
-            except (OSError, IOError) as e:
-                print(f"⚠️ Erreur lors de l'écriture du fichier .msg imbriqué: {e}")
-                # Sauvegarder dans un chemin plus court en cas d'erreur
-                alt_msg_path = os.path.join(output_dir, f"{hashlib.md5(filename.encode()).hexdigest()[:10]}.msg")
-                with open(alt_msg_path, "wb") as nested_msg_file:
-                    nested_msg_file.write(attachment.data)
-                nested_msg_path = alt_msg_path
-            
-            # Traiter récursivement le fichier .msg imbriqué
-            nested_results = extract_and_process_pdfs_from_msg(nested_msg_path, output_dir, results_dir)
-            
-            # Ajouter les résultats du .msg imbriqué aux résultats globaux
-            for pdf_name, info in nested_results.items():
-                all_extracted_info[f"{filename}>{pdf_name}"] = info  # Utiliser une notation pour indiquer l'imbrication
-    
-    return all_extracted_info
+        return all_extracted_info
+    finally:
+        if owns_msg:
+            msg.close()
 def save_nested_msg(msg_data, base_filename, output_dir):
     """
     Sauvegarde un fichier .msg imbriqué avec un nom sécurisé et gère les chemins longs.
     
     Args:
-        msg_data (bytes): Données binaires du fichier .msg
+        msg_data (bytes | Message): Données binaires du fichier .msg, ou message
+                                    imbriqué ouvert par extract_msg
         base_filename (str): Nom de base pour le fichier
         output_dir (str): Répertoire de sortie
     
@@ -348,20 +569,26 @@ def save_nested_msg(msg_data, base_filename, output_dir):
     
     # Sauvegarder le fichier
     try:
-        with open(output_path, "wb") as f:
-            f.write(msg_data)
+        _write_msg_data(msg_data, output_path)
         return output_path
     except Exception as e:
         print(f"❌ Erreur lors de la sauvegarde du fichier .msg imbriqué : {e}")
         # Essayer un chemin encore plus court en cas d'erreur
         emergency_path = os.path.join(output_dir, "nested_" + hashlib.md5(str(time.time()).encode()).hexdigest()[:8] + ".msg")
-        with open(emergency_path, "wb") as f:
-            f.write(msg_data)
+        _write_msg_data(msg_data, emergency_path)
         return emergency_path
+
+def _write_msg_data(msg_data, output_path):
+    """Écrit un .msg imbriqué, qu'il soit fourni en octets ou comme message ouvert."""
+    if isinstance(msg_data, (bytes, bytearray)):
+        with open(output_path, "wb") as f:
+            f.write(msg_data)
+    else:
+        msg_data.export(output_path)
 def is_msg_file(filename, data):
     """
     Détecte si un fichier est un fichier .msg en vérifiant à la fois l'extension
-    et la signature du fichier.
+    et la signature du fichier (répertoire OLE), sans l'analyser complètement.
     
     Args:
         filename (str): Nom du fichier
@@ -370,32 +597,298 @@ def is_msg_file(filename, data):
     Returns:
         bool: True si c'est un fichier .msg, False sinon
     """
-    # Vérification de l'extension (insensible à la casse)
-    if filename.lower().endswith('.msg'):
-        return True
+    if classify_attachment(filename, data) != ATTACHMENT_MSG:
+        return False
     
-    # Vérification de la signature de fichier MSG (format CFBF - Compound File Binary Format)
-    # La signature des fichiers MSG est généralement D0 CF 11 E0 A1 B1 1A E1
-    if len(data) >= 8 and data[:8] == b'\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1':
+    if isinstance(data, (bytes, bytearray)) and not filename.lower().endswith('.msg'):
         print(f"⚠️ Fichier détecté comme .msg par sa signature, mais sans extension .msg: {filename}")
-        return True
-    
-    # Vérification supplémentaire pour les fichiers avec extension manquante
+    return True
+
+def _msg_kwargs(msg_options, dedup_table=None):
+    """
+    Construit les arguments de extract_and_process_pdfs_from_msg à partir des options
+    du traitement (qui doivent rester sérialisables pour le pool de processus).
+    dedup_table est la table des documents déjà vus pendant l'exécution en cours.
+    """
+    kwargs = {"save_nested_msg_files": msg_options.get("save_nested_msg_files", False),
+              "page_workers": msg_options.get("page_workers"),
+              "page_threshold": msg_options.get("page_threshold", PAGE_PARALLEL_THRESHOLD),
+              "layout": msg_options.get("layout", False)}
+    if msg_options.get("artifact_path"):
+        kwargs["artifact_store"] = open_artifact_store(msg_options["artifact_path"])
+    if msg_options.get("dedup", True) and dedup_table is not None:
+        kwargs["dedup_table"] = dedup_table
+    if msg_options.get("cache_path"):
+        kwargs["cache"] = open_pdf_cache(msg_options["cache_path"],
+                                         LAYOUT_VERSION if kwargs["layout"] else PATTERNS_VERSION)
+    return kwargs
+
+def _init_pool_worker():
+    """Initialise un processus du pool : table des documents déjà vus propre à l'exécution."""
+    global worker_dedup
+    worker_dedup = DedupTable()
+
+def _process_msg_task(msg_file_path, output_subfolder, results_folder, msg_options, msg_data=None):
+    """
+    Traite un fichier .msg dans un processus du pool.
+    Retourne les informations extraites, les fichiers .msg marqués comme traités
+    dans ce processus, l'éventuelle erreur et les statistiques des regex,
+    pour fusion dans le processus principal.
+    """
+    processed_msg_files.clear()
+    result = _run_msg(msg_file_path, output_subfolder, results_folder, msg_options, _msg_kwargs(msg_options, worker_dedup),
+                      msg_data)
+    result["processed"] = sorted(processed_msg_files, key=str)
+    return result
+
+def _run_msg(msg_file_path, output_subfolder, results_folder, msg_options, kwargs, msg_data=None):
+    """
+    Traite un fichier .msg et retourne le résultat sous forme de dictionnaire,
+    avec le temps passé dans chaque étape (timings).
+    msg_data contient le fichier déjà lu par l'étage de lecture anticipée, s'il a pu l'être.
+    """
+    global verbose
+    ENGINE.profile = msg_options.get("profile_patterns", False)
+    verbose = msg_options.get("verbose", False)
+    timings = {}
     try:
-        # Tenter d'ouvrir avec extract_msg pour voir si ça fonctionne
-        msg_test = extract_msg.Message(io.BytesIO(data))
-        # Si pas d'erreur, c'est probablement un fichier .msg
-        print(f"⚠️ Fichier détecté comme .msg par analyse, mais sans extension .msg: {filename}")
-        return True
-    except Exception:
-        pass
+        extracted_info = extract_and_process_pdfs_from_msg(
+            msg_data if msg_data is not None else msg_file_path, output_subfolder, results_folder,
+            msg_name=msg_file_path, timings=timings, **kwargs
+        )
+        error = None
+    except Exception as e:
+        extracted_info = {}
+        error = str(e)
+    # Rendre les artefacts de ce message visibles dans l'index avant de rendre la main
+    if kwargs.get("artifact_store") is not None:
+        start = time.perf_counter()
+        kwargs["artifact_store"].flush()
+        add_time(timings, STAGE_WRITE, start)
+    # Plafond mémoire : au-delà, libérer les tables et caches de ce processus
+    memory_limit_mb = msg_options.get("memory_limit_mb")
+    rss_mb = current_rss_mb() if memory_limit_mb is not None else None
+    if over_limit(rss_mb, memory_limit_mb):
+        release_memory(kwargs.get("dedup_table"))
+        rss_mb = current_rss_mb()
+    return {"info": extracted_info, "processed": [], "error": error, "pattern_stats": ENGINE.pop_stats(),
+            "timings": timings, "rss_mb": rss_mb}
+
+def release_memory(dedup_table=None):
+    """
+    Libère la mémoire conservée par le processus entre deux messages : table des
+    documents déjà vus, cache interne de MuPDF et objets en attente du ramasse-miettes.
+    """
+    if dedup_table is not None:
+        dedup_table.clear()
+    fitz.TOOLS.store_shrink(100)
+    gc.collect()
+
+def _iter_msg_results(tasks, msg_options, workers=None, schedule=None, queue_depth=DEFAULT_QUEUE_DEPTH,
+                      read_workers=DEFAULT_READ_WORKERS, worker_max_messages=DEFAULT_WORKER_MAX_MESSAGES):
+    """
+    Exécute les tâches (msg_file_path, output_subfolder, results_folder) en série
+    ou dans un pool de processus, et renvoie les résultats dans l'ordre des tâches.
+
+    Les fichiers sont lus à l'avance par un pool de threads (prefetch_files) pendant
+    l'analyse des précédents. Au plus queue_depth fichiers sont lus en avance et, en
+    parallèle, au plus max(queue_depth, workers) messages sont en cours dans le pool.
+
+    Pour une mémoire stable sur les longs traitements, le pool est remplacé par un
+    pool neuf après workers * worker_max_messages messages, ou dès qu'un processus
+    reste au-dessus du plafond mémoire (msg_options["memory_limit_mb"]) malgré la
+    libération de ses caches. Les messages en cours se terminent dans l'ancien pool.
+
+    Args:
+        schedule (list): Ordre de soumission des tâches au pool (indices), par exemple
+                         du plus gros au plus petit fichier. Les résultats restent
+                         renvoyés dans l'ordre des tâches.
+        queue_depth (int): Profondeur des files (0 : pas de lecture anticipée).
+        read_workers (int): Nombre de threads de lecture.
+        worker_max_messages (int): Nombre moyen de messages traités par processus avant
+                                   son remplacement (None : pas de remplacement).
+    """
+    if workers and workers > 1 and len(tasks) > 1:
+        print(f"🚀 Traitement parallèle avec {workers} processus")
+        order = list(schedule) if schedule is not None else list(range(len(tasks)))
+        reads = prefetch_files([tasks[index][0] for index in order], queue_depth, read_workers)
+        max_in_flight = max(queue_depth, workers)
+        memory_limit_mb = msg_options.get("memory_limit_mb")
+        pool_max_messages = workers * worker_max_messages if worker_max_messages else None
+        
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_worker)
+        submitted = 0  # Messages soumis au pool courant
+        recycle = False  # Un processus du pool courant dépasse le plafond mémoire
+        in_flight = {}  # future -> indice de la tâche
+        done = {}  # Résultats terminés en attente de leur tour
+        next_index = 0
+        
+        def collect(finished):
+            nonlocal recycle
+            for future in finished:
+                result = future.result()
+                done[in_flight.pop(future)] = result
+                if over_limit(result.get("rss_mb"), memory_limit_mb):
+                    recycle = True
+        
+        try:
+            for position, msg_data in reads:
+                # Attendre qu'une place se libère (mémoire bornée), en rendant les résultats prêts
+                while len(in_flight) >= max_in_flight:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                    while next_index in done:
+                        yield done.pop(next_index)
+                        next_index += 1
+                
+                # Remplacer le pool usé : ses processus s'arrêtent après les messages en cours
+                if recycle or (pool_max_messages and submitted >= pool_max_messages):
+                    log(f"♻️ Renouvellement du pool de processus après {submitted} messages")
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_worker)
+                    submitted = 0
+                    recycle = False
+                
+                index = order[position]
+                in_flight[executor.submit(_process_msg_task, *tasks[index], msg_options, msg_data)] = index
+                submitted += 1
+            
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+                while next_index in done:
+                    yield done.pop(next_index)
+                    next_index += 1
+        finally:
+            executor.shutdown()
+        return
     
-    return False
-def process_msg_files_recursively(root_folder, output_folder, results_folder):
+    # Table des documents déjà vus créée pour cette exécution seulement
+    kwargs = _msg_kwargs(msg_options, DedupTable())
+    warned = False
+    for position, msg_data in prefetch_files([task[0] for task in tasks], queue_depth, read_workers):
+        result = _run_msg(*tasks[position], msg_options, kwargs, msg_data)
+        if not warned and over_limit(result["rss_mb"], msg_options.get("memory_limit_mb")):
+            print(f"⚠️ Mémoire résidente ({result['rss_mb']:.0f} Mo) au-delà du plafond malgré la libération "
+                  f"des caches : utiliser --workers pour des processus renouvelés")
+            warned = True
+        yield result
+
+def write_msg_summary(msg_file_path, extracted_info, pdf_count, nested_msg_count, results_folder_path,
+                      artifact_store=None):
+    """
+    Crée la synthèse d'un .msg avec les informations clés de chaque PDF : un fichier
+    _summary.txt, ou un artefact du magasin si artifact_store est fourni.
+    """
+    lines = [
+        f"Résumé du traitement pour {msg_file_path}\n",
+        f"Nombre de PDF extraits: {pdf_count}\n",
+        f"Nombre de .msg imbriqués: {nested_msg_count}\n\n",
+    ]
+    
+    if extracted_info:
+        lines.append("Liste des fichiers traités avec informations clés:\n")
+        for pdf_name, info in extracted_info.items():
+            lines.append(f"\n--- {pdf_name} ---\n")
+            
+            # Extraire et afficher quelques informations importantes
+            key_info = {
+                "Montant": info.get("Montant décaissement", "Non trouvé"),
+                "Devise": info.get("Devise", "Non trouvé"),
+                "Bénéficiaire": info.get("Bénéficiaire", "Non trouvé"),
+                "IBAN": info.get("IBAN Bénéficiaire", "Non trouvé"),
+                "Date": info.get("Date Document", "Non trouvé"),
+                "Référence": info.get("Référence", "Non trouvé")
+            }
+            
+            for key, value in key_info.items():
+                lines.append(f"{key}: {value}\n")
+    else:
+        lines.append("Aucune information extraite.\n")
+    
+    if artifact_store is not None:
+        artifact_store.put(str(msg_file_path), "", ARTIFACT_SUMMARY, "".join(lines))
+        return
+    
+    safe_filename = sanitize_filename(os.path.basename(msg_file_path))
+    summary_file = results_folder_path / f"{safe_filename}_summary.txt"
+    try:
+        with open(summary_file, "w", encoding="utf-8") as summary:
+            summary.write("".join(lines))
+    except (OSError, IOError) as e:
+        print(f"⚠️ Erreur lors de l'écriture du fichier de synthèse: {e}")
+
+def process_msg_files_recursively(root_folder, output_folder, results_folder, workers=None, cache_path=None,
+                                  save_nested_msg_files=False, profile_patterns=False, flush_every=100,
+                                  sqlite_path=None, page_workers=None, page_threshold=PAGE_PARALLEL_THRESHOLD,
+                                  artifact_path=None, manifest=None, dedup=True,
+                                  queue_depth=DEFAULT_QUEUE_DEPTH, read_workers=DEFAULT_READ_WORKERS,
+                                  verbose_log=False, slow_files=10, scan_seconds=None, layout=False,
+                                  memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB,
+                                  worker_max_messages=DEFAULT_WORKER_MAX_MESSAGES, resume=False):
     """
     Parcourt récursivement un dossier racine pour traiter tous les fichiers .msg,
     extraire les PDF et appliquer les regex.
+
+    Args:
+        workers (int): Nombre de processus pour traiter les fichiers .msg en parallèle.
+                       None ou 1 pour un traitement séquentiel. Les résultats sont
+                       fusionnés dans l'ordre du parcours, le fichier consolidé est
+                       donc identique à celui d'un traitement séquentiel.
+        cache_path (str): Fichier du cache persistant des PDF (textes et informations
+                          extraites). Il doit se trouver hors des dossiers nettoyés
+                          à chaque exécution. None pour désactiver le cache.
+        save_nested_msg_files (bool): Option de débogage : écrire les .msg imbriqués
+                                      dans output_folder (ils sont analysés en mémoire).
+        profile_patterns (bool): Mesurer, pour chaque champ et chaque regex de repli,
+                                 les appels, succès, temps cumulé et pire temps.
+                                 Le rapport est écrit dans profil_regex.txt.
+        flush_every (int): Nombre de lignes entre deux vidages du fichier consolidé,
+                           écrit au fur et à mesure du traitement des messages. Les
+                           messages terminés sont inscrits au journal par lots, à chaque
+                           point de reprise : toutes les flush_every lignes (ou tous les
+                           lots de la base SQLite s'ils sont plus grands) et en fin de traitement.
+        sqlite_path (str): Base SQLite (table typée et indexée) alimentée en plus du
+                           fichier consolidé. None pour ne pas la créer.
+        page_workers (int): Nombre de processus pour extraire en parallèle les pages
+                            des PDF d'au moins page_threshold pages (None : lecture
+                            séquentielle). Les petits PDF ne sont pas concernés.
+        page_threshold (int): Seuil de pages du découpage en tranches.
+        artifact_path (str): Dossier du magasin d'artefacts (voir artifact_store) où
+                             enregistrer textes, informations extraites et synthèses,
+                             au lieu de trois petits fichiers par élément. None pour
+                             conserver les fichiers séparés.
+        manifest (list): Manifeste des .msg déjà construit par scan_msg_files (par
+                         exemple lors de la validation) ; None pour parcourir root_folder.
+                         En parallèle, les messages sont soumis du plus gros au plus
+                         petit, mais le fichier consolidé suit l'ordre du manifeste.
+        dedup (bool): Réutiliser le texte et les informations d'un PDF identique déjà
+                      traité par le même processus (table bornée en mémoire). La colonne
+                      "Doublon de" est renseignée dans tous les cas.
+        queue_depth (int): Profondeur des files entre les étages lecture anticipée,
+                           analyse et écriture (mémoire bornée). 0 désactive la
+                           lecture anticipée.
+        read_workers (int): Nombre de threads de lecture anticipée des .msg.
+        verbose_log (bool): Journal détaillé de chaque message et pièce jointe. Par défaut,
+                            seule une ligne de progression (débit, temps restant) est affichée.
+        slow_files (int): Nombre de messages les plus lents détaillés dans le rapport global.
+        scan_seconds (float): Durée du parcours de l'arborescence, lorsque le manifeste est fourni.
+        layout (bool): Lire les champs du formulaire d'après la position des mots (modèle
+                       déclaratif de layout_extraction) ; les regex ne servent qu'aux
+                       champs que le modèle ne couvre pas ou n'a pas trouvés.
+        memory_limit_mb (float): Plafond de mémoire résidente d'un processus (Mo). Au-delà,
+                                 ses caches sont libérés et, en parallèle, le pool est
+                                 renouvelé. None pour ne pas surveiller la mémoire.
+        worker_max_messages (int): Nombre moyen de messages traités par processus du pool
+                                   avant son remplacement (None : jamais).
+        resume (bool): Reprendre un traitement interrompu : les messages inscrits sans
+                       erreur dans le journal (journal.jsonl du dossier de résultats) et
+                       inchangés depuis sont ignorés, et les sorties sont coupées au dernier
+                       point de reprise journalisé avant d'y ajouter la suite. Les empreintes des
+                       documents journalisés alimentent la colonne "Doublon de".
     """
+    global verbose
+    verbose = verbose_log
     # Convertir en objets Path pour une meilleure gestion des chemins
     root_folder_path = Path(root_folder)
     output_folder_path = Path(output_folder)
@@ -405,94 +898,176 @@ def process_msg_files_recursively(root_folder, output_folder, results_folder):
     output_folder_path.mkdir(exist_ok=True, parents=True)
     results_folder_path.mkdir(exist_ok=True, parents=True)
     
-    # Statistiques pour le résumé final
-    total_msg_files = 0
-    total_pdf_files = 0
-    total_nested_msg = 0
+    # Options transmises à chaque traitement de .msg
+    msg_options = {"cache_path": cache_path, "save_nested_msg_files": save_nested_msg_files,
+                   "profile_patterns": profile_patterns, "page_workers": page_workers,
+                   "page_threshold": page_threshold, "artifact_path": artifact_path,
+                   "dedup": dedup, "verbose": verbose_log, "layout": layout,
+                   "memory_limit_mb": memory_limit_mb}
+    artifact_store = open_artifact_store(artifact_path) if artifact_path else None
     
-    # Dictionnaire pour stocker toutes les informations extraites
-    all_pdf_data = {}
+    # Statistiques des regex, cumulées sur tous les processus
+    pattern_stats = {}
     
-    for dirpath, _, filenames in os.walk(root_folder):
-        for filename in filenames:
-            if filename.lower().endswith(".msg"):
-                total_msg_files += 1
-                msg_file_path = os.path.join(dirpath, filename)
-                print(f"\n📂 Traitement de {msg_file_path}...")
-                
-                # Créer un sous-dossier dans output_folder basé sur le chemin relatif
-                try:
-                    relative_path = os.path.relpath(dirpath, root_folder)
-                    # Limiter la profondeur du chemin relatif pour éviter des chemins trop longs
-                    path_parts = Path(relative_path).parts
-                    if len(path_parts) > 3:  # Limiter à 3 niveaux de dossiers
-                        short_path = os.path.join(*path_parts[-3:])
-                    else:
-                        short_path = relative_path
-                    
-                    output_subfolder = output_folder_path / short_path
-                    output_subfolder.mkdir(exist_ok=True, parents=True)
-                except (OSError, IOError) as e:
-                    print(f"⚠️ Erreur lors de la création du sous-dossier: {e}")
-                    # Utiliser un dossier basé sur un hash en cas d'erreur
-                    hash_obj = hashlib.md5(os.path.dirname(msg_file_path).encode())
-                    output_subfolder = output_folder_path / hash_obj.hexdigest()[:8]
-                    output_subfolder.mkdir(exist_ok=True, parents=True)
-                
-                # Extraire et traiter les PDF du fichier .msg
-                try:
-                    extracted_info = extract_and_process_pdfs_from_msg(msg_file_path, str(output_subfolder), str(results_folder_path))
-
-                    # Ajouter les informations extraites au dictionnaire global
-                    for pdf_name, info in extracted_info.items():
-                        full_path = f"{msg_file_path}>{pdf_name}" if '>' in pdf_name else pdf_name
-                        all_pdf_data[full_path] = info
-                
-                except Exception as e:
-                    print(f"❌ Erreur critique lors du traitement de {msg_file_path}: {e}")
-                    continue
-                
-                # Mettre à jour les statistiques
-                pdf_count = sum(1 for key in extracted_info.keys() if not '>' in key and '.pdf' in key)
-                nested_msg_count = sum(1 for key in extracted_info.keys() if '>' in key)
-                
-                total_pdf_files += pdf_count
-                total_nested_msg += nested_msg_count
+    # Premier document rencontré pour chaque contenu, dans l'ordre du manifeste :
+    # la colonne "Doublon de" ne dépend donc pas de la répartition entre processus
+    first_documents = DedupTable(max_entries=DUPLICATE_INDEX_MAX_ENTRIES)
+    
+    # Temps par étape, débits et messages les plus lents pour le rapport global
+    run_stats = RunStats(slow_files=slow_files)
+    
+    # Manifeste des .msg (un seul parcours de l'arborescence), sauf s'il est fourni
+    if manifest is None:
+        start = time.perf_counter()
+        manifest = scan_msg_files(root_folder)
+        scan_seconds = time.perf_counter() - start
+    run_stats.add_stage(STAGE_SCAN, scan_seconds or 0.0)
+    
+    # Journal des messages terminés : à la reprise, ceux déjà traités sont ignorés
+    journal = RunJournal(str(results_folder_path / JOURNAL_FILENAME), resume=resume)
+    resumed_msg_files = 0
+    if resume:
+        remaining = [entry for entry in manifest if not journal.is_done(entry)]
+        resumed_msg_files = len(manifest) - len(remaining)
+        manifest = remaining
+        # Premiers documents des messages déjà traités, pour la colonne "Doublon de"
+        for pdf_hash, document_path in journal.documents():
+            if first_documents.get(pdf_hash) is None:
+                first_documents.put(pdf_hash, document_path)
+        print(f"⏩ Reprise : {resumed_msg_files} messages déjà traités d'après le journal, {len(manifest)} restants")
+    total_msg_files = len(manifest)
+    progress = ProgressLine(total_msg_files)
+    
+    # Liste des tâches, dans l'ordre du parcours
+    tasks = []
+    output_subfolders = {}  # Sous-dossier de sortie déjà créé pour chaque dossier source
+    for entry in manifest:
+        msg_file_path = entry.path
+        dirpath = os.path.dirname(msg_file_path)
+        
+        if dirpath not in output_subfolders:
+            # Créer un sous-dossier dans output_folder basé sur le chemin relatif
+            try:
+                relative_path = os.path.relpath(dirpath, root_folder)
+                # Limiter la profondeur du chemin relatif pour éviter des chemins trop longs
+                path_parts = Path(relative_path).parts
+                if len(path_parts) > 3:  # Limiter à 3 niveaux de dossiers
+                    short_path = os.path.join(*path_parts[-3:])
+                else:
+                    short_path = relative_path
                 
-                # Créer un fichier de synthèse pour ce .msg
-                safe_filename = sanitize_filename(filename)
-                summary_file = results_folder_path / f"{safe_filename}_summary.txt"
-                try:
-                    with open(summary_file, "w", encoding="utf-8") as summary:
-                        summary.write(f"Résumé du traitement pour {msg_file_path}\n")
-                        summary.write(f"Nombre de PDF extraits: {pdf_count}\n")
-                        summary.write(f"Nombre de .msg imbriqués: {nested_msg_count}\n\n")
-                        
-                        if extracted_info:
-                            summary.write("Liste des fichiers traités avec informations clés:\n")
-                            for pdf_name, info in extracted_info.items():
-                                summary.write(f"\n--- {pdf_name} ---\n")
-                                
-                                # Extraire et afficher quelques informations importantes
-                                key_info = {
-                                    "Montant": info.get("Montant décaissement", "Non trouvé"),
-                                    "Devise": info.get("Devise", "Non trouvé"),
-                                    "Bénéficiaire": info.get("Bénéficiaire", "Non trouvé"),
-                                    "IBAN": info.get("IBAN Bénéficiaire", "Non trouvé"),
-                                    "Date": info.get("Date Document", "Non trouvé"),
-                                    "Référence": info.get("Référence", "Non trouvé")
-                                }
-                                
-                                for key, value in key_info.items():
-                                    summary.write(f"{key}: {value}\n")
-                        else:
-                            summary.write("Aucune information extraite.\n")
-                except (OSError, IOError) as e:
-                    print(f"⚠️ Erreur lors de l'écriture du fichier de synthèse: {e}")
-
-    # Sauvegarder toutes les données extraites dans un fichier texte
-    consolidated_data_path = os.path.join(results_folder, "donnees_extraites_consolidees.txt")
-    save_extracted_data_to_txt(all_pdf_data, consolidated_data_path)
+                output_subfolder = output_folder_path / short_path
+                output_subfolder.mkdir(exist_ok=True, parents=True)
+            except (OSError, IOError) as e:
+                print(f"⚠️ Erreur lors de la création du sous-dossier: {e}")
+                # Utiliser un dossier basé sur un hash en cas d'erreur
+                hash_obj = hashlib.md5(dirpath.encode())
+                output_subfolder = output_folder_path / hash_obj.hexdigest()[:8]
+                output_subfolder.mkdir(exist_ok=True, parents=True)
+            output_subfolders[dirpath] = str(output_subfolder)
+        
+        tasks.append((msg_file_path, output_subfolders[dirpath], str(results_folder_path)))
+    
+    # Les plus gros messages sont soumis en premier au pool pour raccourcir la fin du traitement
+    schedule = largest_first(manifest)
+    
+    # Le fichier consolidé est écrit au fil de l'eau, message par message
+    consolidated_data_path = os.path.join(results_folder, CONSOLIDATED_FILENAME)
+    totals = {"pdf": 0, "nested_msg": 0}
+    variant_counts = {}  # Documents par variante du formulaire
+    checkpoint_rows = {"rows": 0}  # Lignes écrites au dernier point de reprise du journal
+    
+    def commit_journal(force=False):
+        """
+        Point de reprise : les messages terminés depuis le précédent sont inscrits au journal,
+        une fois leurs lignes écrites sur le disque. Il n'a lieu qu'après un lot complet des
+        sorties, pour ne pas couper leurs vidages et transactions groupés.
+        """
+        if not journal.pending:
+            return
+        if (force or sink.rows_written - checkpoint_rows["rows"] >= sink.batch_rows
+                or len(journal.pending) >= sink.batch_rows):
+            journal.commit(sink.checkpoint())
+            checkpoint_rows["rows"] = sink.rows_written
+    
+    def write_result(entry, result):
+        """
+        Étage d'écriture : lignes du fichier consolidé, statistiques et synthèse d'un message,
+        puis inscription du message au journal au point de reprise suivant.
+        """
+        msg_file_path = entry.path
+        log(f"\n📂 Traitement de {msg_file_path}...")
+        start = time.perf_counter()
+        processed_msg_files.update(result["processed"])
+        merge_pattern_stats(pattern_stats, result["pattern_stats"])
+        progress.update()
+        
+        if result["error"] is not None:
+            print(f"❌ Erreur critique lors du traitement de {msg_file_path}: {result['error']}")
+            journal.record(entry, 0, error=result["error"])
+            commit_journal()
+            run_stats.add_message(msg_file_path, result["timings"], 0)
+            return
+        
+        extracted_info = result["info"]
+        
+        # Écrire les lignes de ce message dans le fichier consolidé
+        documents = []  # (empreinte, document) pour le journal
+        for pdf_name, info in extracted_info.items():
+            full_path = f"{msg_file_path}>{pdf_name}" if '>' in pdf_name else pdf_name
+            info["NOM DU PDF"] = full_path
+            # Référence complète (message>pièce jointe) pour désigner le document d'origine
+            document_path = full_path if '>' in pdf_name else f"{msg_file_path}>{pdf_name}"
+            if "_sha256" in info:
+                documents.append((info["_sha256"], document_path))
+            mark_duplicate(info, document_path, first_documents)
+            variant = info.get(VARIANT_FIELD, VARIANT_UNKNOWN)
+            variant_counts[variant] = variant_counts.get(variant, 0) + 1
+            sink.write_row(info)
+        
+        # Mettre à jour les statistiques
+        pdf_count = sum(1 for key in extracted_info.keys() if not '>' in key and '.pdf' in key)
+        nested_msg_count = sum(1 for key in extracted_info.keys() if '>' in key)
+        
+        totals["pdf"] += pdf_count
+        totals["nested_msg"] += nested_msg_count
+        
+        # Créer un fichier de synthèse pour ce .msg
+        write_msg_summary(msg_file_path, extracted_info, pdf_count, nested_msg_count, results_folder_path,
+                          artifact_store)
+        journal.record(entry, len(extracted_info), documents=documents)
+        commit_journal()
+        
+        add_time(result["timings"], STAGE_WRITE, start)
+        run_stats.add_message(msg_file_path, result["timings"], len(extracted_info))
+    
+    # Lecture anticipée -> analyse -> écriture, reliées par des files bornées
+    with journal, open_consolidated_sink(consolidated_data_path, flush_every=flush_every,
+                                         sqlite_path=sqlite_path) as sink:
+        # Reprise : supprimer les lignes écrites après le dernier point de reprise journalisé
+        if resume and journal.checkpoint is not None:
+            sink.rollback(journal.checkpoint)
+        else:
+            journal.start(sink.checkpoint())
+        with WriterStage(write_result, queue_depth) as writer:
+            results = _iter_msg_results(tasks, msg_options, workers, schedule, queue_depth, read_workers,
+                                        worker_max_messages)
+            for entry, result in zip(manifest, results):
+                writer.put(entry, result)
+        # Derniers messages : point de reprise final
+        commit_journal(force=True)
+    progress.close()
+    
+    total_pdf_files = totals["pdf"]
+    total_nested_msg = totals["nested_msg"]
+    
+    print(f"✅ Données sauvegardées avec succès dans {consolidated_data_path}")
+    if artifact_store is not None:
+        artifact_store.flush()
+        print(f"✅ Textes, informations et synthèses enregistrés dans {artifact_path}")
+    if sqlite_path is not None:
+        print(f"✅ Base SQLite disponible à: {sqlite_path}")
+    
     # Créer un rapport global
     global_report_path = results_folder_path / "rapport_global.txt"
     try:
@@ -500,45 +1075,103 @@ def process_msg_files_recursively(root_folder, output_folder, results_folder):
             report.write(f"Rapport global d'extraction\n")
             report.write(f"==========================\n\n")
             report.write(f"Total de fichiers .msg traités: {total_msg_files}\n")
+            if resume:
+                report.write(f"Fichiers .msg déjà traités avant la reprise: {resumed_msg_files}\n")
             report.write(f"Total de fichiers PDF extraits: {total_pdf_files}\n")
             report.write(f"Total de fichiers .msg imbriqués: {total_nested_msg}\n")
+            report.write("\nDocuments par variante de formulaire:\n")
+            for variant, count in sorted(variant_counts.items()):
+                report.write(f"  {variant}: {count}\n")
+            report.write("".join(run_stats.report_lines()))
         
+        unknown_count = variant_counts.get(VARIANT_UNKNOWN, 0)
+        if unknown_count:
+            print(f"⚠️ {unknown_count} documents d'une variante de formulaire inconnue "
+                  f"(toutes les regex appliquées) : nouveau modèle à ajouter à FORM_VARIANTS ?")
         print(f"\n✅ Traitement terminé!")
         print(f"Rapport global disponible à: {global_report_path}")
+        
+        if profile_patterns:
+            pattern_report_path = results_folder_path / "profil_regex.txt"
+            write_pattern_report(pattern_stats, pattern_report_path)
+            print(f"Profil des regex disponible à: {pattern_report_path}")
     except (OSError, IOError) as e:
         print(f"⚠️ Erreur lors de l'écriture du rapport global: {e}")
         print(f"\n✅ Traitement terminé, mais impossible d'écrire le rapport global!")
 
 # Fonction pour vérifier si le dossier est accessible et s'il contient des fichiers .msg
 def validate_input_folder(folder_path):
+    """
+    Vérifie le dossier d'entrée et construit le manifeste des .msg (chemin, taille,
+    date de modification), réutilisable par process_msg_files_recursively.
+
+    Returns:
+        list: Manifeste des .msg, ou False si le dossier est absent ou sans .msg.
+    """
     if not os.path.exists(folder_path):
         print(f"❌ Le dossier {folder_path} n'existe pas!")
         return False
     
-    msg_files = []
-    for dirpath, _, filenames in os.walk(folder_path):
-        for filename in filenames:
-            if filename.lower().endswith(".msg"):
-                msg_files.append(os.path.join(dirpath, filename))
-                if len(msg_files) >= 5:  # Vérifier seulement les 5 premiers pour éviter de parcourir tout le dossier
-                    break
-        if len(msg_files) >= 5:
-            break
-    
-    if not msg_files:
+    manifest = scan_msg_files(folder_path)
+    
+    if not manifest:
         print(f"⚠️ Aucun fichier .msg trouvé dans {folder_path}. Vérifiez le dossier!")
         return False
     
-    return True
+    total_size = sum(entry.size for entry in manifest)
+    print(f"📂 {len(manifest)} fichiers .msg trouvés ({total_size / (1024 * 1024):.1f} Mo)")
+    return manifest
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extraction des ordres de virement depuis les fichiers .msg")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Nombre de processus pour traiter les .msg en parallèle (défaut : séquentiel)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Désactiver le cache persistant des PDF déjà traités")
+    parser.add_argument("--save-nested-msg", action="store_true",
+                        help="Débogage : écrire aussi les .msg imbriqués sur le disque")
+    parser.add_argument("--profile-patterns", action="store_true",
+                        help="Mesurer le taux de succès et le coût de chaque regex (profil_regex.txt)")
+    parser.add_argument("--page-workers", type=int, default=None,
+                        help="Nombre de processus pour extraire en parallèle les pages des gros PDF")
+    parser.add_argument("--page-threshold", type=int, default=PAGE_PARALLEL_THRESHOLD,
+                        help=f"Nombre de pages à partir duquel un PDF est extrait en parallèle (défaut : {PAGE_PARALLEL_THRESHOLD})")
+    parser.add_argument("--artifact-store", action="store_true",
+                        help="Regrouper textes, informations et synthèses dans un magasin compressé indexé")
+    parser.add_argument("--sqlite", action="store_true",
+                        help="Enregistrer aussi les données dans une base SQLite indexée")
+    parser.add_argument("--queue-depth", type=int, default=DEFAULT_QUEUE_DEPTH,
+                        help=f"Nombre de .msg lus à l'avance et de résultats en attente d'écriture (défaut : {DEFAULT_QUEUE_DEPTH}, 0 : désactivé)")
+    parser.add_argument("--read-workers", type=int, default=DEFAULT_READ_WORKERS,
+                        help=f"Nombre de threads de lecture anticipée des .msg (défaut : {DEFAULT_READ_WORKERS})")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Journal détaillé de chaque message et pièce jointe (au lieu de la ligne de progression)")
+    parser.add_argument("--layout", action="store_true",
+                        help="Lire les champs du formulaire d'après la position des mots (regex pour les autres champs)")
+    parser.add_argument("--memory-limit", type=float, default=DEFAULT_MEMORY_LIMIT_MB,
+                        help=f"Plafond de mémoire résidente par processus, en Mo (défaut : {DEFAULT_MEMORY_LIMIT_MB}, 0 : sans plafond)")
+    parser.add_argument("--worker-max-messages", type=int, default=DEFAULT_WORKER_MAX_MESSAGES,
+                        help=f"Messages traités par processus avant son remplacement (défaut : {DEFAULT_WORKER_MAX_MESSAGES}, 0 : jamais)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprendre un traitement interrompu d'après le journal (dossiers de sortie conservés)")
+    parser.add_argument("--slow-files", type=int, default=10,
+                        help="Nombre de messages les plus lents détaillés dans le rapport global (défaut : 10)")
+    args = parser.parse_args()
+
     # Paramètres configurables
     root_folder = "Virements vers 23 mails_2 ans/"  # Dossier racine contenant les fichiers .msg
     output_folder = "extracted_files"  # Dossier pour stocker les fichiers extraits et le texte brut
     results_folder = "resultats_extraction"  # Dossier pour stocker les informations extraites
+    cache_folder = "cache_extraction"  # Dossier du cache persistant (conservé entre les exécutions)
+    cache_path = None if args.no_cache else os.path.join(cache_folder, "pdf_cache.sqlite")
+    sqlite_path = os.path.join(results_folder, "donnees_extraites.sqlite") if args.sqlite else None
+    artifact_path = os.path.join(results_folder, "artefacts") if args.artifact_store else None
     
     # Vérifier si les dossiers de sortie existent déjà et les nettoyer si nécessaire
-    for folder in [output_folder, results_folder]:
+    # (sauf à la reprise, qui complète les sorties du traitement interrompu)
+    for folder in [] if args.resume else [output_folder, results_folder]:
         if os.path.exists(folder):
             try:
                 shutil.rmtree(folder)
@@ -550,20 +1183,38 @@ if __name__ == "__main__":
                 folder = f"{folder}_{int(time.time())}"
                 print(f"Utilisation d'un dossier alternatif: {folder}")
     
-    # Valider le dossier d'entrée
-    if validate_input_folder(root_folder):
+    # Valider le dossier d'entrée (le parcours est chronométré pour le rapport global)
+    scan_start = time.perf_counter()
+    manifest = validate_input_folder(root_folder)
+    scan_seconds = time.perf_counter() - scan_start
+    if manifest:
         try:
-            process_msg_files_recursively(root_folder, output_folder, results_folder)
+            process_msg_files_recursively(root_folder, output_folder, results_folder,
+                                          workers=args.workers, cache_path=cache_path,
+                                          save_nested_msg_files=args.save_nested_msg,
+                                          profile_patterns=args.profile_patterns,
+                                          sqlite_path=sqlite_path,
+                                          page_workers=args.page_workers,
+                                          page_threshold=args.page_threshold,
+                                          artifact_path=artifact_path,
+                                          manifest=manifest,
+                                          queue_depth=args.queue_depth,
+                                          read_workers=args.read_workers,
+                                          verbose_log=args.verbose,
+                                          slow_files=args.slow_files,
+                                          scan_seconds=scan_seconds,
+                                          layout=args.layout,
+                                          memory_limit_mb=args.memory_limit or None,
+                                          worker_max_messages=args.worker_max_messages or None,
+                                          resume=args.resume)
         except Exception as e:
             print(f"❌ Erreur critique: {e}")
             import traceback
             traceback.print_exc()
     else:
         print("⛔ Traitement annulé en raison d'erreurs dans la configuration.")
-
-if __name__ == "__main__":
-    root_folder = "Virements vers 23 mails_2 ans/"  # Dossier racine contenant les fichiers .msg
-    output_folder = "extracted_files"  # Dossier pour stocker les fichiers extraits et le texte brut
-    results_folder = "resultats_extraction"  # Dossier pour stocker les informations extraites
-    
-    process_msg_files_recursively(root_folder, output_folder, results_folder)
+        # Sans message à traiter, le fichier consolidé est créé avec son seul en-tête
+        os.makedirs(results_folder, exist_ok=True)
+        consolidated_data_path = os.path.join(results_folder, CONSOLIDATED_FILENAME)
+        open_consolidated_sink(consolidated_data_path).close()
+        print(f"📄 Fichier consolidé sans données créé : {consolidated_data_path}")
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+
+_open_caches = {}  # Caches déjà ouverts dans ce processus, par (chemin, version)
+
+def attachment_hash(data):
+    """
+    Calcule l'empreinte SHA-256 du contenu binaire d'une pièce jointe.
+
+    Args:
+        data (bytes): Contenu binaire de la pièce jointe.
+
+    Returns:
+        str: Empreinte hexadécimale.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+class PdfCache:
+    """
+    Cache disque des résultats d'extraction PDF, indexé par l'empreinte SHA-256
+    du contenu de la pièce jointe.
+
+    Chaque entrée contient le texte extrait, le nombre de pages et le résultat
+    de extract_information. Ce dernier est associé à une version du jeu de regex :
+    si la version change, le texte reste réutilisable mais les informations sont
+    recalculées.
+    """
+
+    def __init__(self, path, patterns_version):
+        """
+        Args:
+            path (str): Chemin du fichier SQLite du cache.
+            patterns_version (str): Version du jeu de regex courant.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.patterns_version = patterns_version
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pdf_cache ("
+            "sha256 TEXT PRIMARY KEY, page_count INTEGER, text TEXT, "
+            "patterns_version TEXT, info TEXT)"
+        )
+        self.conn.commit()
+
+    def get(self, sha256):
+        """
+        Retourne l'entrée en cache pour une empreinte, ou None si elle est absente.
+        La clé "info" vaut None si les informations ont été extraites avec
+        une autre version des regex.
+        """
+        row = self.conn.execute(
+            "SELECT page_count, text, patterns_version, info FROM pdf_cache WHERE sha256 = ?",
+            (sha256,),
+        ).fetchone()
+        if row is None:
+            return None
+        page_count, text, version, info = row
+        return {
+            "page_count": page_count,
+            "text": text,
+            "info": json.loads(info) if version == self.patterns_version and info is not None else None,
+        }
+
+    def put(self, sha256, text, page_count, info):
+        """Enregistre (ou remplace) l'entrée d'une empreinte."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pdf_cache (sha256, page_count, text, patterns_version, info) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (sha256, page_count, text, self.patterns_version, json.dumps(info, ensure_ascii=False)),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def open_pdf_cache(path, patterns_version):
+    """
+    Ouvre le cache une seule fois par processus (utile dans les processus du pool).
+    """
+    key = (path, patterns_version)
+    if key not in _open_caches:
+        _open_caches[key] = PdfCache(path, patterns_version)
+    return _open_caches[key]
+
+class DedupTable:
+    """
+    Table en mémoire, de taille bornée, des documents déjà vus pendant l'exécution,
+    indexée par l'empreinte du contenu. Les entrées les moins récemment utilisées
+    sont évincées au-delà de max_entries entrées ou de max_bytes octets.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            max_entries (int): Nombre maximal d'entrées.
+            max_bytes (int): Taille cumulée maximale des entrées (taille déclarée à l'ajout).
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Retourne l'entrée d'une empreinte (et la marque comme récente), ou None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, size=0):
+        """Ajoute une entrée, en évinçant les plus anciennes si la table est pleine."""
+        if key in self._entries:
+            self.total_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.total_bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+
+    def clear(self):
+        """Vide la table (par exemple pour libérer la mémoire au-delà du plafond)."""
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
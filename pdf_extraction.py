@@ -5,24 +5,48 @@ import os
 
 processed_msg_files = set()  # Ensemble pour suivre les fichiers .msg déjà traités
 
-def extract_pdfs_from_msg(msg_path, output_dir):
+def extract_pdfs_from_msg(msg_path, output_dir, msg_name=None, save_nested_msg_files=False):
     """
     Extrait les fichiers PDF d'un fichier .msg et gère les fichiers imbriqués.
+
+    Args:
+        msg_path: Chemin du fichier .msg, ses données binaires ou un message
+                  imbriqué déjà ouvert par extract_msg.
+        output_dir (str): Dossier de sortie des textes extraits.
+        msg_name (str): Nom du message lorsqu'il ne provient pas d'un chemin.
+        save_nested_msg_files (bool): Option de débogage : écrire aussi les .msg
+                                      imbriqués dans output_dir.
     """
-    if msg_path in processed_msg_files:
-        print(f"⚠️ Fichier déjà traité : {msg_path}. Ignoré pour éviter les boucles.")
+    is_path = isinstance(msg_path, (str, os.PathLike))
+    msg_label = str(msg_path) if is_path else (msg_name or "message_imbrique.msg")
+
+    if msg_label in processed_msg_files:
+        print(f"⚠️ Fichier déjà traité : {msg_label}. Ignoré pour éviter les boucles.")
         return
 
-    processed_msg_files.add(msg_path)  # Marquer le fichier comme traité
+    processed_msg_files.add(msg_label)  # Marquer le fichier comme traité
 
+    # Un message ouvert ici est fermé à la fin de son traitement (ses messages imbriqués avec lui)
+    owns_msg = is_path or isinstance(msg_path, (io.BytesIO, bytes))
     try:
-        msg = extract_msg.Message(msg_path)
+        if owns_msg:
+            msg = extract_msg.Message(msg_path)
+        else:
+            msg = msg_path  # Message imbriqué déjà ouvert
     except Exception as e:
-        print(f"❌ Erreur lors de l'ouverture de {msg_path} : {e}")
+        print(f"❌ Erreur lors de l'ouverture de {msg_label} : {e}")
         return
 
+    try:
+        _extract_pdfs_from_open_msg(msg, msg_label, output_dir, save_nested_msg_files)
+    finally:
+        if owns_msg:
+            msg.close()
+
+def _extract_pdfs_from_open_msg(msg, msg_label, output_dir, save_nested_msg_files):
+    """Traite les pièces jointes d'un message déjà ouvert (voir extract_pdfs_from_msg)."""
     if not hasattr(msg, 'attachments') or not msg.attachments:
-        print(f"Aucune pièce jointe trouvée dans {msg_path}.")
+        print(f"Aucune pièce jointe trouvée dans {msg_label}.")
         return
 
     for attachment in msg.attachments:
@@ -34,8 +58,7 @@ def extract_pdfs_from_msg(msg_path, output_dir):
 
         if filename.endswith('.pdf'):
             print(f"📄 PDF trouvé : {filename}")
-            pdf_data = io.BytesIO(attachment.data)
-            pdf_text = extract_text_from_pdf(pdf_data)
+            pdf_text = extract_text_from_pdf(attachment.data)  # Octets lus sans copie par PyMuPDF
 
             if pdf_text.strip():
                 output_file_path = os.path.join(output_dir, f"{filename}_extracted_text.txt")
@@ -47,23 +70,29 @@ def extract_pdfs_from_msg(msg_path, output_dir):
 
         elif filename.endswith('.msg'):
             print(f"📧 Fichier .msg imbriqué trouvé : {filename}")
-            nested_msg_path = os.path.join(output_dir, filename)
-            with open(nested_msg_path, "wb") as nested_msg_file:
-                nested_msg_file.write(attachment.data)
+            nested_msg = attachment.data  # Octets du .msg ou message déjà ouvert
+            if save_nested_msg_files:
+                nested_msg_path = os.path.join(output_dir, filename)
+                if isinstance(nested_msg, bytes):
+                    with open(nested_msg_path, "wb") as nested_msg_file:
+                        nested_msg_file.write(nested_msg)
+                else:
+                    nested_msg.export(nested_msg_path)
             
-            # Appel récursif pour analyser le fichier .msg imbriqué
-            extract_pdfs_from_msg(nested_msg_path, output_dir)
+            # Appel récursif pour analyser le fichier .msg imbriqué, directement en mémoire
+            extract_pdfs_from_msg(nested_msg, output_dir, msg_name=f"{msg_label}>{filename}",
+                                  save_nested_msg_files=save_nested_msg_files)
 
 def extract_text_from_pdf(pdf_data):
     """
     Extrait le texte d'un fichier PDF à partir de ses données binaires.
     """
-    text = ""
+    pages = []
     try:
         with fitz.open(stream=pdf_data, filetype="pdf") as pdf_document:
             for page in pdf_document:
-                text += page.get_text()
+                pages.append(page.get_text())
     except Exception as e:
         print(f"❌ Erreur lors de la lecture du PDF : {e}")
     
-    return text
+    return "".join(pages)
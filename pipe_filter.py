@@ -0,0 +1,371 @@
+import abc
+import os
+import re
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from sinks import parse_amount
+from text_normalizer import normalize_upper
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024  # Taille des tranches lues par chaque processus (octets)
+
+# Format JJ/MM/AAAA HH:MM:SS
+_DATE_FR_PATTERN = re.compile(r'(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})')
+# Format AAAA-MM-JJ HH:MM:SS avec potentiellement des millisecondes et timezone
+_DATE_ISO_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})(?:\.\d+)?(?:[+-]\d{2}:?\d{2})?')
+
+def nettoyer_date(date_string):
+    """
+    Nettoie une chaîne de date en gérant plusieurs formats possibles.
+
+    Args:
+        date_string (str): Chaîne de date à nettoyer
+
+    Returns:
+        str: Date au format JJ/MM/AAAA HH:MM:SS
+    """
+    # Essayer le premier format (JJ/MM/AAAA)
+    match = _DATE_FR_PATTERN.search(date_string)
+    if match:
+        return match.group(1)
+
+    # Essayer le deuxième format (AAAA-MM-JJ)
+    match = _DATE_ISO_PATTERN.search(date_string)
+    if match:
+        # Convertir le format AAAA-MM-JJ en JJ/MM/AAAA
+        date_iso = match.group(1)
+        try:
+            date_obj = datetime.strptime(date_iso, '%Y-%m-%d %H:%M:%S')
+            return date_obj.strftime('%d/%m/%Y %H:%M:%S')
+        except ValueError:
+            return None
+
+    return None
+
+def _parse_fr_datetime(text):
+    """JJ/MM/AAAA HH:MM:SS"""
+    if len(text) == 19 and text[2] == '/' and text[5] == '/' and text[10] == ' ' and text[13] == ':' and text[16] == ':':
+        parts = (text[6:10], text[3:5], text[0:2], text[11:13], text[14:16], text[17:19])
+        if all(part.isdecimal() for part in parts):
+            return datetime(*map(int, parts))
+    return None
+
+def _parse_fr_date(text):
+    """JJ/MM/AAAA"""
+    if len(text) == 10 and text[2] == '/' and text[5] == '/':
+        parts = (text[6:10], text[3:5], text[0:2])
+        if all(part.isdecimal() for part in parts):
+            return datetime(*map(int, parts))
+    return None
+
+def _parse_iso_datetime(text):
+    """AAAA-MM-JJ HH:MM:SS, éventuellement suivi d'un décalage horaire +HH:MM (ignoré)"""
+    length = len(text)
+    if length in (19, 25) and text[4] == '-' and text[7] == '-' and text[10] == ' ' and text[13] == ':' and text[16] == ':':
+        if length == 25 and (text[19] not in '+-' or text[22] != ':'
+                             or not (text[20:22] + text[23:25]).isdecimal()):
+            return None
+        parts = (text[0:4], text[5:7], text[8:10], text[11:13], text[14:16], text[17:19])
+        if all(part.isdecimal() for part in parts):
+            return datetime(*map(int, parts))
+    return None
+
+# Analyse à positions fixes, sans strptime, pour les formats courants des fichiers
+_FAST_PARSERS = {
+    "%d/%m/%Y %H:%M:%S": _parse_fr_datetime,
+    "%d/%m/%Y": _parse_fr_date,
+    "%Y-%m-%d %H:%M:%S": _parse_iso_datetime,
+}
+
+def parse_date_fast(text, formats=("%d/%m/%Y %H:%M:%S", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S")):
+    """
+    Analyse une date à format fixe sans strptime, par découpage aux positions connues.
+
+    Args:
+        text (str): Valeur de la colonne.
+        formats (tuple): Formats acceptés, parmi ceux de _FAST_PARSERS.
+
+    Returns:
+        datetime: Date analysée, ou None si la valeur n'a pas un de ces formats.
+
+    Raises:
+        ValueError: Format reconnu mais date invalide (31/02/2024, 25:00:00...).
+    """
+    for date_format in formats:
+        parsed = _FAST_PARSERS[date_format](text)
+        if parsed is not None:
+            return parsed
+    return None
+
+def _format_fr_datetime(value):
+    """Date au format JJ/MM/AAAA HH:MM:SS (sans strftime)."""
+    return (f"{value.day:02d}/{value.month:02d}/{value.year:04d} "
+            f"{value.hour:02d}:{value.minute:02d}:{value.second:02d}")
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    parsed = parse_date_fast(value.strip())
+    if parsed is None:
+        raise ValueError(f"Date non reconnue : {value}")
+    return parsed
+
+class ColumnPredicate(abc.ABC):
+    """
+    Condition sur une colonne du fichier délimité par |.
+    La colonne est désignée par son nom, avec ou sans accents / majuscules
+    ("Date valeur compensée" correspond à l'en-tête "DATE VALEUR COMPENSEE").
+    """
+
+    def __init__(self, column):
+        self.column = column
+        self.index = None
+
+    def bind(self, header):
+        """Résout l'indice de la colonne dans l'en-tête (liste des noms)."""
+        if self.column in header:
+            self.index = header.index(self.column)
+            return self
+        normalized = [normalize_upper(col) for col in header]
+        target = normalize_upper(self.column)
+        if target not in normalized:
+            raise ValueError(f"La colonne '{self.column}' n'a pas été trouvée dans le fichier")
+        self.index = normalized.index(target)
+        return self
+
+    @abc.abstractmethod
+    def __call__(self, fields):
+        """
+        Args:
+            fields (list): Champs de la ligne (modifiables).
+
+        Returns:
+            bool: True si la ligne est conservée.
+
+        Raises:
+            ValueError, IndexError: Ligne illisible (signalée puis ignorée).
+        """
+
+class DateRange(ColumnPredicate):
+    """
+    Conserve les lignes dont la date est strictement postérieure à `after`
+    et strictement antérieure à `before`.
+
+    En mode strict, les dates doivent respecter date_format (analyse à positions
+    fixes pour les formats courants, strptime sinon) ; une valeur invalide est une
+    erreur. En mode tolérant, le résultat est celui de nettoyer_date suivi de strptime :
+    une valeur sans date reconnue est écartée sans erreur, une date reconnue mais
+    invalide (31/02/2024) est une erreur. Les valeurs déjà au format JJ/MM/AAAA HH:MM:SS
+    ou ISO sont analysées directement, sans passer par les regex de nettoyer_date.
+    """
+
+    def __init__(self, column, after=None, before=None, lenient=False, rewrite=False,
+                 date_format="%d/%m/%Y %H:%M:%S"):
+        """
+        Args:
+            column (str): Colonne de date.
+            after (datetime | str): Borne inférieure exclue (JJ/MM/AAAA [HH:MM:SS]).
+            before (datetime | str): Borne supérieure exclue.
+            lenient (bool): Nettoyer les dates entourées de caractères parasites
+                            (comme nettoyer_date, une date sans heure est écartée).
+            rewrite (bool): Remplacer la valeur conservée par la date nettoyée (en mode
+                            tolérant, le texte rendu par nettoyer_date, tel quel ; en
+                            mode strict, la date au format JJ/MM/AAAA HH:MM:SS).
+            date_format (str): Format attendu en mode strict (syntaxe strptime).
+        """
+        super().__init__(column)
+        self.after = _as_datetime(after)
+        self.before = _as_datetime(before)
+        self.lenient = lenient
+        self.rewrite = rewrite
+        self.date_format = date_format
+
+    def _parse(self, value):
+        """
+        Returns:
+            tuple: (date, texte de la date nettoyée), ou None si la ligne est écartée.
+        """
+        if not self.lenient:
+            fast_parser = _FAST_PARSERS.get(self.date_format)
+            parsed = fast_parser(value) if fast_parser is not None else None
+            if parsed is None:
+                parsed = datetime.strptime(value, self.date_format)
+            return parsed, None
+        # Date déjà propre : nettoyer_date la rendrait telle quelle
+        parsed = _parse_fr_datetime(value)
+        if parsed is not None:
+            return parsed, value
+        # Date ISO : nettoyer_date la convertit, ou écarte sans erreur une date invalide
+        try:
+            parsed = _parse_iso_datetime(value)
+        except ValueError:
+            return None
+        if parsed is not None:
+            return parsed, _format_fr_datetime(parsed)
+        cleaned = nettoyer_date(value)
+        if not cleaned:
+            return None
+        # Une date nettoyée peut contenir plusieurs espaces avant l'heure
+        parsed = _parse_fr_datetime(cleaned)
+        if parsed is None:
+            parsed = datetime.strptime(cleaned, '%d/%m/%Y %H:%M:%S')
+        return parsed, cleaned
+
+    def __call__(self, fields):
+        result = self._parse(fields[self.index])
+        if result is None:
+            return False
+        value, cleaned = result
+        if self.after is not None and not value > self.after:
+            return False
+        if self.before is not None and not value < self.before:
+            return False
+        if self.rewrite:
+            fields[self.index] = cleaned if cleaned is not None else _format_fr_datetime(value)
+        return True
+
+class Equals(ColumnPredicate):
+    """Conserve les lignes dont la colonne vaut une des valeurs (sans accents ni casse)."""
+
+    def __init__(self, column, *values):
+        super().__init__(column)
+        self.values = frozenset(normalize_upper(value) for value in values)
+
+    def __call__(self, fields):
+        return normalize_upper(fields[self.index]) in self.values
+
+class AmountRange(ColumnPredicate):
+    """Conserve les lignes dont le montant est compris entre minimum et maximum (inclus)."""
+
+    def __init__(self, column, minimum=None, maximum=None):
+        super().__init__(column)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def __call__(self, fields):
+        amount = parse_amount(fields[self.index])
+        if amount is None:
+            return False
+        if self.minimum is not None and amount < self.minimum:
+            return False
+        if self.maximum is not None and amount > self.maximum:
+            return False
+        return True
+
+def _chunk_ranges(input_file, start, chunk_size):
+    """Découpe le fichier en tranches d'octets [début, fin) alignées sur les fins de ligne."""
+    size = os.path.getsize(input_file)
+    ranges = []
+    with open(input_file, 'rb') as f:
+        position = start
+        while position < size:
+            end = min(position + chunk_size, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((position, end))
+            position = end
+    return ranges
+
+def _filter_chunk(task):
+    """
+    Filtre une tranche du fichier (exécuté dans un processus du pool).
+
+    Returns:
+        tuple: (lignes conservées, nombre de lignes lues, erreurs [(ligne, message)])
+    """
+    input_file, start, end, predicates, rewrite = task
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start).decode('utf-8')
+
+    kept = []
+    errors = []
+    row_count = 0
+    # Découpage sur \n seulement : splitlines() couperait aussi sur \x0b, \x0c, \x1c-\x1e,
+    # \x85 ou \u2028, présents dans certaines valeurs extraites des PDF
+    for ligne in data.split('\n'):
+        if ligne.endswith('\r'):
+            ligne = ligne[:-1]
+        if not ligne.strip():
+            continue
+        row_count += 1
+        champs = ligne.strip().split('|')
+        try:
+            if all(predicate(champs) for predicate in predicates):
+                kept.append('|'.join(champs) if rewrite else ligne)
+        except (ValueError, IndexError) as e:
+            errors.append((ligne.strip(), str(e)))
+    return kept, row_count, errors
+
+def _map_bounded(executor, function, tasks, max_in_flight):
+    """
+    Comme executor.map, mais avec au plus max_in_flight tâches soumises en avance :
+    les tranches lues et les lignes conservées en attente restent en mémoire bornée.
+    Les résultats sont rendus dans l'ordre des tâches.
+    """
+    remaining = iter(tasks)
+    pending = deque(executor.submit(function, task) for task in islice(remaining, max_in_flight))
+    while pending:
+        future = pending.popleft()
+        # Soumettre la tranche suivante avant de rendre la main
+        for task in islice(remaining, 1):
+            pending.append(executor.submit(function, task))
+        yield future.result()
+
+def filter_pipe_file(input_file, output_file, predicates, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Filtre un fichier délimité par | en conservant les lignes qui vérifient toutes
+    les conditions. Le fichier est découpé en tranches alignées sur les lignes,
+    analysées en parallèle (au plus deux tranches en cours par processus) ; les lignes
+    conservées sont écrites dans l'ordre d'origine.
+
+    Args:
+        input_file (str): Chemin du fichier d'entrée (en-tête sur la première ligne).
+        output_file (str): Chemin du fichier de sortie.
+        predicates (list): Conditions (DateRange, Equals, AmountRange...).
+        workers (int): Nombre de processus. None ou 1 pour un traitement séquentiel.
+        chunk_size (int): Taille approximative d'une tranche en octets.
+
+    Returns:
+        dict: Nombre de lignes lues, conservées et en erreur.
+    """
+    with open(input_file, 'rb') as f:
+        header_line = f.readline()
+    header = header_line.decode('utf-8').strip()
+
+    colonnes = header.split('|')
+    predicates = [predicate.bind(colonnes) for predicate in predicates]
+    rewrite = any(getattr(predicate, 'rewrite', False) for predicate in predicates)
+
+    tasks = [(input_file, start, end, predicates, rewrite)
+             for start, end in _chunk_ranges(input_file, len(header_line), chunk_size)]
+
+    stats = {"lignes": 0, "conservees": 0, "erreurs": 0}
+    with open(output_file, 'w', encoding='utf-8') as f_out:
+        f_out.write(header + '\n')
+
+        if workers and workers > 1 and len(tasks) > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            results = _map_bounded(executor, _filter_chunk, tasks, 2 * workers)
+        else:
+            executor = None
+            results = map(_filter_chunk, tasks)
+
+        try:
+            for kept, row_count, errors in results:
+                for ligne, message in errors:
+                    print(f"Erreur de traitement pour la ligne: {ligne}")
+                    print(f"Erreur détaillée: {message}")
+                if kept:
+                    f_out.write('\n'.join(kept) + '\n')
+                stats["lignes"] += row_count
+                stats["conservees"] += len(kept)
+                stats["erreurs"] += len(errors)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    return stats
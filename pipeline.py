@@ -0,0 +1,101 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+DEFAULT_QUEUE_DEPTH = 8  # Nombre de fichiers lus à l'avance / résultats en attente d'écriture
+DEFAULT_READ_WORKERS = 4  # Nombre de threads de lecture
+
+def _read_file(path):
+    """Lit un fichier entier ; None en cas d'erreur (le traitement rouvrira le chemin)."""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def prefetch_files(paths, depth=DEFAULT_QUEUE_DEPTH, read_workers=DEFAULT_READ_WORKERS):
+    """
+    Lit les fichiers à l'avance dans un pool de threads pendant que l'appelant traite
+    les précédents. Au plus `depth` fichiers sont lus en avance, ce qui borne la mémoire.
+
+    Args:
+        paths (iterable): Chemins des fichiers, dans l'ordre de traitement.
+        depth (int): Nombre maximal de lectures en avance (0 pour ne rien lire à l'avance).
+        read_workers (int): Nombre de threads de lecture.
+
+    Yields:
+        tuple: (position dans paths, contenu en bytes ou None si non lu).
+    """
+    if depth <= 0:
+        for position, _ in enumerate(paths):
+            yield position, None
+        return
+
+    with ThreadPoolExecutor(max_workers=read_workers) as pool:
+        remaining = enumerate(paths)
+        pending = deque((position, pool.submit(_read_file, path)) for position, path in islice(remaining, depth))
+        while pending:
+            position, future = pending.popleft()
+            # Lancer la lecture suivante avant de rendre la main
+            for next_position, path in islice(remaining, 1):
+                pending.append((next_position, pool.submit(_read_file, path)))
+            yield position, future.result()
+
+class WriterStage:
+    """
+    Étage d'écriture exécuté dans un thread : les résultats déposés par put() sont
+    traités dans l'ordre par handler, pendant que l'étage d'analyse continue.
+    La file est bornée : put() attend si l'écriture a pris du retard.
+    """
+
+    _STOP = object()
+
+    def __init__(self, handler, depth=DEFAULT_QUEUE_DEPTH):
+        """
+        Args:
+            handler (callable): Fonction appelée avec les arguments de chaque put().
+            depth (int): Nombre maximal de résultats en attente d'écriture.
+        """
+        self.handler = handler
+        self.error = None
+        self._queue = queue.Queue(maxsize=max(depth, 1))
+        self._thread = threading.Thread(target=self._run, name="writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            if self.error is None:
+                try:
+                    self.handler(*item)
+                except BaseException as e:
+                    # L'erreur est relancée dans le thread principal (put / close)
+                    self.error = e
+
+    def put(self, *args):
+        """Dépose un résultat à écrire."""
+        if self.error is not None:
+            raise self.error
+        self._queue.put(args)
+
+    def close(self):
+        """Attend l'écriture des résultats en file et relance l'éventuelle erreur."""
+        self._queue.put(self._STOP)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # Une erreur est déjà en cours : arrêter le thread sans masquer l'erreur
+            self._queue.put(self._STOP)
+            self._thread.join()
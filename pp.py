@@ -1,35 +1,40 @@
 import os
 import extract_msg
 
-def extract_pdf(pdf_path):
-    """Fonction de traitement des fichiers PDF"""
+def extract_pdf(pdf_path, pdf_data=None):
+    """Fonction de traitement des fichiers PDF (pdf_data : contenu en mémoire)"""
     print(f"Traitement du PDF : {pdf_path}")
 
-def process_msg_file(msg_path):
-    """Traite un fichier .msg et vérifie les pièces jointes"""
+def process_msg_file(msg_path, msg=None):
+    """
+    Traite un fichier .msg et vérifie les pièces jointes.
+    Les pièces jointes sont traitées en mémoire, sans fichier temporaire ;
+    msg permet de passer un message imbriqué, en octets ou déjà ouvert
+    (msg_path sert alors de nom). Un message ouvert ici est fermé à la fin
+    de son traitement, même en cas d'erreur.
+    """
     print(f"Traitement du fichier MSG : {msg_path}")
-    msg = extract_msg.Message(msg_path)
-    msg.attachments  # Liste des pièces jointes
+    owns_msg = msg is None or isinstance(msg, bytes)
+    if owns_msg:
+        msg = extract_msg.Message(msg_path if msg is None else msg)
     
-    for attachment in msg.attachments:
-        attachment_name = attachment.longFilename or attachment.shortFilename
-        if not attachment_name:
-            continue
-
-        attachment_path = os.path.join(os.path.dirname(msg_path), attachment_name)
-
-        # Sauvegarde temporaire de la pièce jointe
-        with open(attachment_path, "wb") as f:
-            f.write(attachment.data)
-
-        # Vérification du type de fichier
-        if attachment_name.lower().endswith(".pdf"):
-            extract_pdf(attachment_path)
-        elif attachment_name.lower().endswith(".msg"):
-            process_msg_file(attachment_path)  # Appel récursif
-
-        # Supprime le fichier temporaire après traitement
-        os.remove(attachment_path)
+    try:
+        for attachment in msg.attachments:
+            attachment_name = attachment.longFilename or attachment.shortFilename
+            if not attachment_name:
+                continue
+
+            attachment_path = os.path.join(os.path.dirname(msg_path), attachment_name)
+
+            # Vérification du type de fichier
+            if attachment_name.lower().endswith(".pdf"):
+                extract_pdf(attachment_path, attachment.data)
+            elif attachment_name.lower().endswith(".msg"):
+                # Octets du .msg (ouvert puis fermé par l'appel récursif) ou message déjà ouvert
+                process_msg_file(f"{msg_path}>{attachment_name}", attachment.data)  # Appel récursif
+    finally:
+        if owns_msg:
+            msg.close()
 
 def traverse_directory(root_dir):
     """Parcourt un dossier et ses sous-dossiers pour traiter les fichiers .msg"""
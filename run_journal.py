@@ -0,0 +1,111 @@
+import json
+import os
+
+JOURNAL_FILENAME = "journal.jsonl"
+
+class RunJournal:
+    """
+    Journal en ajout seul des messages terminés : chemin, taille, date de modification,
+    nombre de lignes écrites et empreintes des documents. Les messages sont inscrits par
+    lots, une ligne JSON par point de reprise des sorties (taille du fichier consolidé,
+    dernière ligne SQLite) avec tous les messages écrits avant ce point. Après une
+    interruption, il permet de ne traiter que les messages restants et de couper les
+    sorties au dernier point de reprise.
+    """
+
+    def __init__(self, path, resume=False):
+        """
+        Args:
+            path (str): Chemin du journal.
+            resume (bool): Reprendre un journal existant ; sinon, le journal est recréé.
+        """
+        self.path = path
+        self.entries = {}  # Chemin du message -> dernière entrée du journal
+        self.pending = []  # Messages terminés en attente du prochain point de reprise
+        self.checkpoint = None  # Point de reprise des sorties après le dernier lot journalisé
+        if resume and os.path.exists(path):
+            self._load()
+        self.file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _load(self):
+        valid_size = 0  # Taille du journal jusqu'à la dernière ligne complète
+        with open(self.path, "rb") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    entry = None
+                if entry is None:
+                    # Dernière ligne incomplète (arrêt pendant l'écriture) : ignorée
+                    break
+                valid_size += len(line)
+                for message in entry.get("messages", ()):
+                    self.entries[message["path"]] = message
+                self.checkpoint = entry.get("checkpoint", self.checkpoint)
+        # Retirer la ligne incomplète pour que les entrées suivantes restent lisibles
+        os.truncate(self.path, valid_size)
+
+    def is_done(self, manifest_entry):
+        """
+        Vrai si le message a été traité sans erreur et n'a pas changé depuis
+        (même taille, même date de modification).
+        """
+        entry = self.entries.get(manifest_entry.path)
+        return (entry is not None and not entry.get("error")
+                and entry["size"] == manifest_entry.size and entry["mtime"] == manifest_entry.mtime)
+
+    def documents(self):
+        """(empreinte, chemin) des documents des messages journalisés, dans l'ordre du journal."""
+        for entry in self.entries.values():
+            for pdf_hash, document_path in entry.get("documents", ()):
+                yield pdf_hash, document_path
+
+    def start(self, checkpoint):
+        """Enregistre le point de reprise des sorties avant le premier message."""
+        self._append({"checkpoint": checkpoint})
+
+    def record(self, manifest_entry, rows, error=None, documents=()):
+        """
+        Ajoute un message terminé au lot en attente, après l'écriture de ses lignes.
+        Il n'est inscrit au journal qu'au point de reprise suivant (commit).
+
+        Args:
+            manifest_entry (ManifestEntry): Message (chemin, taille, date de modification).
+            rows (int): Nombre de lignes écrites dans le fichier consolidé.
+            error (str): Erreur du traitement ; le message sera retraité à la reprise.
+            documents (list): (empreinte, chemin) de chaque document du message.
+        """
+        entry = {"path": manifest_entry.path, "size": manifest_entry.size, "mtime": manifest_entry.mtime,
+                 "rows": rows}
+        if error is not None:
+            entry["error"] = error
+        if documents:
+            entry["documents"] = [list(document) for document in documents]
+        self.pending.append(entry)
+
+    def commit(self, checkpoint):
+        """
+        Inscrit les messages en attente avec le point de reprise des sorties après leurs
+        lignes, en une seule ligne : un arrêt pendant l'écriture n'en garde aucun.
+        """
+        if not self.pending:
+            return
+        self._append({"checkpoint": checkpoint, "messages": self.pending})
+        for entry in self.pending:
+            self.entries[entry["path"]] = entry
+        self.pending = []
+
+    def _append(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.checkpoint = entry["checkpoint"]
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
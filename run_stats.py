@@ -0,0 +1,146 @@
+import sys
+import time
+
+# Étapes chronométrées du traitement d'un message
+STAGE_SCAN = "parcours"
+STAGE_OPEN = "ouverture"
+STAGE_CLASSIFY = "classification"
+STAGE_PDF = "pdf"
+STAGE_REGEX = "regex"
+STAGE_WRITE = "ecriture"
+STAGES = (STAGE_SCAN, STAGE_OPEN, STAGE_CLASSIFY, STAGE_PDF, STAGE_REGEX, STAGE_WRITE)
+
+def add_time(timings, stage, start):
+    """
+    Ajoute à timings[stage] le temps écoulé depuis start (time.perf_counter()).
+    Sans dictionnaire de mesures (timings None), ne fait rien.
+
+    Returns:
+        float: Nouvel instant de départ, pour chaîner les étapes.
+    """
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + now - start
+    return now
+
+def percentile(ordered, fraction):
+    """Valeur au rang fraction (0 à 1) d'une liste triée (0 si la liste est vide)."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def format_duration(seconds):
+    """Durée lisible : 45 s, 3 min 05 s, 2 h 10 min."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} s"
+    if seconds < 3600:
+        return f"{seconds // 60} min {seconds % 60:02d} s"
+    return f"{seconds // 3600} h {seconds % 3600 // 60:02d} min"
+
+class RunStats:
+    """
+    Mesures d'une exécution : temps par étape et par message, débits, centiles
+    et messages les plus lents, pour le rapport global.
+    """
+
+    def __init__(self, slow_files=10):
+        """
+        Args:
+            slow_files (int): Nombre de messages les plus lents à détailler dans le rapport.
+        """
+        self.slow_files = slow_files
+        self.start = time.perf_counter()
+        self.stage_totals = {stage: 0.0 for stage in STAGES}
+        self.durations = []  # (durée, message, étapes)
+        self.pdf_count = 0
+
+    def add_stage(self, stage, seconds):
+        """Ajoute une durée hors message (parcours de l'arborescence...)."""
+        self.stage_totals[stage] = self.stage_totals.get(stage, 0.0) + seconds
+
+    def add_message(self, msg_path, timings, pdf_count):
+        """
+        Enregistre les mesures d'un message.
+
+        Args:
+            msg_path (str): Chemin du message.
+            timings (dict): Durée de chaque étape pour ce message (secondes).
+            pdf_count (int): Nombre de PDF traités (imbriqués compris).
+        """
+        for stage, seconds in timings.items():
+            self.add_stage(stage, seconds)
+        self.durations.append((sum(timings.values()), msg_path, timings))
+        self.pdf_count += pdf_count
+
+    def report_lines(self):
+        """Lignes de la section performances du rapport global."""
+        elapsed = time.perf_counter() - self.start
+        message_count = len(self.durations)
+        ordered = sorted(duration for duration, _, _ in self.durations)
+        lines = [
+            "\nPerformances\n",
+            "------------\n",
+            f"Durée totale: {elapsed:.1f} s\n",
+            f"Messages par seconde: {message_count / elapsed if elapsed else 0:.2f}\n",
+            f"PDF par seconde: {self.pdf_count / elapsed if elapsed else 0:.2f}\n",
+            f"Temps par message (s): p50 {percentile(ordered, 0.5):.3f} / "
+            f"p95 {percentile(ordered, 0.95):.3f} / max {percentile(ordered, 1):.3f}\n",
+            "\nTemps cumulé par étape (s, tous processus confondus):\n",
+        ]
+        for stage, seconds in self.stage_totals.items():
+            lines.append(f"  {stage}: {seconds:.3f}\n")
+
+        slowest = sorted(self.durations, key=lambda item: item[0], reverse=True)[:self.slow_files]
+        if slowest:
+            lines.append(f"\n{len(slowest)} messages les plus lents:\n")
+            for duration, msg_path, timings in slowest:
+                dominant = max(timings, key=timings.get) if timings else "-"
+                lines.append(f"  {duration:.3f} s ({dominant}: {timings.get(dominant, 0.0):.3f} s) {msg_path}\n")
+        return lines
+
+class ProgressLine:
+    """
+    Ligne de progression limitée à un affichage par intervalle : messages traités,
+    débit et temps restant estimé. Dans un terminal, la ligne est réécrite sur place.
+    """
+
+    def __init__(self, total, interval=2.0, label="messages"):
+        """
+        Args:
+            total (int): Nombre total d'éléments.
+            interval (float): Délai minimal entre deux affichages (secondes).
+            label (str): Nom des éléments affiché dans la ligne.
+        """
+        self.total = total
+        self.interval = interval
+        self.label = label
+        self.done = 0
+        self.start = time.perf_counter()
+        self.last_print = 0.0
+        self.inline = sys.stdout.isatty()
+
+    def update(self, count=1):
+        """Compte count éléments traités et affiche la ligne si l'intervalle est écoulé."""
+        self.done += count
+        now = time.perf_counter()
+        if now - self.last_print >= self.interval or self.done == self.total:
+            self.last_print = now
+            self._print(now)
+
+    def _print(self, now):
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        percent = 100 * self.done / self.total if self.total else 100
+        line = f"⏳ {self.done}/{self.total} {self.label} ({percent:.1f} %) - {rate:.1f} {self.label}/s"
+        if rate and self.done < self.total:
+            line += f" - reste ~ {format_duration((self.total - self.done) / rate)}"
+        if self.inline:
+            print(f"\r{line}    ", end="", flush=True)
+        else:
+            print(line, flush=True)
+
+    def close(self):
+        """Termine la ligne de progression (retour à la ligne dans un terminal)."""
+        if self.inline and self.last_print:
+            print()
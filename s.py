@@ -1,4 +1,6 @@
 if page_data["Compte à débiter"] == None or page_data["Compte à débiter"] == "":
-            alternative_match = re.findall(r"Mail[\s\S]*?\b(\d{2}", page_content)
+            # Recherche bornée à une courte fenêtre après "Mail" (pas de [\s\S]*? sur tout le document)
+            mail_pos = page_content.find("Mail")
+            alternative_match = re.search(r"\b(\d{2})", page_content[mail_pos:mail_pos + 500]) if mail_pos != -1 else None
             if alternative_match:
-                page_data["Compte à débiter"] = alternative_match[0]
+                page_data["Compte à débiter"] = alternative_match.group(1)
@@ -0,0 +1,397 @@
+import os
+import re
+import sqlite3
+from datetime import datetime
+from text_normalizer import remove_accents
+
+# Types des colonnes des ordres de virement dans la base SQLite
+# (les deux orthographes des colonnes, selon le script producteur, sont couvertes)
+TRANSFER_COLUMN_TYPES = {
+    "Montant décaissement": "REAL",
+    "N PAGE": "INTEGER",
+    "N page": "INTEGER",
+    "Date Document": "DATE",
+    "Date document": "DATE",
+    "Date valeur compensée": "DATE",
+    "DATE HEURE ENVOI": "DATETIME",
+    "DATE HEURE ACCUSE DE RECEPTION": "DATETIME",
+}
+
+# Colonnes indexées pour les recherches de rapprochement
+TRANSFER_INDEXES = ["IBAN Bénéficiaire", "Compte à débiter", "Date valeur compensée", "DATE HEURE ENVOI"]
+
+def select_columns(column_order, include=None, exclude=None):
+    """
+    Calcule le schéma de sortie à partir de l'ordre complet des colonnes.
+
+    Args:
+        column_order (list): Ordre complet des colonnes.
+        include (list): Colonnes à conserver (toutes si None), dans l'ordre de column_order.
+        exclude (list): Colonnes à retirer.
+
+    Returns:
+        list: Colonnes à écrire.
+
+    Raises:
+        ValueError: Colonne incluse ou exclue absente de column_order (faute de frappe).
+    """
+    unknown = [col for col in list(include or []) + list(exclude or []) if col not in column_order]
+    if unknown:
+        raise ValueError(f"Colonnes inconnues : {', '.join(unknown)}")
+    included = set(include) if include is not None else None
+    excluded = set(exclude or ())
+    return [
+        col for col in column_order
+        if (included is None or col in included) and col not in excluded
+    ]
+
+class PipeRowSink:
+    """
+    Écrit les lignes d'un fichier texte délimité par | au fur et à mesure du traitement,
+    avec un tampon vidé périodiquement sur le disque.
+
+    L'en-tête n'est écrit que si le fichier est absent ou vide, ce qui permet de
+    reprendre l'écriture à la suite d'un fichier existant.
+    """
+
+    def __init__(self, output_filename, column_order, normalize=None, missing="Non trouvé",
+                 flush_every=100, buffer_size=1 << 16):
+        """
+        Args:
+            output_filename (str): Chemin du fichier de sortie.
+            column_order (list): Ordre des colonnes.
+            normalize (callable): Fonction appliquée à l'en-tête et à chaque valeur
+                                  (par exemple suppression des accents et majuscules).
+            missing (str): Valeur écrite pour une colonne absente des données.
+            flush_every (int): Nombre de lignes entre deux vidages du tampon.
+            buffer_size (int): Taille du tampon d'écriture en octets.
+        """
+        self.output_filename = output_filename
+        self.column_order = list(column_order)
+        self.normalize = normalize or str
+        self.missing = missing
+        self.flush_every = flush_every
+        self.rows_written = 0
+        self._rows_since_flush = 0
+
+        # Vérifier si le fichier existe pour déterminer si l'en-tête doit être écrit
+        file_exists = os.path.exists(output_filename)
+        is_empty = not file_exists or os.stat(output_filename).st_size == 0
+
+        self.file = open(output_filename, 'a', encoding='utf-8', buffering=buffer_size)
+        if is_empty:
+            self.file.write("|".join(self.normalize(col) for col in self.column_order) + "\n")
+
+    def write_row(self, data):
+        """Écrit une ligne en respectant l'ordre des colonnes."""
+        normalize = self.normalize
+        missing = self.missing
+        self.file.write("|".join(normalize(data.get(col, missing)) for col in self.column_order) + "\n")
+        self.rows_written += 1
+        self._rows_since_flush += 1
+        if self._rows_since_flush >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Vide le tampon vers le disque."""
+        self.file.flush()
+        self._rows_since_flush = 0
+
+    @property
+    def batch_rows(self):
+        """Nombre de lignes entre deux vidages automatiques."""
+        return self.flush_every
+
+    def checkpoint(self):
+        """Vide le tampon et retourne la taille du fichier (octets), point de reprise de l'écriture."""
+        self.flush()
+        return os.fstat(self.file.fileno()).st_size
+
+    def rollback(self, position):
+        """
+        Coupe le fichier au point de reprise position (lignes écrites ensuite supprimées).
+        Une liste de points de reprise (TeeSink) commence par celui du fichier texte.
+        """
+        if isinstance(position, list):
+            position = position[0]
+        self.flush()
+        self.file.truncate(position)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def sql_column_name(column):
+    """Nom de colonne SQL : sans accents, en minuscules, caractères non alphanumériques remplacés par _."""
+    name = re.sub(r"[^0-9a-z]+", "_", remove_accents(column).lower()).strip("_")
+    return name if name and not name[0].isdigit() else f"c_{name}"
+
+def parse_amount(value):
+    """
+    Convertit un montant extrait ("1,234.56", "1 234,56", "1.234,56"...) en nombre.
+
+    Returns:
+        float: Montant, ou None si la valeur n'est pas un montant.
+    """
+    text = re.sub(r"[\s\u00a0\u202f']", "", str(value))
+    if not re.fullmatch(r"[+-]?\d[\d.,]*", text):
+        return None
+    last_dot, last_comma = text.rfind("."), text.rfind(",")
+    if last_dot != -1 and last_comma != -1:
+        # Le dernier séparateur est le séparateur décimal
+        decimal = "." if last_dot > last_comma else ","
+    elif last_dot != -1 or last_comma != -1:
+        separator = "." if last_dot != -1 else ","
+        position = max(last_dot, last_comma)
+        # Un séparateur unique suivi d'autre chose que 3 chiffres est décimal
+        if text.count(separator) == 1 and len(text) - position - 1 != 3:
+            decimal = separator
+        else:
+            decimal = None
+    else:
+        decimal = None
+    thousands = [sep for sep in ".," if sep != decimal]
+    for sep in thousands:
+        text = text.replace(sep, "")
+    if decimal == ",":
+        text = text.replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+_DATE_FR = re.compile(r"(\d{2})/(\d{2})/(\d{4})")
+_DATETIME_FR = re.compile(r"(\d{2})/(\d{2})/(\d{4})\s+(\d{2}):(\d{2})(?::(\d{2}))?")
+
+def parse_date(value):
+    """
+    Convertit une date JJ/MM/AAAA (ou déjà ISO) en date ISO AAAA-MM-JJ.
+
+    Returns:
+        str: Date ISO, ou None si la valeur n'est pas une date valide.
+    """
+    text = str(value).strip()
+    match = _DATE_FR.fullmatch(text)
+    try:
+        if match:
+            day, month, year = (int(part) for part in match.groups())
+            return datetime(year, month, day).date().isoformat()
+        return datetime.fromisoformat(text).date().isoformat()
+    except ValueError:
+        return None
+
+def parse_datetime(value):
+    """
+    Convertit une date et heure ("2024-11-05 10:00:00+00:00", "05/11/2024 10:00:00")
+    en texte ISO AAAA-MM-JJ HH:MM:SS (avec le décalage horaire s'il est connu).
+
+    Returns:
+        str: Date et heure ISO, ou None si la valeur n'est pas reconnue.
+    """
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    text = str(value).strip()
+    match = _DATETIME_FR.fullmatch(text)
+    try:
+        if match:
+            day, month, year, hour, minute, second = match.groups()
+            return datetime(int(year), int(month), int(day), int(hour), int(minute),
+                            int(second or 0)).isoformat(sep=" ")
+        return datetime.fromisoformat(text).isoformat(sep=" ")
+    except ValueError:
+        return None
+
+# Conversion et type SQLite de chaque type logique
+_SQL_CONVERTERS = {
+    "REAL": (parse_amount, "REAL"),
+    "INTEGER": (lambda value: int(value) if str(value).strip().isdigit() else None, "INTEGER"),
+    "DATE": (parse_date, "TEXT"),
+    "DATETIME": (parse_datetime, "TEXT"),
+}
+
+class SqliteSink:
+    """
+    Écrit les lignes extraites dans une table SQLite typée et indexée.
+
+    Les colonnes typées (montant, dates, nombre de pages) sont converties : nombre
+    pour les montants, texte ISO pour les dates. La valeur brute est conservée dans
+    une colonne <nom>_brut, et la colonne typée vaut NULL si la conversion échoue.
+    Les insertions sont regroupées par lots dans une seule transaction.
+    """
+
+    def __init__(self, path, column_order, table="virements", column_types=None, indexes=(),
+                 missing="Non trouvé", batch_size=500):
+        """
+        Args:
+            path (str): Chemin du fichier SQLite.
+            column_order (list): Colonnes à enregistrer.
+            table (str): Nom de la table.
+            column_types (dict): Type logique par colonne (REAL, INTEGER, DATE, DATETIME) ;
+                                 les autres colonnes sont du texte.
+            indexes (list): Colonnes à indexer.
+            missing (str | tuple): Valeur(s) signifiant "absent", enregistrée(s) comme NULL.
+            batch_size (int): Nombre de lignes insérées par transaction.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.table = table
+        self.column_order = list(column_order)
+        self.missing = missing
+        self._missing_values = frozenset((missing,) if isinstance(missing, str) else missing)
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._pending = []
+
+        column_types = column_types or {}
+        # (colonne source, nom SQL, convertisseur) ; convertisseur None pour du texte
+        self._columns = []
+        definitions = []
+        used_names = {"id"}
+        for column in self.column_order:
+            # Deux colonnes peuvent donner le même nom SQL ("fax_destinataire" / "Fax Destinataire")
+            base_name = name = sql_column_name(column)
+            suffix = 2
+            while name in used_names or f"{name}_brut" in used_names:
+                name = f"{base_name}_{suffix}"
+                suffix += 1
+            used_names.update((name, f"{name}_brut"))
+            logical_type = column_types.get(column)
+            if logical_type in _SQL_CONVERTERS:
+                converter, sql_type = _SQL_CONVERTERS[logical_type]
+                self._columns.append((column, name, converter))
+                definitions += [(name, sql_type), (f"{name}_brut", "TEXT")]
+            else:
+                self._columns.append((column, name, None))
+                definitions.append((name, "TEXT"))
+
+        # Connexion ouverte dans le thread principal puis utilisée par l'étage d'écriture
+        # (un seul thread à la fois)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (id INTEGER PRIMARY KEY)')
+        # Ajouter les colonnes manquantes (table créée ou schéma enrichi depuis)
+        existing = {row[1] for row in self.conn.execute(f'PRAGMA table_info("{table}")')}
+        for name, sql_type in definitions:
+            if name not in existing:
+                self.conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{name}" {sql_type}')
+        names = {column: name for column, name, _ in self._columns}
+        for column in indexes:
+            if column in names:
+                name = names[column]
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_{name}" ON "{table}" ("{name}")')
+        self.conn.commit()
+
+        quoted_names = ", ".join(f'"{name}"' for name, _ in definitions)
+        placeholders = ", ".join("?" * len(definitions))
+        self._insert = f'INSERT INTO "{table}" ({quoted_names}) VALUES ({placeholders})'
+
+    def _convert(self, data):
+        values = []
+        for column, _, converter in self._columns:
+            value = data.get(column)
+            if value is None or (isinstance(value, str) and value in self._missing_values):
+                value = None
+            elif not isinstance(value, (str, int, float)):
+                value = str(value)
+            if converter is None:
+                values.append(value)
+            else:
+                values.append(converter(value) if value is not None else None)
+                values.append(None if value is None else str(value))
+        return values
+
+    def write_row(self, data):
+        """Ajoute une ligne au lot courant (inséré quand il atteint batch_size)."""
+        self._pending.append(self._convert(data))
+        self.rows_written += 1
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Insère le lot courant dans une transaction."""
+        if self._pending:
+            with self.conn:
+                self.conn.executemany(self._insert, self._pending)
+            self._pending = []
+
+    @property
+    def batch_rows(self):
+        """Nombre de lignes par transaction."""
+        return self.batch_size
+
+    def checkpoint(self):
+        """Insère le lot courant et retourne l'identifiant de la dernière ligne, point de reprise."""
+        self.flush()
+        return self.conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM "{self.table}"').fetchone()[0]
+
+    def rollback(self, position):
+        """Supprime les lignes insérées après le point de reprise position."""
+        self.flush()
+        with self.conn:
+            self.conn.execute(f'DELETE FROM "{self.table}" WHERE id > ?', (position,))
+
+    def close(self):
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class TeeSink:
+    """Transmet chaque ligne à plusieurs sorties (fichier texte, base SQLite...)."""
+
+    def __init__(self, *sinks):
+        self.sinks = [sink for sink in sinks if sink is not None]
+
+    @property
+    def rows_written(self):
+        return self.sinks[0].rows_written if self.sinks else 0
+
+    def write_row(self, data):
+        for sink in self.sinks:
+            sink.write_row(data)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    @property
+    def batch_rows(self):
+        """Plus grand lot des sorties : un point de reprise plus fréquent couperait leurs lots."""
+        return max((sink.batch_rows for sink in self.sinks), default=1)
+
+    def checkpoint(self):
+        """Point de reprise de chaque sortie, dans l'ordre des sorties."""
+        return [sink.checkpoint() for sink in self.sinks]
+
+    def rollback(self, positions):
+        """Ramène chaque sortie à son point de reprise (celles sans point de reprise sont laissées)."""
+        if not isinstance(positions, list):
+            positions = [positions]
+        for sink, position in zip(self.sinks, positions):
+            sink.rollback(position)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,455 @@
+import datetime
+import os
+import random
+import struct
+
+import fitz  # PyMuPDF
+
+# ---------------------------------------------------------------------------
+# Écriture de fichiers .msg (format Compound File Binary d'Outlook)
+# ---------------------------------------------------------------------------
+
+_SECTOR = 512
+_MINI_SECTOR = 64
+_MINI_CUTOFF = 4096
+_FREESECT = 0xFFFFFFFF
+_ENDOFCHAIN = 0xFFFFFFFE
+_FATSECT = 0xFFFFFFFD
+_NOSTREAM = 0xFFFFFFFF
+_DIRECTORY_ENTRY = "<64sHBBIII16sIQQIQ"
+
+def _flatten_tree(tree):
+    """Aplatit l'arbre {nom: sous-arbre | bytes} en entrées de répertoire (racine en premier)."""
+    entries = []
+
+    def add(name, node):
+        index = len(entries)
+        if isinstance(node, dict):
+            entries.append({"name": name, "type": 1, "children": []})
+            # Ordre imposé par le format : longueur du nom puis nom en majuscules
+            for child_name in sorted(node, key=lambda n: (len(n), n.upper())):
+                entries[index]["children"].append(add(child_name, node[child_name]))
+        else:
+            entries.append({"name": name, "type": 2, "data": bytes(node)})
+        return index
+
+    add("Root Entry", tree)
+    entries[0]["type"] = 5
+    return entries
+
+def build_cfb(tree):
+    """
+    Construit un fichier Compound File Binary (version 3) à partir d'un arbre
+    {nom: sous-arbre (dict) | contenu (bytes)}.
+
+    Returns:
+        bytes: Contenu du fichier.
+    """
+    entries = _flatten_tree(tree)
+    mini_stream = bytearray()
+    minifat = []
+    big_streams = []
+    for entry in entries:
+        if entry["type"] != 2:
+            continue
+        data = entry["data"]
+        if len(data) >= _MINI_CUTOFF:
+            big_streams.append(entry)
+        elif not data:
+            entry["start"] = _ENDOFCHAIN
+        else:
+            start = len(mini_stream) // _MINI_SECTOR
+            count = (len(data) + _MINI_SECTOR - 1) // _MINI_SECTOR
+            mini_stream += data + b"\0" * (count * _MINI_SECTOR - len(data))
+            minifat += [start + i + 1 for i in range(count - 1)] + [_ENDOFCHAIN]
+            entry["start"] = start
+
+    sectors = []
+    fat = []
+
+    def allocate(data):
+        if not data:
+            return _ENDOFCHAIN
+        count = (len(data) + _SECTOR - 1) // _SECTOR
+        start = len(sectors)
+        padded = bytes(data) + b"\0" * (count * _SECTOR - len(data))
+        for i in range(count):
+            sectors.append(padded[i * _SECTOR:(i + 1) * _SECTOR])
+            fat.append(start + i + 1 if i < count - 1 else _ENDOFCHAIN)
+        return start
+
+    entries[0]["start"] = allocate(mini_stream) if mini_stream else _ENDOFCHAIN
+    entries[0]["size"] = len(mini_stream)
+    for entry in big_streams:
+        entry["start"] = allocate(entry["data"])
+    minifat_bytes = b"".join(struct.pack("<I", value) for value in minifat)
+    minifat_start = allocate(minifat_bytes) if minifat else _ENDOFCHAIN
+    minifat_count = (len(minifat_bytes) + _SECTOR - 1) // _SECTOR
+
+    # Répertoire : les enfants d'un stockage sont chaînés par leur frère droit
+    for entry in entries:
+        entry.setdefault("left", _NOSTREAM)
+        entry.setdefault("right", _NOSTREAM)
+        entry.setdefault("child", _NOSTREAM)
+        children = entry.get("children")
+        if children:
+            entry["child"] = children[0]
+            for left, right in zip(children, children[1:]):
+                entries[left]["right"] = right
+    directory = bytearray()
+    for entry in entries:
+        name = entry["name"].encode("utf-16-le")
+        is_storage = entry["type"] == 1
+        directory += struct.pack(
+            _DIRECTORY_ENTRY, name, len(name) + 2, entry["type"], 1,
+            entry["left"], entry["right"], entry["child"], b"\0" * 16, 0, 0, 0,
+            0 if is_storage else entry.get("start", _ENDOFCHAIN),
+            0 if is_storage else entry.get("size", len(entry.get("data", b""))),
+        )
+    while len(directory) % _SECTOR:
+        directory += struct.pack(_DIRECTORY_ENTRY, b"", 0, 0, 0, _NOSTREAM, _NOSTREAM, _NOSTREAM,
+                                 b"\0" * 16, 0, 0, 0, 0, 0)
+    directory_start = allocate(directory)
+
+    # Secteurs de la FAT (au plus 109, référencés directement dans l'en-tête)
+    fat_count = 1
+    while len(sectors) + fat_count > fat_count * (_SECTOR // 4):
+        fat_count += 1
+    if fat_count > 109:
+        raise ValueError("Fichier trop volumineux pour un en-tête sans secteur DIFAT")
+    fat_start = len(sectors)
+    fat += [_FATSECT] * fat_count
+    fat += [_FREESECT] * (fat_count * (_SECTOR // 4) - len(fat))
+    fat_bytes = b"".join(struct.pack("<I", value) for value in fat)
+    for i in range(fat_count):
+        sectors.append(fat_bytes[i * _SECTOR:(i + 1) * _SECTOR])
+    difat = [fat_start + i for i in range(fat_count)] + [_FREESECT] * (109 - fat_count)
+
+    header = struct.pack(
+        "<8s16sHHHHH6sIIIIIIIII",
+        b"\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1", b"\0" * 16, 0x3E, 3, 0xFFFE, 9, 6, b"\0" * 6,
+        0, fat_count, directory_start, 0, _MINI_CUTOFF, minifat_start, minifat_count, _ENDOFCHAIN, 0,
+    ) + b"".join(struct.pack("<I", value) for value in difat)
+    return header + b"".join(sectors)
+
+def _properties_stream(header, properties):
+    body = bytearray(header)
+    for tag, value in properties:
+        body += struct.pack("<II", tag, 6) + value
+    return bytes(body)
+
+def _string_property(property_id, text):
+    """Propriété MAPI texte (PT_UNICODE) : (étiquette, valeur de taille, contenu)."""
+    data = text.encode("utf-16-le")
+    return (property_id << 16) | 0x001F, struct.pack("<II", len(data), 0), data
+
+def build_message_tree(subject, sender, to, date, attachments, body="", embedded=False):
+    """
+    Construit l'arbre de stockage d'un message Outlook.
+
+    Args:
+        subject (str): Objet du message.
+        sender (str): Expéditeur.
+        to (str): Destinataire.
+        date (datetime): Date d'envoi.
+        attachments (list): Pièces jointes (nom, bytes) ou (nom, arbre) pour un .msg imbriqué.
+        body (str): Corps du message.
+        embedded (bool): Arbre destiné à être imbriqué dans un autre message.
+
+    Returns:
+        dict: Arbre à passer à build_cfb, ou à joindre à un autre message.
+    """
+    tree = {}
+    properties = []
+    for property_id, text in ((0x0037, subject), (0x0C1A, sender), (0x0C1F, sender), (0x5D01, sender),
+                              (0x0E04, to), (0x001A, "IPM.Note"), (0x1000, body)):
+        tag, value, data = _string_property(property_id, text)
+        properties.append((tag, value))
+        tree["__substg1.0_%08X" % tag] = data
+    filetime = int((date - datetime.datetime(1601, 1, 1)).total_seconds() * 10**7)
+    properties.append(((0x0039 << 16) | 0x0040, struct.pack("<Q", filetime)))
+    properties.append(((0x0E06 << 16) | 0x0040, struct.pack("<Q", filetime)))
+
+    for index, (name, payload) in enumerate(attachments):
+        attachment = {}
+        attachment_properties = []
+        for property_id, text in ((0x3707, name), (0x3704, name[:12]), (0x3703, "." + name.rsplit(".", 1)[-1])):
+            tag, value, data = _string_property(property_id, text)
+            attachment_properties.append((tag, value))
+            attachment["__substg1.0_%08X" % tag] = data
+        if isinstance(payload, dict):
+            # Message imbriqué (ATTACH_EMBEDDED_MSG)
+            attachment_properties.append(((0x3705 << 16) | 0x0003, struct.pack("<II", 5, 0)))
+            attachment["__substg1.0_3701000D"] = payload
+        else:
+            attachment_properties.append(((0x3705 << 16) | 0x0003, struct.pack("<II", 1, 0)))
+            attachment_properties.append(((0x3701 << 16) | 0x0102, struct.pack("<II", len(payload), 0)))
+            attachment["__substg1.0_37010102"] = payload
+        attachment["__properties_version1.0"] = _properties_stream(b"\0" * 8, attachment_properties)
+        tree["__attach_version1.0_#%08X" % index] = attachment
+
+    count = len(attachments)
+    header = b"\0" * 8 + struct.pack("<IIII", 0, count, 0, count)
+    if not embedded:
+        header += b"\0" * 8
+        tree["__nameid_version1.0"] = {"__substg1.0_00020102": b"", "__substg1.0_00030102": b"",
+                                       "__substg1.0_00040102": b""}
+    tree["__properties_version1.0"] = _properties_stream(header, properties)
+    return tree
+
+def build_msg(subject, sender, to, date, attachments, body=""):
+    """Construit le contenu d'un fichier .msg (voir build_message_tree)."""
+    return build_cfb(build_message_tree(subject, sender, to, date, attachments, body))
+
+# ---------------------------------------------------------------------------
+# Ordres de virement synthétiques
+# ---------------------------------------------------------------------------
+
+# Mises en page du formulaire de virement : chacune sollicite d'autres regex
+# (principale ou variantes de repli) de extraction_engine.PATTERNS
+FORM_VARIANTS = {
+    # Mise en page courante : blocs sur des lignes séparées
+    "standard": """Direction Financière – Service Trésorerie
+{contact1} 01 02 03 04 05
+HAMON Pascal 01 02 03 04 06
+VUONG THI Thien 01 02 03 04 07
+Destinataire BANQUE
+Mail : ops@banque.fr
+{banque}
+Tel : 01 44 55 66 77
+Fax : 01 44 55 66 78
+Paris, le {date_document}
+Notre référence / Our reference: {reference}
+Par le débit de notre compte n° / From our bank account number {compte} Swift: BNPAFRPP
+{entite}
+Veuillez virer la somme de / Please transfer the amount of {montant} {devise}
+Date de valeur compensée / Compensated value date {date_valeur}
+Nom bénéficiaire / Beneficiary name IBAN / IBAN
+{entite}
+HO
+{iban}
+Banque bénéficiaire / Beneficiary bank Code Swift / Swift code
+{swift}
+Détail Réf de l'opération / Transfer reference {motif}
+Transfer id {transfer_id} virement
+Signatures autorisées / Authorized signatures
+{signataire1}
+{signataire2}
+""",
+    # Texte extrait en lignes fusionnées (sans tiret, montant et IBAN sur la ligne suivante)
+    "compact": """DIRECTION FINANCIERE SERVICE TRESORERIE
+Direction Financière Service Trésorerie {contact1} 01 02 03 04 05 HAMON Pascal 01 02 03 04 06 VUONG THI Thien 01 02 03 04 07
+Mail : ops@banque.fr
+{banque}
+Tel : 01 44 55 66 77 Fax : 01 44 55 66 78
+Paris le {date_document}
+Notre référence / Our reference: {reference}
+Par le débit de notre compte n° / From our bank account number {compte_court}
+4 44 = {entite}
+SIEGE
+Veuillez virer la somme de / Please transfer the amount of
+{montant} {devise}
+Date de valeur compensée / Compensated value date {date_valeur}
+IBAN / IBAN
+{beneficiaire}
+{iban_compact}
+Banque bénéficiaire / Beneficiary bank Code Swift / Swift code
+{swift_court}
+{swift}
+Motif du paiement / Payment purpose / Transfer reference {motif}
+Signatures autorisées / Authorized signatures
+{signataire1}
+{signataire2}
+""",
+    # Montant au format français (espaces et virgule) sur la ligne suivante, sans contacts
+    "montant_fr": """Direction de la trésorerie
+Mail : tresorerie@banque.fr
+{banque}
+Tel : 01 44 55 66 77
+Fax : 01 44 55 66 78
+on {date_document}
+Notre référence / Our reference: {reference}
+Par le débit de notre compte n° / From our bank account number {compte}
+{entite}
+Veuillez virer la somme de / Please transfer the amount of
+{montant_fr} {devise}
+Date de valeur compensée / Compensated value date {date_valeur_courte}
+Nom bénéficiaire / Beneficiary name IBAN / IBAN {beneficiaire}
+{iban}
+Banque bénéficiaire / Beneficiary bank Code Swift / Swift code {swift}
+Détail Réf de l'opération / Transfer reference {motif}
+Signatures autorisées / Authorized signatures
+{signataire1}
+""",
+}
+
+_BANQUES = ["CAIPB SERVICE VIREMENTS", "BNP PARIBAS SERVICE VIREMENTS", "SOCIETE GENERALE TRESORERIE"]
+_ENTITES = ["AXA FRANCE VIE", "AXA FRANCE IARD", "AXA BANQUE"]
+_SIGNATAIRES = ["JEAN PAUL Martin", "MARIE CLAIRE Durand", "ANNE SOPHIE Lefèvre", "JEAN LUC Hérault"]
+_SWIFTS = ["BNPAFRPPXXX", "SOGEFRPPXXX", "AGRIFRPPXXX", "CEPAFRPP751"]
+_DEVISES = ["EUR", "EUR", "EUR", "USD", "GBP"]
+
+def _group(digits, size=4):
+    return " ".join(digits[i:i + size] for i in range(0, len(digits), size))
+
+def form_fields(number, rng):
+    """Valeurs aléatoires (mais reproductibles avec rng) d'un ordre de virement."""
+    amount = rng.randint(100, 9999999) + rng.randint(0, 99) / 100
+    integer, cents = f"{amount:.2f}".split(".")
+    value_date = datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randint(0, 700))
+    iban_digits = "".join(str(rng.randint(0, 9)) for _ in range(23))
+    account_digits = "".join(str(rng.randint(0, 9)) for _ in range(23))
+    return {
+        "contact1": "DUPONT Denis",
+        "banque": rng.choice(_BANQUES),
+        "entite": rng.choice(_ENTITES),
+        "date_document": (value_date - datetime.timedelta(days=2)).strftime("%d/%m/%Y"),
+        "reference": str(100000 + number),
+        "compte": "FR76 " + _group(account_digits),
+        "compte_court": "FR76 " + _group(account_digits[:16]),
+        "montant": f"{int(integer):,}.{cents}",
+        "montant_fr": f"{int(integer):,}".replace(",", " ") + f",{cents}",
+        "devise": rng.choice(_DEVISES),
+        "date_valeur": value_date.strftime("%d/%m/%Y"),
+        "date_valeur_courte": value_date.strftime("%d/%m/%Y"),
+        "beneficiaire": rng.choice(_ENTITES),
+        "iban": "FR76 " + _group(iban_digits),
+        "iban_compact": "FR76" + iban_digits,
+        "swift": rng.choice(_SWIFTS),
+        "swift_court": rng.choice(_SWIFTS)[:4],
+        "motif": f"REF{number:06d}",
+        "transfer_id": f"99{number:06d}",
+        "signataire1": rng.choice(_SIGNATAIRES),
+        "signataire2": rng.choice(_SIGNATAIRES),
+    }
+
+def build_form_text(number, variant="standard", rng=None):
+    """Texte d'un ordre de virement pour la mise en page variant (voir FORM_VARIANTS)."""
+    rng = rng or random.Random(number)
+    return FORM_VARIANTS[variant].format(**form_fields(number, rng))
+
+def build_pdf(page_texts, fontsize=8):
+    """
+    Construit un PDF dont chaque page contient un des textes de page_texts.
+    La police est intégrée (TextWriter) pour que les caractères hors Latin-1
+    du formulaire (tiret demi-cadratin, apostrophe typographique) soient relus à l'identique.
+
+    Returns:
+        bytes: Contenu du PDF.
+    """
+    font = fitz.Font("helv")
+    with fitz.open() as document:
+        for text in page_texts:
+            page = document.new_page()
+            writer = fitz.TextWriter(page.rect)
+            for number, line in enumerate(text.splitlines()):
+                writer.append((30, 40 + number * fontsize * 1.5), line, font=font, fontsize=fontsize)
+            writer.write_text(page)
+        return document.tobytes(garbage=3, deflate=True)
+
+def generate_msg_corpus(root_folder, message_count=50, seed=0, max_pages=3, nested_ratio=0.3,
+                        duplicate_ratio=0.1, folders=("", "2024", "2024/novembre")):
+    """
+    Génère une arborescence de fichiers .msg contenant des ordres de virement PDF
+    dans toutes les mises en page de FORM_VARIANTS, des PDF de plusieurs pages,
+    des .msg imbriqués (transferts), des PDF en double et des pièces jointes non PDF.
+
+    Args:
+        root_folder (str): Dossier racine du corpus (créé si besoin).
+        message_count (int): Nombre de fichiers .msg.
+        seed (int): Graine du générateur aléatoire (corpus reproductible).
+        max_pages (int): Nombre maximal de pages d'un PDF.
+        nested_ratio (float): Proportion de messages contenant un .msg imbriqué.
+        duplicate_ratio (float): Proportion de messages contenant un PDF déjà envoyé.
+        folders (tuple): Sous-dossiers entre lesquels les messages sont répartis.
+
+    Returns:
+        dict: Nombre de messages, de PDF, de .msg imbriqués et taille totale (octets).
+    """
+    rng = random.Random(seed)
+    variants = list(FORM_VARIANTS)
+    stats = {"messages": 0, "pdf": 0, "msg_imbriques": 0, "octets": 0}
+    sent_pdfs = []
+    sent_at = datetime.datetime(2024, 1, 2, 9, 0, 0)
+
+    for folder in folders:
+        os.makedirs(os.path.join(root_folder, folder), exist_ok=True)
+
+    def new_pdf(number):
+        variant = variants[number % len(variants)]
+        pages = [build_form_text(number, variant, rng) for _ in range(rng.randint(1, max_pages))]
+        stats["pdf"] += 1
+        return build_pdf(pages)
+
+    for number in range(message_count):
+        sent_at += datetime.timedelta(minutes=rng.randint(5, 1500))
+        pdf_data = new_pdf(number)
+        attachments = [(f"ordre de virement {number}.pdf", pdf_data)]
+
+        if sent_pdfs and rng.random() < duplicate_ratio:
+            attachments.append((f"copie {number}.pdf", rng.choice(sent_pdfs)))
+            stats["pdf"] += 1
+        if rng.random() < nested_ratio:
+            inner = build_message_tree(f"TR: VIREMENT {number}", "tresorerie@axa.fr", "ops@banque.fr", sent_at,
+                                       [(f"ordre imbrique {number}.pdf", new_pdf(message_count + number))],
+                                       embedded=True)
+            attachments.append((f"transfert {number}.msg", inner))
+            stats["msg_imbriques"] += 1
+        if number % 5 == 0:
+            attachments.append(("logo.png", b"\x89PNG\r\n\x1a\n" + bytes(rng.randrange(256) for _ in range(200))))
+        sent_pdfs.append(pdf_data)
+
+        data = build_msg(f"VIREMENT {number}", "tresorerie@axa.fr", "ops@banque.fr", sent_at, attachments,
+                         body="Veuillez trouver ci-joint l'ordre de virement.")
+        path = os.path.join(root_folder, folders[number % len(folders)], f"virement {number:05d}.msg")
+        with open(path, "wb") as f:
+            f.write(data)
+        stats["messages"] += 1
+        stats["octets"] += len(data)
+    return stats
+
+# ---------------------------------------------------------------------------
+# Fichiers délimités par | (entrées de filter_dates et convert_txt_to_csv)
+# ---------------------------------------------------------------------------
+
+def _send_date(rng, clean):
+    """Date d'envoi au format JJ/MM/AAAA HH:MM:SS ou, si clean est faux, dans une des formes rencontrées."""
+    moment = datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=rng.randint(0, 700 * 86400))
+    if clean:
+        return moment.strftime("%d/%m/%Y %H:%M:%S")
+    form = rng.randint(0, 9)
+    if form < 6:
+        return moment.strftime("%d/%m/%Y %H:%M:%S")
+    if form < 8:
+        return moment.strftime("%Y-%m-%d %H:%M:%S") + f".{rng.randint(0, 999999):06d}+01:00"
+    if form < 9:
+        return "Envoyé : " + moment.strftime("%d/%m/%Y  %H:%M:%S")
+    return "NON TROUVE"
+
+def generate_pipe_file(output_file, row_count, columns, date_column, seed=0, clean_dates=False):
+    """
+    Génère un fichier délimité par | (en-tête puis row_count lignes).
+
+    Args:
+        output_file (str): Fichier à créer.
+        row_count (int): Nombre de lignes de données.
+        columns (list): Noms des colonnes.
+        date_column (str): Colonne remplie avec des dates d'envoi.
+        seed (int): Graine du générateur aléatoire.
+        clean_dates (bool): Uniquement des dates JJ/MM/AAAA HH:MM:SS ; sinon un
+                            mélange de dates ISO, entourées de texte et absentes.
+
+    Returns:
+        int: Taille du fichier en octets.
+    """
+    rng = random.Random(seed)
+    date_index = columns.index(date_column)
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write("|".join(columns) + "\n")
+        for number in range(row_count):
+            fields = form_fields(number, rng)
+            values = list(fields.values())
+            row = [str(values[i % len(values)]).upper() for i in range(len(columns))]
+            row[date_index] = _send_date(rng, clean_dates)
+            f.write("|".join(row) + "\n")
+    return os.path.getsize(output_file)
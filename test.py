@@ -1,41 +1,22 @@
 from datetime import datetime
+from pipe_filter import DateRange, filter_pipe_file
 
-def filter_dates(input_file, output_file):
+def filter_dates(input_file, output_file, workers=None):
     """
     Filtre les lignes d'un fichier texte basé sur une date de référence.
     Ne garde que les dates postérieures au 01/11/2024.
+    Le fichier est traité par tranches, en parallèle si workers > 1 (voir pipe_filter).
     
     Args:
         input_file (str): Chemin du fichier d'entrée
         output_file (str): Chemin du fichier de sortie
+        workers (int): Nombre de processus (None pour un traitement séquentiel)
     """
     # Date de référence
-    date_reference = datetime.strptime("01/11/2024 00:00:00", "%d/%m/%Y %H:%M:%S")
+    date_reference = datetime(2024, 11, 1)
     
-    # Lecture et traitement du fichier
-    with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8') as f_out:
-        # Lire l'en-tête
-        header = f_in.readline().strip()
-        # Écrire l'en-tête dans le fichier de sortie
-        f_out.write(header + '\n')
-        
-        # Trouver l'index de la colonne Date_envoi
-        colonnes = header.split('|')
-        try:
-            date_index = colonnes.index('Date_envoi')
-        except ValueError:
-            raise ValueError("La colonne 'Date_envoi' n'a pas été trouvée dans le fichier")
-        
-        # Traiter chaque ligne
-        for ligne in f_in:
-            champs = ligne.strip().split('|')
-            try:
-                date_envoi = datetime.strptime(champs[date_index], "%d/%m/%Y %H:%M:%S")
-                if date_envoi > date_reference:
-                    f_out.write(ligne)
-            except (ValueError, IndexError):
-                print(f"Erreur de traitement pour la ligne: {ligne.strip()}")
-                continue
+    return filter_pipe_file(input_file, output_file, [DateRange('Date_envoi', after=date_reference)],
+                            workers=workers)
 
 # Exemple d'utilisation
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+import os
+import re
+import time
+
+import extract_msg
+import pytest
+
+from extraction_engine import ENGINE, PATTERNS, VARIANT_FIELD
+from ooo import process_pdf_document
+from synthetic_corpus import build_form_text, generate_msg_corpus
+
+
+def baseline_chain(text):
+    """Chaîne de regex d'origine : première regex qui correspond, dans l'ordre de PATTERNS."""
+    extracted_data = {}
+    for key, regex_list in PATTERNS.items():
+        extracted_data[key] = "Non trouvé"
+        for pattern in regex_list:
+            match = re.search(pattern, text, re.MULTILINE)
+            if match:
+                try:
+                    extracted_data[key] = match.group(1).strip()
+                except IndexError:
+                    extracted_data[key] = match.group(0).strip()
+                break
+    return extracted_data
+
+
+def _collect_pdfs(msg, label, documents):
+    for attachment in msg.attachments:
+        name = attachment.longFilename or ""
+        data = attachment.data
+        if isinstance(data, bytes) and name.lower().endswith(".pdf"):
+            documents.append((f"{label}>{name}", process_pdf_document(data, None, 10**9)["pages"]))
+        elif hasattr(data, "attachments"):
+            _collect_pdfs(data, f"{label}>{name}", documents)
+
+
+@pytest.fixture(scope="module")
+def corpus_pages(tmp_path_factory):
+    root = tmp_path_factory.mktemp("corpus")
+    generate_msg_corpus(str(root))
+    documents = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            msg = extract_msg.Message(os.path.join(dirpath, filename))
+            try:
+                _collect_pdfs(msg, filename, documents)
+            finally:
+                msg.close()
+    return documents
+
+
+def test_corpus_matches_baseline_chain(corpus_pages):
+    # Le moteur, sur le PDF complet, doit retrouver ce que la chaîne d'origine trouve
+    # sur le premier formulaire seul : les fenêtres ne débordent pas sur la page suivante
+    assert corpus_pages
+    for name, pages in corpus_pages:
+        expected = baseline_chain(pages[0])
+        extracted = ENGINE.extract("".join(pages))
+        extracted.pop(VARIANT_FIELD)
+        assert extracted == expected, name
+
+
+@pytest.mark.parametrize("variant", ["standard", "compact", "montant_fr"])
+def test_form_variants_match_baseline_chain(variant):
+    text = build_form_text(7, variant)
+    extracted = ENGINE.extract(text)
+    extracted.pop(VARIANT_FIELD)
+    assert extracted == baseline_chain(text)
+
+
+def test_variant_keeps_chain_order():
+    # Regex n° 0 (libellé long) avant n° 2 : le motif s'arrête au premier mot, comme la chaîne d'origine
+    text = build_form_text(7, "standard").replace(
+        "Détail Réf de l'opération / Transfer reference REF000007",
+        "Référence à indiquer sur le\nvirement -Détail Réf de l'opération / Transfer reference FACT2024 LOYER MARS",
+    )
+    extracted = ENGINE.extract(text)
+    assert extracted[VARIANT_FIELD] == "tresorerie_tiret"
+    assert extracted["Motif du paiement"] == baseline_chain(text)["Motif du paiement"] == "FACT2024"
+
+
+def test_missing_section_value_is_bounded():
+    # IBAN absent de sa section, suivi de nombreuses lignes qui relancent les regex
+    # [\s\S]*? : la recherche doit rester bornée à la fenêtre de la section
+    lines = build_form_text(3, "standard").splitlines(True)
+    form = "".join(line for line in lines if not line.startswith(("FR76 ", "Détail", "Transfer id")))
+    text = form.replace("CEPAFRPP751", "CEPAFRPPXXX") + "IBAN / IBAN AXA FRANCE VIE HO\n" * 200
+
+    start = time.perf_counter()
+    extracted = ENGINE.extract(text)
+    assert time.perf_counter() - start < 1.0
+    assert extracted["IBAN Bénéficiaire"] == "Non trouvé"
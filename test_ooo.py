@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from ooo import CONSOLIDATED_FILENAME, process_pdf_document
+from synthetic_corpus import build_pdf
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_page_parallel_matches_sequential():
+    pdf_data = build_pdf([f"Page {number}" for number in range(12)])
+
+    sequential = process_pdf_document(pdf_data)
+    parallel = process_pdf_document(pdf_data, page_workers=3, page_threshold=5)
+
+    assert parallel["pages"] == sequential["pages"]
+    assert len(parallel["pages"]) == 12
+
+
+def test_page_executor_shut_down_when_pool_worker_exits():
+    # Un processus du pool de messages qui a créé un pool par pages doit pouvoir se
+    # terminer : sans arrêt du pool imbriqué, shutdown() attendrait indéfiniment
+    script = textwrap.dedent("""
+        from concurrent.futures import ProcessPoolExecutor
+        from ooo import process_pdf_document
+        from synthetic_corpus import build_pdf
+
+        def extract(pdf_data):
+            return len(process_pdf_document(pdf_data, page_workers=2, page_threshold=2)["pages"])
+
+        if __name__ == "__main__":
+            executor = ProcessPoolExecutor(max_workers=1)
+            print(executor.submit(extract, build_pdf(["a", "b", "c"])).result())
+            executor.shutdown()
+    """)
+    completed = subprocess.run([sys.executable, "-c", script], cwd=PACKAGE_DIR, capture_output=True,
+                               text=True, timeout=60)
+
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.splitlines()[-1] == "3"
+
+
+def test_cli_without_messages_writes_header_only_file(tmp_path):
+    # Dossier d'entrée absent : le fichier consolidé lu par tgtt et trtr existe quand même
+    completed = subprocess.run([sys.executable, os.path.join(PACKAGE_DIR, "ooo.py")], cwd=str(tmp_path),
+                               capture_output=True, text=True, timeout=120)
+
+    assert completed.returncode == 0, completed.stderr
+    with open(tmp_path / "resultats_extraction" / CONSOLIDATED_FILENAME, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 1 and lines[0].startswith("OBJET|")
@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import pytest
+
+from pipe_filter import AmountRange, ColumnPredicate, DateRange, Equals, filter_pipe_file, nettoyer_date
+from synthetic_corpus import generate_pipe_file
+from tgtt import filter_dates
+
+COLUMNS = ["REFERENCE", "DATE HEURE ENVOI", "MONTANT", "BENEFICIAIRE"]
+
+# Valeurs de date difficiles : doubles espaces, texte autour, ISO, dates invalides, rebut
+EDGE_DATES = [
+    "02/12/2024 10:00:00",
+    "02/12/2024  10:00:00",
+    "Envoyé : 03/12/2024   08:15:00 (Paris)",
+    "2024-12-04 09:30:00",
+    "2024-12-05 09:30:00.123456+01:00",
+    "2024-02-31 09:30:00",
+    "31/02/2025 10:00:00",
+    "ab/cd/efgh ij:kl:mn",
+    "2024-ab-cd ef:gh:ij",
+    "15/10/2024 10:00:00",
+    "NON TROUVE",
+    "",
+]
+
+
+def baseline_filter_dates(input_file, output_file):
+    """tgtt.filter_dates d'origine : nettoyer_date puis strptime, ligne par ligne."""
+    date_reference = datetime.strptime("01/11/2024 00:00:00", "%d/%m/%Y %H:%M:%S")
+    with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8') as f_out:
+        header = f_in.readline().strip()
+        f_out.write(header + '\n')
+        date_index = header.split('|').index('DATE HEURE ENVOI')
+        for ligne in f_in:
+            champs = ligne.strip().split('|')
+            try:
+                date_propre = nettoyer_date(champs[date_index])
+                if date_propre:
+                    if datetime.strptime(date_propre, "%d/%m/%Y %H:%M:%S") > date_reference:
+                        champs[date_index] = date_propre
+                        f_out.write('|'.join(champs) + '\n')
+            except (ValueError, IndexError):
+                continue
+
+
+def _write_edge_file(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("|".join(COLUMNS) + "\n")
+        for number, date in enumerate(EDGE_DATES):
+            f.write(f"REF{number}|{date}|1 234,56|DUPONT\n")
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_filter_dates_matches_baseline(tmp_path, workers):
+    for name, generate in [("edge.txt", _write_edge_file),
+                           ("random.txt", lambda path: generate_pipe_file(path, 2000, COLUMNS, "DATE HEURE ENVOI"))]:
+        input_file = str(tmp_path / name)
+        generate(input_file)
+        baseline_file, output_file = str(tmp_path / "baseline.txt"), str(tmp_path / "output.txt")
+
+        baseline_filter_dates(input_file, baseline_file)
+        filter_dates(input_file, output_file, workers=workers)
+
+        with open(baseline_file, encoding="utf-8") as f:
+            expected = f.read()
+        with open(output_file, encoding="utf-8") as f:
+            assert f.read() == expected, name
+
+
+def test_lenient_skips_garbage_and_reports_invalid_dates(tmp_path):
+    input_file, output_file = str(tmp_path / "edge.txt"), str(tmp_path / "output.txt")
+    _write_edge_file(input_file)
+
+    stats = filter_dates(input_file, output_file)
+
+    # Seules les dates reconnues mais invalides sont des erreurs (31/02/2025)
+    assert stats["erreurs"] == 1
+    with open(output_file, encoding="utf-8") as f:
+        rows = f.read().splitlines()[1:]
+    assert [row.split("|")[1] for row in rows] == [
+        "02/12/2024 10:00:00", "02/12/2024  10:00:00", "03/12/2024   08:15:00",
+        "04/12/2024 09:30:00", "05/12/2024 09:30:00",
+    ]
+
+
+def test_strict_date_range_reports_garbage(tmp_path):
+    input_file, output_file = str(tmp_path / "edge.txt"), str(tmp_path / "output.txt")
+    _write_edge_file(input_file)
+
+    stats = filter_pipe_file(input_file, output_file, [DateRange("DATE HEURE ENVOI", after="01/11/2024")])
+
+    # strptime accepte plusieurs espaces avant l'heure ; 15/10/2024 est écartée sans erreur
+    assert stats["conservees"] == 2
+    assert stats["erreurs"] == len(EDGE_DATES) - 3
+
+
+def test_predicates(tmp_path):
+    input_file, output_file = str(tmp_path / "edge.txt"), str(tmp_path / "output.txt")
+    _write_edge_file(input_file)
+
+    stats = filter_pipe_file(input_file, output_file, [Equals("Bénéficiaire", "dupont"),
+                                                       AmountRange("Montant", minimum=1000)])
+
+    assert stats == {"lignes": len(EDGE_DATES), "conservees": len(EDGE_DATES), "erreurs": 0}
+    with pytest.raises(TypeError):
+        ColumnPredicate("MONTANT")
@@ -0,0 +1,55 @@
+import importlib.machinery
+import importlib.util
+import os
+
+import pytest
+
+import dara
+from sinks import SqliteSink, select_columns
+
+COLUMNS = ["OBJET", "Référence", "Montant décaissement", "Référence de l'opération"]
+
+
+def _load_trtr():
+    # trtr n'a pas d'extension .py
+    loader = importlib.machinery.SourceFileLoader("trtr", os.path.join(os.path.dirname(__file__), "trtr"))
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader("trtr", loader))
+    loader.exec_module(module)
+    return module
+
+
+def test_select_columns():
+    assert select_columns(COLUMNS, exclude=["Référence"]) == [
+        "OBJET", "Montant décaissement", "Référence de l'opération"]
+    assert select_columns(COLUMNS, include=["Référence", "OBJET"]) == ["OBJET", "Référence"]
+
+
+@pytest.mark.parametrize("include, exclude", [(["Montant"], None), (None, ["Reference"])])
+def test_select_columns_rejects_unknown_names(include, exclude):
+    with pytest.raises(ValueError, match="Colonnes inconnues"):
+        select_columns(COLUMNS, include, exclude)
+
+
+def test_write_data_to_txt_default_exclusion(tmp_path):
+    trtr = _load_trtr()
+    output_file = str(tmp_path / "output.txt")
+    trtr.write_data_to_txt([{"page 1": {"OBJET": "ordre", "Référence": "REF1"}}], [], output_file)
+
+    with open(output_file, encoding="utf-8") as f:
+        header = f.readline().rstrip("\n").split("|")
+    assert "REFERENCE" not in header and "OBJET" in header
+    assert trtr.EXCLUDED_COLUMNS == ["Référence", "Référence de l'opération"]
+    with pytest.raises(ValueError):
+        trtr.write_data_to_txt([], [], output_file, exclude_columns=["Reference"])
+
+
+def test_dara_closes_sqlite_sink_on_error(tmp_path, monkeypatch):
+    closed = []
+    original_close = SqliteSink.close
+    monkeypatch.setattr(SqliteSink, "close", lambda self: closed.append(self) or original_close(self))
+    monkeypatch.setattr(SqliteSink, "write_row", lambda self, row: 1 / 0)
+
+    with pytest.raises(ZeroDivisionError):
+        dara.write_data_to_txt([{"page 1": {"OBJET": "ordre"}}], [], str(tmp_path / "data.txt"),
+                               sqlite_path=str(tmp_path / "data.db"))
+    assert len(closed) == 1
@@ -0,0 +1,51 @@
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from tet import convert_pipe_file, convert_txt_to_csv
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return str(path)
+
+
+def test_convert_pipe_file_all_formats(tmp_path):
+    input_file = _write(tmp_path / "donnees.txt", "OBJET|MONTANT DECAISSEMENT\nORDRE 1|1,234.56\n\nORDRE 2|10.00\n")
+    outputs = {"csv": str(tmp_path / "d.csv"), "jsonl": str(tmp_path / "d.jsonl"), "sqlite": str(tmp_path / "d.sqlite")}
+
+    assert convert_pipe_file(input_file, outputs, progress_every=0) == 2
+
+    with open(outputs["csv"], newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [["OBJET", "MONTANT DECAISSEMENT"], ["ORDRE 1", "1,234.56"], ["ORDRE 2", "10.00"]]
+    with open(outputs["jsonl"], encoding="utf-8") as f:
+        assert json.loads(f.readline()) == {"OBJET": "ORDRE 1", "MONTANT DECAISSEMENT": "1,234.56"}
+    with sqlite3.connect(outputs["sqlite"]) as conn:
+        assert conn.execute("SELECT montant_decaissement FROM virements ORDER BY id").fetchall() == [(1234.56,), (10.0,)]
+
+
+def test_empty_input_creates_empty_outputs(tmp_path, capsys):
+    input_file = _write(tmp_path / "vide.txt", "\n")
+    outputs = {"csv": str(tmp_path / "d.csv"), "jsonl": str(tmp_path / "d.jsonl"), "sqlite": str(tmp_path / "d.sqlite")}
+
+    assert convert_pipe_file(input_file, outputs) is None
+    for fmt in ("csv", "jsonl"):
+        with open(outputs[fmt], encoding="utf-8") as f:
+            assert f.read() == ""
+    with sqlite3.connect(outputs["sqlite"]) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM virements").fetchone() == (0,)
+
+    # Le fichier CSV est créé et l'entrée vide est signalée
+    csv_file = str(tmp_path / "vide.csv")
+    convert_txt_to_csv(input_file, csv_file)
+    assert "est vide" in capsys.readouterr().out
+    with open(csv_file, encoding="utf-8") as f:
+        assert f.read() == ""
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        convert_pipe_file(_write(tmp_path / "d.txt", "A|B\n"), {"xlsx": str(tmp_path / "d.xlsx")})
@@ -1,28 +1,148 @@
 import csv
+import json
+import os
+import time
+from sinks import SqliteSink, TRANSFER_COLUMN_TYPES, TRANSFER_INDEXES
+from text_normalizer import normalize_upper
+
+class CsvRowWriter:
+    """Écrit les lignes (en-tête compris) dans un fichier CSV."""
+
+    def __init__(self, output_file, header):
+        self.file = open(output_file, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        if header:
+            self.writer.writerow(header)
+
+    def write(self, fields):
+        self.writer.writerow(fields)
+
+    def close(self):
+        self.file.close()
+
+class JsonLinesRowWriter:
+    """Écrit chaque ligne comme un objet JSON {colonne: valeur} sur une ligne."""
+
+    def __init__(self, output_file, header):
+        self.file = open(output_file, 'w', encoding='utf-8')
+        self.header = header
+
+    def write(self, fields):
+        self.file.write(json.dumps(dict(zip(self.header, fields)), ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.file.close()
+
+class SqliteRowWriter:
+    """
+    Enregistre les lignes dans la table SQLite typée et indexée (voir sinks.SqliteSink).
+    Les colonnes sont reconnues sans tenir compte des accents ni de la casse.
+    """
+
+    def __init__(self, output_file, header):
+        column_types = {normalize_upper(col): sql_type for col, sql_type in TRANSFER_COLUMN_TYPES.items()}
+        indexes = {normalize_upper(col) for col in TRANSFER_INDEXES}
+        self.header = header
+        self.sink = SqliteSink(
+            output_file, header,
+            column_types={col: column_types[normalize_upper(col)] for col in header
+                          if normalize_upper(col) in column_types},
+            indexes=[col for col in header if normalize_upper(col) in indexes],
+            missing=("", "Non trouvé", "NON TROUVE"),
+        )
+
+    def write(self, fields):
+        self.sink.write_row(dict(zip(self.header, fields)))
+
+    def close(self):
+        self.sink.close()
+
+# Formats de sortie disponibles
+OUTPUT_WRITERS = {
+    "csv": CsvRowWriter,
+    "jsonl": JsonLinesRowWriter,
+    "sqlite": SqliteRowWriter,
+}
+
+def convert_pipe_file(input_file, outputs, progress_every=100000):
+    """
+    Convertit en flux un fichier texte avec délimiteur | vers un ou plusieurs formats,
+    en une seule lecture et à mémoire constante (chaque ligne est écrite dès sa lecture).
+
+    Args:
+        input_file (str): Chemin du fichier texte d'entrée (en-tête sur la première ligne)
+        outputs (dict): Fichiers de sortie par format, par exemple
+                        {"csv": "donnees.csv", "jsonl": "donnees.jsonl", "sqlite": "donnees.sqlite"}
+        progress_every (int): Nombre de lignes entre deux messages de progression (0 pour aucun)
+
+    Returns:
+        int: Nombre de lignes de données converties (un en-tête seul donne des sorties
+             sans données), ou None si le fichier d'entrée est vide : les sorties sont
+             alors créées sans en-tête ni données
+    """
+    unknown = [fmt for fmt in outputs if fmt not in OUTPUT_WRITERS]
+    if unknown:
+        raise ValueError(f"Format(s) de sortie inconnu(s) : {', '.join(unknown)}")
+
+    total_size = os.path.getsize(input_file)
+    start_time = time.time()
+    bytes_read = 0
+    row_count = 0
+    writers = []
+    empty_input = False
+
+    with open(input_file, 'rb') as txt_file:
+        try:
+            for raw_line in txt_file:
+                bytes_read += len(raw_line)
+                line = raw_line.decode('utf-8').strip()
+                if not line:
+                    continue
+                fields = line.split('|')
+
+                # La première ligne non vide est l'en-tête
+                if not writers:
+                    writers = [OUTPUT_WRITERS[fmt](path, fields) for fmt, path in outputs.items()]
+                    continue
+
+                for writer in writers:
+                    writer.write(fields)
+                row_count += 1
+
+                if progress_every and row_count % progress_every == 0:
+                    elapsed = time.time() - start_time
+                    percent = 100 * bytes_read / total_size if total_size else 100
+                    print(f"⏳ {row_count} lignes converties ({percent:.1f} %, "
+                          f"{row_count / elapsed if elapsed else 0:.0f} lignes/s)")
+
+            # Fichier vide : sorties créées quand même, pour les traitements qui les lisent
+            if not writers:
+                empty_input = True
+                writers = [OUTPUT_WRITERS[fmt](path, []) for fmt, path in outputs.items()]
+        finally:
+            for writer in writers:
+                writer.close()
+
+    if empty_input:
+        return None
+    return row_count
 
 def convert_txt_to_csv(input_file, output_file):
     """
     Convertit un fichier texte avec délimiteur | en fichier CSV.
-    
+
     Args:
         input_file (str): Chemin du fichier texte d'entrée
         output_file (str): Chemin du fichier CSV de sortie
     """
     try:
-        # Lecture du fichier texte
-        with open(input_file, 'r', encoding='utf-8') as txt_file:
-            # Lecture des lignes et split sur le délimiteur |
-            lines = [line.strip().split('|') for line in txt_file if line.strip()]
-        
-        # Écriture dans le fichier CSV
-        with open(output_file, 'w', newline='', encoding='utf-8') as csv_file:
-            writer = csv.writer(csv_file)
-            # Écriture de chaque ligne
-            for line in lines:
-                writer.writerow(line)
-                
+        # Conversion en flux : les lignes sont écrites au fur et à mesure de la lecture
+        if convert_pipe_file(input_file, {"csv": output_file}) is None:
+            print(f"⚠️ Le fichier {input_file} est vide : fichier {output_file} créé sans données.")
+            return
+
         print(f"Conversion réussie ! Le fichier {output_file} a été créé.")
-        
+
     except FileNotFoundError:
         print(f"Erreur : Le fichier {input_file} n'a pas été trouvé.")
     except Exception as e:
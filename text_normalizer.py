@@ -0,0 +1,61 @@
+import unicodedata
+from functools import lru_cache
+
+# Au-delà de U+024F (fin du Latin étendu B), on revient à la normalisation NFD complète
+_TABLE_LIMIT = 'ɐ'
+
+def _remove_accents_nfd(input_str):
+    """Version de référence : décomposition NFD puis suppression des diacritiques (Mn)."""
+    return ''.join(
+        c for c in unicodedata.normalize('NFD', input_str) if unicodedata.category(c) != 'Mn'
+    )
+
+# Table de translittération précalculée pour Latin-1 et Latin étendu A/B,
+# construite avec la version de référence pour garantir un résultat identique
+_ACCENT_TABLE = {
+    code: _remove_accents_nfd(chr(code))
+    for code in range(0x80, ord(_TABLE_LIMIT))
+    if _remove_accents_nfd(chr(code)) != chr(code)
+}
+
+def remove_accents(input_str):
+    """
+    Supprime les accents d'une chaîne de caractères.
+    Les caractères ASCII, Latin-1 et Latin étendu passent par une table précalculée ;
+    la normalisation NFD n'est utilisée que pour les autres caractères.
+    Args:
+        input_str (str): Chaîne d'entrée.
+    Returns:
+        str: Chaîne sans accents.
+    """
+    input_str = str(input_str)
+    if input_str.isascii():
+        return input_str
+    if max(input_str) < _TABLE_LIMIT:
+        return input_str.translate(_ACCENT_TABLE)
+    return _remove_accents_nfd(input_str)
+
+def fold_latin_accents(input_str):
+    """
+    Supprime les accents des seuls caractères latins (table précalculée), sans passer
+    par la normalisation NFD : les autres caractères (tirets typographiques...) sont
+    laissés tels quels. Moins complet que remove_accents, mais de coût constant ;
+    utile pour comparer du texte à des libellés connus.
+    """
+    return input_str if input_str.isascii() else input_str.translate(_ACCENT_TABLE)
+
+@lru_cache(maxsize=65536)
+def _normalize_upper(input_str):
+    return remove_accents(input_str).upper()
+
+def normalize_upper(value):
+    """
+    Supprime les accents et met en majuscules une valeur de sortie.
+    Les résultats sont mis en cache (LRU borné) : les mêmes valeurs reviennent
+    très souvent (banques, devises, "Non trouvé", signataires).
+    Args:
+        value: Valeur à nettoyer (convertie en chaîne).
+    Returns:
+        str: Valeur sans accents, en majuscules.
+    """
+    return _normalize_upper(str(value))